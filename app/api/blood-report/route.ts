@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import Airtable from 'airtable';
+import { createServerClient } from '@/lib/supabase/server';
 
 // Log environment variables (without exposing sensitive values)
 console.log('Blood Report API - Environment check:', {
@@ -24,7 +25,36 @@ export async function GET(request: Request) {
       return NextResponse.json({ error: 'Email is required' }, { status: 400 });
     }
 
-    // Query the doctors intake table
+    // Typed markers synced by `python -m genos_sync blood-markers`: the latest
+    // report is an index lookup on (email, report_date). Two reports can share
+    // a date, so the markers are read for that one report record.
+    const supabase = createServerClient();
+    const { data: latest } = await supabase
+      .from('blood_markers')
+      .select('report_date, source_airtable_id')
+      .eq('email', email)
+      .order('report_date', { ascending: false })
+      .order('synced_at', { ascending: false })
+      .limit(1);
+
+    if (latest && latest.length > 0) {
+      const { data: markers } = await supabase
+        .from('blood_markers')
+        .select('marker, marker_label, category, value, value_text, unit, ref_low, ref_high, flag, report_date')
+        .eq('email', email)
+        .eq('report_date', latest[0].report_date)
+        .eq('source_airtable_id', latest[0].source_airtable_id);
+
+      return NextResponse.json({
+        reportDate: latest[0].report_date,
+        markers: markers || [],
+        diabeticFindings: (markers || [])
+          .filter(marker => marker.category === 'Diabetic Markers')
+          .map(marker => ({ finding: marker.marker_label, value: marker.value_text }))
+      });
+    }
+
+    // Not synced yet: fall back to the doctors intake table
     const records = await base(process.env.AIRTABLE_TABLE_NAME!)
       .select({
         filterByFormula: `{email} = '${email}'`,
@@ -0,0 +1,43 @@
+import { NextResponse } from 'next/server';
+import { createServerClient } from '@/lib/supabase/server';
+
+// Per-user dashboard document maintained by `python -m genos_sync sync
+// --dashboard-snapshots`: profile, latest measurements, tolerance lists and
+// medical conditions in a single primary-key read
+export async function GET(request: Request) {
+  try {
+    const { searchParams } = new URL(request.url);
+    const email = searchParams.get('email');
+
+    if (!email) {
+      return NextResponse.json({ error: 'Email is required' }, { status: 400 });
+    }
+
+    const supabase = createServerClient();
+    const { data, error } = await supabase
+      .from('user_dashboard_snapshots')
+      .select('snapshot, version, revision, built_at')
+      .eq('email', email)
+      .maybeSingle();
+
+    if (error) {
+      throw error;
+    }
+
+    if (!data) {
+      return NextResponse.json({ error: 'Snapshot not found' }, { status: 404 });
+    }
+
+    return NextResponse.json({
+      ...data.snapshot,
+      revision: data.revision,
+      builtAt: data.built_at,
+    });
+  } catch (error) {
+    console.error('Error fetching dashboard snapshot:', error);
+    return NextResponse.json(
+      { error: 'Failed to fetch dashboard snapshot' },
+      { status: 500 }
+    );
+  }
+}
@@ -2,6 +2,115 @@ import { airtableBase } from '@/lib/airtable';
 import { NextResponse } from 'next/server';
 import { createServerClient } from '@/lib/supabase/server';
 
+// Phase / meal type as stored in recipe_eligibility: 'Low-Carb Reintroductions Phase' -> 'low_carb_reintroductions'
+function eligibilityKey(value: string | null): string {
+  if (!value || value === 'all') {
+    return 'any';
+  }
+  return value
+    .trim()
+    .toLowerCase()
+    .replace(/ phase$/, '')
+    .replace(/[^a-z0-9]+/g, '_')
+    .replace(/^_+|_+$/g, '');
+}
+
+type RecipeCard = {
+  id: string;
+  name: string;
+  image: string;
+  ingredients: string[];
+  instructions: string;
+  calories: number;
+  carbs: number;
+  proteins: number;
+  fats: number;
+  dietType: string[];
+  mealType: string;
+  phase: string;
+  proteinMealType: string;
+};
+
+const CATALOG_PAGE_SIZE = 1000;
+
+// Every card in recipe_catalog, in pages so PostgREST's row cap can't truncate
+// the list; empty until the sync has stored cards (migration 018)
+async function loadCatalog(supabase: ReturnType<typeof createServerClient>): Promise<RecipeCard[]> {
+  const cards: RecipeCard[] = [];
+  for (let start = 0; ; start += CATALOG_PAGE_SIZE) {
+    const { data, error } = await supabase
+      .from('recipe_catalog')
+      .select('recipe_airtable_id, display')
+      .order('name')
+      .order('recipe_airtable_id')
+      .range(start, start + CATALOG_PAGE_SIZE - 1);
+    if (error) {
+      throw error;
+    }
+    const page = data || [];
+    for (const row of page) {
+      // Rows from before migration 018 have no card yet
+      if (!row.display?.id) {
+        return [];
+      }
+      cards.push(row.display as RecipeCard);
+    }
+    if (page.length < CATALOG_PAGE_SIZE) {
+      return cards;
+    }
+  }
+}
+
+// Fallback for a catalogue that hasn't been synced yet; builds the same cards
+// as recipe_display() in genos_sync/recipe_eligibility.py
+async function loadAirtableRecipes(): Promise<RecipeCard[]> {
+  const records = await airtableBase('Recipes').select({
+    fields: [
+      'Recipe Name',
+      'Dish Image',
+      'Ingredients',
+      'Instructions',
+      'Calories',
+      'Carbs',
+      'Proteins',
+      'Fats',
+      'Diet Type',
+      'Meal Type',
+      'Phase',
+      'Protein/Non-Protein Meal'
+    ]
+  }).all();
+
+  const first = (value: any) => (Array.isArray(value) ? value[0] : value);
+
+  return records.map(record => {
+    const fields = record.fields as Record<string, any>;
+    const imageField = first(fields['Dish Image']);
+    let imageUrl = '';
+    if (typeof imageField === 'object' && imageField?.url) {
+      imageUrl = imageField.url;
+    } else if (typeof imageField === 'string') {
+      imageUrl = imageField;
+    }
+
+    return {
+      id: record.id,
+      name: fields['Recipe Name'] || '',
+      image: imageUrl,
+      ingredients: fields['Ingredients'] ? String(fields['Ingredients']).split('\n').map(i => i.trim().replace(/^[-–—]/, '').trim()).filter(i => i) : [],
+      instructions: fields['Instructions'] || '',
+      calories: fields['Calories'] || 0,
+      carbs: fields['Carbs'] || 0,
+      proteins: fields['Proteins'] || 0,
+      fats: fields['Fats'] || 0,
+      dietType: Array.isArray(fields['Diet Type']) ? fields['Diet Type'] : [fields['Diet Type'] || ''],
+      mealType: first(fields['Meal Type']) || '',
+      phase: first(fields['Phase']) || '',
+      proteinMealType: first(fields['Protein/Non-Protein Meal']) || ''
+    };
+  });
+}
+
 export async function GET(request: Request) {
   try {
     // Create Supabase server client
@@ -17,97 +126,67 @@ export async function GET(request: Request) {
       );
     }
 
-    const records = await airtableBase('Recipes').select({
-      fields: [
-        'Recipe Name',
-        'Dish Image',
-        'Ingredients',
-        'Instructions',
-        'Calories',
-        'Carbs',
-        'Proteins',
-        'Fats',
-        'Diet Type',
-        'Meal Type',
-        'Phase',
-        'Protein/Non-Protein Meal'
-      ]
-    }).all();
-    
-    const recipes = records.map(record => {
-      // Log raw data for debugging
-      console.log('Raw record data:', {
-        name: record.fields['Recipe Name'],
-        dietType: record.fields['Diet Type'],
-        mealType: record.fields['Meal Type'],
-        phase: {
-          rawValue: record.fields['Phase'],
-          type: typeof record.fields['Phase'],
-          isArray: Array.isArray(record.fields['Phase'])
-        },
-        proteinMeal: record.fields['Protein/Non-Protein Meal'],
-        type: typeof record.fields['Protein/Non-Protein Meal']
-      });
-
-      const imageField = record.fields['Dish Image'];
-      let imageUrl = '';
-
-      // Handle different possible formats of the image field
-      if (Array.isArray(imageField) && imageField[0]?.url) {
-        imageUrl = imageField[0].url;
-      } else if (Array.isArray(imageField)) {
-        imageUrl = imageField[0];
-      } else if (typeof imageField === 'object' && imageField?.url) {
-        imageUrl = imageField.url;
-      } else if (typeof imageField === 'string') {
-        imageUrl = imageField;
-      }
-
-      // Process phase field
-      let phase = '';
-      const phaseField = record.fields['Phase'];
-      if (Array.isArray(phaseField)) {
-        phase = phaseField[0] || '';
-      } else if (typeof phaseField === 'string') {
-        phase = phaseField;
-      }
+    // Recipe cards kept in recipe_catalog by the sync (genos_sync/recipe_eligibility.py);
+    // Airtable is only read while the catalogue has not been built yet
+    const catalog = await loadCatalog(supabase);
+    const cards = catalog.length > 0 ? catalog : await loadAirtableRecipes();
 
-      // Process protein meal field
-      let proteinMealType = '';
-      const proteinMealField = record.fields['Protein/Non-Protein Meal'];
-      if (Array.isArray(proteinMealField)) {
-        proteinMealType = proteinMealField[0] || '';
-      } else if (typeof proteinMealField === 'string') {
-        proteinMealType = proteinMealField;
-      }
+    // Stable mirrored images with thumbnails (python -m genos_sync recipe-images);
+    // recipes not mirrored yet fall back to the Airtable attachment URL
+    const { data: mirroredImages } = await supabase
+      .from('recipe_images')
+      .select('recipe_airtable_id, url, thumbnails');
+    const imagesByRecipe = new Map(
+      (mirroredImages || []).map(image => [image.recipe_airtable_id, image])
+    );
 
-      // Log processed data for debugging
-      const processedRecipe = {
-        id: record.id,
-        name: record.fields['Recipe Name'] || '',
-        image: imageUrl,
-        ingredients: record.fields['Ingredients'] ? String(record.fields['Ingredients']).split('\n').map(i => i.trim().replace(/^[-–—]/, '').trim()).filter(i => i) : [],
-        instructions: record.fields['Instructions'] || '',
-        calories: record.fields['Calories'] || 0,
-        carbs: record.fields['Carbs'] || 0,
-        proteins: record.fields['Proteins'] || 0,
-        fats: record.fields['Fats'] || 0,
-        dietType: Array.isArray(record.fields['Diet Type']) ? record.fields['Diet Type'] : [record.fields['Diet Type'] || ''],
-        mealType: Array.isArray(record.fields['Meal Type']) ? record.fields['Meal Type'][0] : (record.fields['Meal Type'] || ''),
-        phase: phase,
-        proteinMealType: proteinMealType
+    const recipes = cards.map(card => {
+      const mirroredImage = imagesByRecipe.get(card.id);
+      return {
+        ...card,
+        // Cards render at 150-200px wide; the 400px thumbnail covers 2x displays
+        image: mirroredImage?.thumbnails?.['400'] || mirroredImage?.url || card.image,
+        imageLarge: mirroredImage?.url || card.image,
       };
-
-      console.log('Processed recipe:', {
-        name: processedRecipe.name,
-        proteinMealType: processedRecipe.proteinMealType
-      });
-
-      return processedRecipe;
     });
 
-    // Log the processed data
-    console.log('First processed recipe:', recipes[0]);
+    // ?personalised=1 narrows the list to recipes without the user's intolerant
+    // foods, using the index the sync maintains (genos_sync/recipe_eligibility.py)
+    const { searchParams } = new URL(request.url);
+    if (searchParams.get('personalised') === '1') {
+      const phase = eligibilityKey(searchParams.get('phase'));
+      const mealType = eligibilityKey(searchParams.get('mealType'));
+      // Eligibility is keyed by Airtable email: the user's own address plus any
+      // Airtable addresses mapped to it
+      const email = session.user.email || '';
+      const { data: mappings } = await supabase
+        .from('user_mappings')
+        .select('airtable_email')
+        .eq('auth_email', email);
+      const emails = [email, ...(mappings || []).map(mapping => mapping.airtable_email)];
+      const { data: eligibility } = await supabase
+        .from('recipe_eligibility')
+        .select('email, phase, meal_type, recipe_ids')
+        .in('email', emails)
+        .in('phase', [phase, 'any'])
+        .in('meal_type', [mealType, 'any']);
+      const rows = eligibility || [];
+      // Only emails the sync has indexed have an ('any', 'any') row; a recipe
+      // has to be eligible under every one of them
+      const indexed = rows
+        .filter(row => row.phase === 'any' && row.meal_type === 'any')
+        .map(row => row.email);
+      if (indexed.length > 0) {
+        const eligibleIds = indexed.map(indexedEmail => new Set(
+          rows
+            .filter(row => row.email === indexedEmail && row.phase === phase && row.meal_type === mealType)
+            .flatMap(row => row.recipe_ids)
+        ));
+        return NextResponse.json(
+          recipes.filter(recipe => eligibleIds.every(ids => ids.has(recipe.id)))
+        );
+      }
+    }
 
     return NextResponse.json(recipes);
 
@@ -1,12 +1,53 @@
 import { NextRequest, NextResponse } from 'next/server';
-import { createClient } from '@supabase/supabase-js';
+import { createClient, SupabaseClient } from '@supabase/supabase-js';
 
 /**
  * This is an emergency bypass endpoint that fetches data without requiring authentication
  * It directly connects to Supabase using the service role key to bypass RLS policies
+ *
+ * When READ_CACHE_URL is set, responses come from the sync's read cache service
+ * (`python -m genos_sync read-cache`), which keeps them per email and drops them
+ * as soon as the sync changes that email's weight logs. Supabase is only queried
+ * directly if the service is unreachable.
  */
 export const dynamic = 'force-dynamic';
 
+// Reused across requests instead of a new service-role client per call
+let serviceClient: SupabaseClient | null = null;
+
+function getServiceClient() {
+  if (!serviceClient) {
+    serviceClient = createClient(
+      process.env.NEXT_PUBLIC_SUPABASE_URL || '',
+      process.env.SUPABASE_SERVICE_KEY || ''
+    );
+  }
+  return serviceClient;
+}
+
+async function fetchFromReadCache(email: string) {
+  const baseUrl = process.env.READ_CACHE_URL;
+  if (!baseUrl) {
+    return null;
+  }
+  try {
+    const response = await fetch(`${baseUrl}/user-data?email=${encodeURIComponent(email)}`, {
+      headers: process.env.READ_CACHE_TOKEN ? { Authorization: `Bearer ${process.env.READ_CACHE_TOKEN}` } : {},
+      cache: 'no-store',
+    });
+    if (!response.ok) {
+      console.error('Read cache returned', response.status);
+      return null;
+    }
+    return new NextResponse(response.body, {
+      headers: { 'Content-Type': 'application/json', 'X-Cache': response.headers.get('X-Cache') || 'MISS' },
+    });
+  } catch (error) {
+    console.error('Read cache unavailable, querying Supabase directly:', error);
+    return null;
+  }
+}
+
 export async function GET(req: NextRequest) {
   // Get the email from the query parameter
   const email = req.nextUrl.searchParams.get('email');
@@ -18,19 +59,21 @@ export async function GET(req: NextRequest) {
     );
   }
   
+  const cached = await fetchFromReadCache(email);
+  if (cached) {
+    return cached;
+  }
+
   try {
     // Direct connection with service role key to bypass RLS
-    const supabase = createClient(
-      process.env.NEXT_PUBLIC_SUPABASE_URL || '',
-      process.env.SUPABASE_SERVICE_KEY || ''
-    );
+    const supabase = getServiceClient();
     
     // Fetch weight logs data
     const { data: weightData, error: weightError } = await supabase
       .from('weight_logs')
       .select('*')
       .eq('email', email)
-      .order('day_of_program', { ascending: true });
+      .order('program_day', { ascending: true });
       
     if (weightError) {
       console.error('Error fetching weight data:', weightError);
@@ -37,6 +37,7 @@ interface Recipe {
   id: string;
   name: string;
   image: string;
+  imageLarge?: string;
   ingredients: string;
   instructions: string;
   calories: number;
@@ -91,7 +92,8 @@ async function fetchRecipes(): Promise<Recipe[]> {
     console.log('Fetching recipes from API...');
     
     // Add credentials to ensure the auth cookie is sent
-    const response = await fetch('/api/recipes', {
+    // Only recipes without the client's intolerant foods (when the sync has indexed them)
+    const response = await fetch('/api/recipes?personalised=1', {
       credentials: 'include'
     });
     
@@ -1220,7 +1222,7 @@ export default function PlatePlanner() {
                     }}
                   >
                     <Image 
-                      src={selectedRecipe.image || '/placeholder-recipe.jpg'}
+                      src={selectedRecipe.imageLarge || selectedRecipe.image || '/placeholder-recipe.jpg'}
                       alt={selectedRecipe.name}
                       fill
                       style={{ 
@@ -82,8 +82,8 @@ export default function GenosJourneyWidget() {
         // Process the data in the same way as the original function
         let processedData = data.weightData.map((entry: any) => {
           const dayText = entry.day_of_program || '';
-          // Extract numeric value from day text (remove all non-digit characters)
-          const dayNumber = parseInt(dayText.replace(/\D/g, '')) || 0;
+          // Prefer the program day parsed by the sync; fall back to the day text
+          const dayNumber = entry.program_day ?? (parseInt(dayText.replace(/\D/g, '')) || 0);
           const weight = parseFloat(entry.weight_recorded || '0') || 0;
           const foodItem = entry.food_item_introduced || null;
           
@@ -163,7 +163,7 @@ export default function GenosJourneyWidget() {
             .from('weight_logs')
             .select('*')
             .eq('email', userData.email)
-            .order('day_of_program', { ascending: true });
+            .order('program_day', { ascending: true });
 
           if (error) {
             console.error('Supabase error details:', error);
@@ -185,8 +185,8 @@ export default function GenosJourneyWidget() {
           // Extract and process data first
           let processedData = data?.map((entry: any) => {
             const dayText = entry.day_of_program || '';
-            // Extract numeric value from day text (remove all non-digit characters)
-            const dayNumber = parseInt(dayText.replace(/\D/g, '')) || 0;
+            // Prefer the program day parsed by the sync; fall back to the day text
+            const dayNumber = entry.program_day ?? (parseInt(dayText.replace(/\D/g, '')) || 0);
             const weight = parseFloat(entry.weight_recorded || '0') || 0;
             const foodItem = entry.food_item_introduced || null;
             
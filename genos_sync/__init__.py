@@ -0,0 +1,10 @@
+"""Airtable -> Supabase sync for the Genos app.
+
+Importing the package has no side effects: settings are read explicitly with
+``SyncConfig.from_env()`` and API clients are only built when first used.
+Run ``python -m genos_sync --help`` for the command line interface.
+"""
+
+from genos_sync.config import ConfigError, SyncConfig
+
+__all__ = ['ConfigError', 'SyncConfig']
@@ -0,0 +1,84 @@
+# backfill.py - Populate weight_logs columns from the archived raw_fields payload
+#
+# No Airtable requests are made: every archived row is turned back into the
+# record it was synced from (fields plus createdTime) and run through the same
+# RecordStore conversion and quarantine checks as the sync itself.
+
+import logging
+
+from genos_sync.records import RecordStore
+from genos_sync.transform import FIELD_MAPPING, map_fields
+from genos_sync.validation import METRIC_RANGES, quarantine_store
+
+logger = logging.getLogger('airtable-supabase-backfill')
+
+PAGE_SIZE = 500
+
+def fetch_archived_pages(supabase_client, table_name='weight_logs', page_size=PAGE_SIZE):
+    """Yield pages of (airtable_id, airtable_created_time, raw_fields) rows using keyset pagination"""
+    last_id = ''
+    while True:
+        response = supabase_client.table(table_name) \
+            .select('airtable_id,airtable_created_time,raw_fields') \
+            .gt('airtable_id', last_id) \
+            .not_.is_('raw_fields', 'null') \
+            .order('airtable_id') \
+            .limit(page_size) \
+            .execute()
+        rows = response.data or []
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1]['airtable_id']
+
+def archived_records(rows):
+    """The Airtable records a page of archived rows was synced from"""
+    return [
+        {'id': row['airtable_id'], 'createdTime': row.get('airtable_created_time'), 'fields': row['raw_fields'] or {}}
+        for row in rows
+    ]
+
+def backfill_updates(supabase_client, table_name, rows, columns):
+    """Upsert payloads re-deriving the given columns for a page of archived rows"""
+    mapped_columns = {'email', *FIELD_MAPPING}
+    extra_columns = [column for column in columns if column not in mapped_columns]
+    store = RecordStore.from_records(archived_records(rows))
+    if not METRIC_RANGES.keys().isdisjoint(columns):
+        # A page holds scattered logs rather than whole histories, so spikes aren't re-judged
+        quarantine_store(supabase_client, table_name, store, spikes=False)
+    updates = []
+    # last_synced marks these as sync writes, not app edits to push back to Airtable
+    for row, update in zip(rows, store.rows(0, len(store), {*columns, 'last_synced'})):
+        if extra_columns:
+            update.update(map_fields(row['raw_fields'] or {}, extra_columns))
+        if update.get('recorded_on', '') is None and not row.get('airtable_created_time'):
+            # Archived before createdTime was kept: keep the stored date rather than blanking it
+            del update['recorded_on']
+        if len(update) > 2:
+            updates.append(update)
+    return updates
+
+def backfill_columns(supabase_client, columns, table_name='weight_logs', page_size=PAGE_SIZE):
+    """Re-derive the given columns for every archived row and upsert them"""
+    if columns == 'all':
+        columns = ['email', *FIELD_MAPPING]
+
+    total = 0
+    for rows in fetch_archived_pages(supabase_client, table_name, page_size):
+        updates = backfill_updates(supabase_client, table_name, rows, columns)
+
+        # Upserts only touch the columns present in the payload, and a bulk
+        # upsert needs the same keys in every row
+        groups = {}
+        for update in updates:
+            groups.setdefault(tuple(update), []).append(update)
+        for group in groups.values():
+            supabase_client.table(table_name).upsert(
+                group,
+                on_conflict='airtable_id'
+            ).execute()
+        total += len(updates)
+        logger.info(f"Backfilled {len(updates)} rows (total {total})")
+
+    logger.info(f"Backfill completed for {', '.join(columns)}: {total} rows updated")
+    return total
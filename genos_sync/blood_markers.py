@@ -0,0 +1,213 @@
+# blood_markers.py - Blood Reports table -> long-format public.blood_markers
+#
+# Each Blood Reports record holds one report as wide "... Findings" fields
+# (and a bare "Diabetic Markers" field, which app/api/blood-report/route.ts
+# prefers over "Diabetic Markers Findings"), whose bulleted lines look like
+# "• HbA1c (6.2 %)". Lines are matched the way the route matches them: only
+# lines starting with '•', marker up to the first parenthesised value. They
+# are parsed into one typed row
+# per (email, marker, report date, report record) with the numeric value,
+# unit, reference range and an out-of-range flag computed here, so marker
+# history and trends are index lookups instead of a live Airtable formula
+# scan per dashboard view.
+#
+# Runs are incremental through sync_metadata, like the weight log sync; a
+# report's rows are replaced whenever its Airtable record changes. Deleted
+# reports are invisible to a delta fetch, so full runs, which see every
+# report, remove the rows of reports no longer in Airtable.
+
+import re
+import logging
+from datetime import datetime, timezone
+
+from genos_sync.email_mapping import fetch_all
+from genos_sync.sync import get_last_sync_time, iter_airtable_pages, update_sync_metadata
+from genos_sync.transform import chunk_list, normalize_email, parse_date
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+METADATA_KEY = 'blood_markers'
+FINDINGS_SUFFIXES = (' Findings', ' Finding')
+# Findings fields without the suffix; each is its own category
+BARE_FINDINGS_FIELDS = ('Diabetic Markers',)
+FINDING_PATTERN = re.compile(r'^•\s*(?P<marker>.*?)\s*\((?P<value>.*?)\)')
+VALUE_PATTERN = re.compile(r'(?P<number>[<>]?\s*-?\d+(?:\.\d+)?)\s*(?P<unit>[^\d\s].*)?$')
+MARKER_KEY_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# marker key -> (low, high, unit); None means unbounded on that side.
+# Adult reference ranges as commonly reported by Indian labs; aliases below.
+REFERENCE_RANGES = {
+    'hba1c': (4.0, 5.6, '%'),
+    'fasting_blood_sugar': (70, 99, 'mg/dL'),
+    'post_prandial_blood_sugar': (70, 139, 'mg/dL'),
+    'fasting_insulin': (2.6, 24.9, 'µIU/mL'),
+    'haemoglobin': (12.0, 17.5, 'g/dL'),
+    'tsh': (0.4, 4.0, 'µIU/mL'),
+    'free_t3': (2.0, 4.4, 'pg/mL'),
+    'free_t4': (0.9, 1.7, 'ng/dL'),
+    'ferritin': (20, 250, 'ng/mL'),
+    'serum_iron': (60, 170, 'µg/dL'),
+    'vitamin_d': (30, 100, 'ng/mL'),
+    'vitamin_b12': (200, 900, 'pg/mL'),
+    'creatinine': (0.6, 1.3, 'mg/dL'),
+    'urea': (15, 40, 'mg/dL'),
+    'uric_acid': (3.5, 7.2, 'mg/dL'),
+    'total_cholesterol': (None, 200, 'mg/dL'),
+    'ldl_cholesterol': (None, 100, 'mg/dL'),
+    'hdl_cholesterol': (40, None, 'mg/dL'),
+    'triglycerides': (None, 150, 'mg/dL'),
+    'sgpt': (7, 56, 'U/L'),
+    'sgot': (10, 40, 'U/L'),
+    'sodium': (135, 145, 'mmol/L'),
+    'potassium': (3.5, 5.1, 'mmol/L'),
+    'crp': (None, 5, 'mg/L'),
+}
+
+MARKER_ALIASES = {
+    'hb_a1c': 'hba1c',
+    'glycated_haemoglobin': 'hba1c',
+    'glycated_hemoglobin': 'hba1c',
+    'fbs': 'fasting_blood_sugar',
+    'fasting_glucose': 'fasting_blood_sugar',
+    'fasting_plasma_glucose': 'fasting_blood_sugar',
+    'ppbs': 'post_prandial_blood_sugar',
+    'postprandial_blood_sugar': 'post_prandial_blood_sugar',
+    'hemoglobin': 'haemoglobin',
+    'hb': 'haemoglobin',
+    'ft3': 'free_t3',
+    'ft4': 'free_t4',
+    'iron': 'serum_iron',
+    '25_oh_vitamin_d': 'vitamin_d',
+    'vitamin_d3': 'vitamin_d',
+    'b12': 'vitamin_b12',
+    'serum_creatinine': 'creatinine',
+    'blood_urea': 'urea',
+    'serum_uric_acid': 'uric_acid',
+    'cholesterol': 'total_cholesterol',
+    'ldl': 'ldl_cholesterol',
+    'hdl': 'hdl_cholesterol',
+    'alt': 'sgpt',
+    'ast': 'sgot',
+    'hs_crp': 'crp',
+    'c_reactive_protein': 'crp',
+}
+
+def marker_key(name):
+    """Canonical marker key: 'HbA1c' -> 'hba1c', 'Vitamin D3' -> 'vitamin_d'"""
+    key = MARKER_KEY_PATTERN.sub('_', name.lower()).strip('_')
+    return MARKER_ALIASES.get(key, key)
+
+def parse_value(text):
+    """(numeric value, unit) from '6.2 %', '110mg/dL' or '<5 mg/L'; value is None if not numeric"""
+    match = VALUE_PATTERN.search(text.strip())
+    if not match:
+        return None, None
+    number = match.group('number').lstrip('<> ')
+    unit = (match.group('unit') or '').strip() or None
+    return float(number), unit
+
+def reference_flag(key, value, unit):
+    """(low, high, flag) for a marker value; flag is None when no comparable range is known"""
+    reference = REFERENCE_RANGES.get(key)
+    if reference is None or value is None:
+        return None, None, None
+    low, high, reference_unit = reference
+    if unit and unit.lower() != reference_unit.lower():
+        return low, high, None
+    if low is not None and value < low:
+        return low, high, 'low'
+    if high is not None and value > high:
+        return low, high, 'high'
+    return low, high, 'normal'
+
+def findings_lines(value):
+    if isinstance(value, list):
+        return [line for item in value if isinstance(item, str) for line in item.split('\n')]
+    return value.split('\n') if isinstance(value, str) else []
+
+def findings_fields(fields):
+    """category -> findings value of a report, preferring a bare field over its '... Findings' variant"""
+    found = {}
+    for field_name, value in fields.items():
+        if field_name.endswith(FINDINGS_SUFFIXES):
+            found.setdefault(field_name.rsplit(' ', 1)[0], value)
+    for field_name in BARE_FINDINGS_FIELDS:
+        if fields.get(field_name):
+            found[field_name] = fields[field_name]
+    return found
+
+def marker_rows(record, synced_at):
+    """blood_markers rows for one Blood Reports record"""
+    fields = record.get('fields', {})
+    email = normalize_email(fields.get('email') or fields.get('Email'))
+    if not email:
+        return []
+    report_date = (
+        parse_date(fields.get('Report Date')) or parse_date(fields.get('Date'))
+        or parse_date(record.get('createdTime'))
+    )
+    rows = {}
+    for category, value in findings_fields(fields).items():
+        for line in findings_lines(value):
+            match = FINDING_PATTERN.match(line.strip())
+            if not match or not match.group('marker'):
+                continue
+            marker = match.group('marker')
+            key = marker_key(marker)
+            number, unit = parse_value(match.group('value'))
+            low, high, flag = reference_flag(key, number, unit)
+            rows[key] = {
+                'email': email,
+                'report_date': report_date,
+                'marker': key,
+                'marker_label': marker,
+                'category': category,
+                'value': number,
+                'value_text': match.group('value').strip(),
+                'unit': unit or (REFERENCE_RANGES[key][2] if key in REFERENCE_RANGES and number is not None else None),
+                'ref_low': low,
+                'ref_high': high,
+                'flag': flag,
+                'source_airtable_id': record['id'],
+                'synced_at': synced_at,
+            }
+    return list(rows.values())
+
+def prune_deleted_reports(supabase_client, live_ids, chunk_size=100):
+    """Delete the rows of reports no longer in Airtable; returns how many reports were removed"""
+    stored = {
+        row['source_airtable_id'] for row in fetch_all(
+            lambda: supabase_client.table('blood_markers').select('source_airtable_id'),
+            ('email', 'marker', 'report_date', 'source_airtable_id'),
+        )
+    }
+    deleted = sorted(stored - live_ids)
+    for chunk in chunk_list(deleted, chunk_size):
+        supabase_client.table('blood_markers').delete().in_('source_airtable_id', chunk).execute()
+    return len(deleted)
+
+def sync_blood_markers(supabase_client, airtable, incremental=True, batch_size=50):
+    """Replace the blood_markers rows of every Blood Reports record changed since the last run"""
+    sync_time = datetime.now(timezone.utc).isoformat()
+    last_sync = get_last_sync_time(supabase_client, METADATA_KEY) if incremental else None
+
+    reports = markers = 0
+    seen_ids = set()
+    for page in iter_airtable_pages(airtable, last_sync):
+        for batch in chunk_list(page, batch_size):
+            rows = [row for record in batch for row in marker_rows(record, sync_time)]
+            supabase_client.table('blood_markers').delete().in_(
+                'source_airtable_id', [record['id'] for record in batch]
+            ).execute()
+            if rows:
+                supabase_client.table('blood_markers').upsert(
+                    rows, on_conflict='email,marker,report_date,source_airtable_id'
+                ).execute()
+            seen_ids.update(record['id'] for record in batch)
+            reports += len(batch)
+            markers += len(rows)
+
+    deleted = 0 if last_sync else prune_deleted_reports(supabase_client, seen_ids)
+    update_sync_metadata(supabase_client, METADATA_KEY, sync_time, changed=reports if last_sync else None)
+    logger.info(f"Blood markers: {markers} markers from {reports} changed reports, {deleted} deleted reports removed")
+    return True
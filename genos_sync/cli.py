@@ -0,0 +1,371 @@
+# cli.py - Single command line entry point for the sync tooling
+#
+#   python -m genos_sync sync [--incremental] [--cell-format string] [--profile]
+#   python -m genos_sync backfill --column weight_recorded | --all
+#   python -m genos_sync migrate {status,apply,baseline,check} [--target NNN]
+#   python -m genos_sync verify [--repair] [--delete-extra]
+#   python -m genos_sync write-back [--dry-run]
+#   python -m genos_sync snapshot [--dir snapshots] [--full] [--table weight_logs]
+#   python -m genos_sync provision [--users users.json] [--concurrency 8]
+#   python -m genos_sync recipe-images [--force]
+#   python -m genos_sync recipe-eligibility [--all]
+#   python -m genos_sync blood-markers [--full]
+#   python -m genos_sync dashboard-snapshots [--full]
+#   python -m genos_sync export --email client@example.com [--format csv|ndjson|xlsx] [--output path]
+#   python -m genos_sync history --as-of 2025-03-01T00:00:00Z [--email client@example.com] [--output path]
+#   python -m genos_sync history --record AIRTABLE_ID
+#   python -m genos_sync export-server [--host 127.0.0.1] [--port 8765]
+#   python -m genos_sync read-cache [--host 127.0.0.1] [--port 8766] [--pool-size 4]
+#   python -m genos_sync quarantine [--release AIRTABLE_ID [--column weight_recorded]]
+#   python -m genos_sync schedule [--once | --plan]
+#   python -m genos_sync plan [--full] [--execute] [--allow-full-scan]
+#   python -m genos_sync orchestrate [--tenants tenants.json] [--workers 8] [--once]
+#
+# Only the modules a command needs are imported, so short targeted runs
+# don't pay for the whole pipeline. `python -X importtime -m genos_sync ...`
+# shows where any remaining startup time goes.
+
+import sys
+import time
+import logging
+import argparse
+
+_STARTED = time.perf_counter()
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='genos_sync', description="Airtable -> Supabase sync tooling")
+    parser.add_argument('--log-level', default='INFO', help="DEBUG, INFO, WARNING, ERROR")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sync = commands.add_parser('sync', help="Sync weight logs from Airtable to Supabase")
+    sync.add_argument('--incremental', action='store_true',
+                      help="Only fetch records modified since the last successful sync")
+    sync.add_argument('--cell-format', choices=['json', 'string'], default='json',
+                      help="'string' returns linked records as text instead of record IDs")
+    sync.add_argument('--profile', action='store_true',
+                      help="Write per-stage CPU/allocation reports (see also SYNC_PROFILE_SAMPLE_RATE)")
+    sync.add_argument('--profile-dir', help="Directory for profile reports (default: profiles/)")
+    sync.add_argument('--write-back', action='store_true',
+                      help="Push pending app edits to Airtable before fetching")
+    sync.add_argument('--recipe-images', action='store_true',
+                      help="Also mirror changed recipe dish images and thumbnails")
+    sync.add_argument('--recipe-eligibility', action='store_true',
+                      help="Refresh the recipe eligibility index for users touched by the sync")
+    sync.add_argument('--dashboard-snapshots', action='store_true',
+                      help="Rebuild the dashboard snapshots of users touched by the sync")
+    sync.add_argument('--blood-markers', action='store_true',
+                      help="Also ingest changed Blood Reports into blood_markers")
+    sync.add_argument('--snapshot-dir',
+                      help="Write a Parquet snapshot here after the sync (default: SYNC_SNAPSHOT_DIR, off if unset)")
+
+    backfill = commands.add_parser('backfill', help="Populate columns from archived raw_fields")
+    backfill.add_argument('--column', action='append', default=[], help="Column to populate (repeatable)")
+    backfill.add_argument('--all', action='store_true', help="Re-derive every mapped column")
+    backfill.add_argument('--page-size', type=int, default=500)
+
+    migrate = commands.add_parser('migrate', help="Apply versioned schema migrations")
+    migrate.add_argument('action', nargs='?', default='apply', choices=['status', 'apply', 'baseline', 'check'])
+    migrate.add_argument('--target', help="Stop at this migration version")
+
+    verify = commands.add_parser('verify', help="Detect (and repair) drift between Airtable and Supabase")
+    verify.add_argument('--leaf-size', type=int, default=64,
+                        help="Compare rows directly once a mismatching range has at most this many")
+    verify.add_argument('--repair', action='store_true', help="Re-upsert missing and changed rows from Airtable")
+    verify.add_argument('--delete-extra', action='store_true',
+                        help="Delete Supabase rows whose Airtable record no longer exists")
+
+    write_back = commands.add_parser('write-back', help="Push app edits from Supabase back to Airtable")
+    write_back.add_argument('--dry-run', action='store_true', help="Log the PATCHes without sending them")
+
+    snapshot = commands.add_parser('snapshot', help="Export changed partitions of the synced tables to Parquet")
+    snapshot.add_argument('--dir', help="Snapshot directory (default: SYNC_SNAPSHOT_DIR or snapshots/)")
+    snapshot.add_argument('--full', action='store_true', help="Rewrite every partition and drop stale ones")
+    snapshot.add_argument('--table', action='append', help="Only export this table (repeatable)")
+
+    provision = commands.add_parser('provision', help="Create auth users from a users.json export")
+    provision.add_argument('--users', default='users.json', help="Path to the users export")
+    provision.add_argument('--journal', help="Progress journal (default: <users>.journal.jsonl)")
+    provision.add_argument('--concurrency', type=int, default=8, help="Accounts created in parallel")
+
+    recipe_images = commands.add_parser('recipe-images', help="Mirror recipe dish images and thumbnails")
+    recipe_images.add_argument('--force', action='store_true', help="Re-download and re-upload every image")
+
+    eligibility = commands.add_parser('recipe-eligibility', help="Refresh the per-user recipe eligibility index")
+    eligibility.add_argument('--all', action='store_true',
+                             help="Check every user with intolerances, not only already-indexed ones")
+
+    blood_markers = commands.add_parser('blood-markers', help="Ingest Blood Reports into the blood_markers table")
+    blood_markers.add_argument('--full', action='store_true', help="Re-read every report and drop the markers of deleted ones")
+
+    dashboard = commands.add_parser('dashboard-snapshots', help="Rebuild per-user dashboard snapshot documents")
+    dashboard.add_argument('--full', action='store_true',
+                           help="Rebuild every mapped user from all intake records, not only changed ones")
+
+    export = commands.add_parser('export', help="Export one client's weight logs in program-day order")
+    export.add_argument('--email', required=True, help="Client email as stored in weight_logs")
+    export.add_argument('--format', choices=['csv', 'ndjson', 'xlsx'], default='csv')
+    export.add_argument('--output', help="Output file (default: weight_logs_<email>.<format>)")
+
+    history = commands.add_parser('history', help="Read weight logs as they were at a point in time")
+    history_mode = history.add_mutually_exclusive_group(required=True)
+    history_mode.add_argument('--as-of', metavar='TIMESTAMP', help="Export every row as it was at this moment (NDJSON)")
+    history_mode.add_argument('--record', metavar='AIRTABLE_ID', help="List the versions of one weight log")
+    history.add_argument('--email', help="With --as-of, only this client's rows")
+    history.add_argument('--output', help="With --as-of, output file (default: weight_logs_as_of_<timestamp>.ndjson)")
+
+    export_server = commands.add_parser('export-server', help="Serve weight log exports over HTTP")
+    export_server.add_argument('--host', default='127.0.0.1',
+                               help="Interface to bind; set EXPORT_SERVICE_TOKEN before exposing it")
+    export_server.add_argument('--port', type=int, default=8765)
+
+    read_cache = commands.add_parser('read-cache', help="Serve per-email user data from an in-memory cache")
+    read_cache.add_argument('--host', default='127.0.0.1',
+                            help="Interface to bind; set READ_CACHE_TOKEN before exposing it")
+    read_cache.add_argument('--port', type=int, default=8766)
+    read_cache.add_argument('--pool-size', type=int, default=4, help="Postgres connections for cache misses")
+
+    quarantine = commands.add_parser('quarantine', help="List or release measurements held back as implausible")
+    quarantine.add_argument('--release', metavar='AIRTABLE_ID', help="Restore the quarantined values of this weight log")
+    quarantine.add_argument('--column', help="Only release this column")
+
+    schedule = commands.add_parser('schedule', help="Poll each table as often as its change rate warrants")
+    schedule_mode = schedule.add_mutually_exclusive_group()
+    schedule_mode.add_argument('--once', action='store_true', help="Run the jobs that are due, then exit (for cron)")
+    schedule_mode.add_argument('--plan', action='store_true', help="Only log the current schedule decisions")
+
+    plan = commands.add_parser('plan', help="Estimate the requests, bytes and row changes of a sync without running it")
+    plan.add_argument('--full', action='store_true', help="Plan a full sync instead of an incremental one")
+    plan.add_argument('--execute', action='store_true', help="Run the planned sync afterwards")
+    plan.add_argument('--allow-full-scan', action='store_true',
+                      help="Accept an incremental sync that would fall back to fetching every record")
+
+    orchestrate = commands.add_parser('orchestrate', help="Run the scheduled jobs of many bases and projects in one process")
+    orchestrate.add_argument('--tenants', default='tenants.json', help="Tenants file (default: tenants.json)")
+    orchestrate.add_argument('--workers', type=int, help="Worker threads shared by all tenants (default: from the file, or 4)")
+    orchestrate.add_argument('--once', action='store_true', help="Run every tenant's due jobs, then exit")
+
+    return parser
+
+def run_sync(args, config, clients):
+    from genos_sync.profiling import make_profiler
+    from genos_sync.sync import sync_airtable_to_supabase
+    profiler = make_profiler(args.profile, config.profile_sample_rate, args.profile_dir or config.profile_dir)
+    try:
+        if args.write_back:
+            from genos_sync.write_back import write_back
+            with profiler.stage('write_back'):
+                write_back(config, clients)
+        ok = sync_airtable_to_supabase(
+            config, clients,
+            incremental=args.incremental,
+            cell_format=None if args.cell_format == 'json' else args.cell_format,
+            profiler=profiler,
+            recipe_eligibility=args.recipe_eligibility,
+            dashboard_snapshots=args.dashboard_snapshots,
+        )
+        if ok and args.recipe_images:
+            with profiler.stage('recipe_images'):
+                ok = mirror_recipe_images(config, clients)
+        if ok and args.blood_markers:
+            with profiler.stage('blood_markers'):
+                ok = sync_blood_markers_table(config, clients, incremental=True)
+        snapshot_dir = args.snapshot_dir or config.snapshot_dir
+        if ok and snapshot_dir:
+            from genos_sync.snapshot import export_snapshot
+            with profiler.stage('snapshot'):
+                export_snapshot(clients.db, snapshot_dir)
+        return ok
+    finally:
+        profiler.write_report()
+
+def run_backfill(args, config, clients):
+    from genos_sync.backfill import backfill_columns
+    columns = 'all' if args.all else args.column
+    if not columns:
+        raise SystemExit("backfill: specify at least one --column or --all")
+    backfill_columns(clients.supabase, columns, config.supabase_table_name, args.page_size)
+    return True
+
+def run_migrate(args, config, clients):
+    from genos_sync.migrations import run_migrations
+    if args.action == 'baseline' and not args.target:
+        raise SystemExit("migrate baseline: --target is required")
+    return run_migrations(clients.db, args.action, args.target)
+
+def run_verify(args, config, clients):
+    from genos_sync.verify import verify
+    return verify(config, clients, args.leaf_size, args.repair, args.delete_extra)
+
+def run_write_back(args, config, clients):
+    from genos_sync.write_back import write_back
+    return write_back(config, clients, args.dry_run)
+
+def run_snapshot(args, config, clients):
+    from genos_sync.snapshot import SNAPSHOT_TABLES, export_snapshot
+    unknown = set(args.table or []) - set(SNAPSHOT_TABLES)
+    if unknown:
+        raise SystemExit(f"snapshot: unknown table(s) {', '.join(sorted(unknown))}")
+    export_snapshot(clients.db, args.dir or config.snapshot_dir or 'snapshots', args.table, args.full)
+    return True
+
+def run_provision(args, config, clients):
+    from genos_sync.provision import provision_users
+    return provision_users(clients.supabase, args.users, args.journal, args.concurrency)
+
+def mirror_recipe_images(config, clients, force=False):
+    from genos_sync.recipe_images import LocalBucket, StorageBucket, mirror_recipe_images
+    if config.recipe_image_dir:
+        bucket = LocalBucket(config.recipe_image_dir, config.recipe_image_base_url)
+    else:
+        bucket = StorageBucket(clients.supabase, config.recipe_image_bucket)
+    return mirror_recipe_images(clients.supabase, clients.airtable(config.airtable_recipes_table_name), bucket, force)
+
+def run_recipe_images(args, config, clients):
+    return mirror_recipe_images(config, clients, args.force)
+
+def run_recipe_eligibility(args, config, clients):
+    from genos_sync.recipe_eligibility import refresh_recipe_eligibility
+    refresh_recipe_eligibility(
+        clients.supabase, clients.airtable(config.airtable_recipes_table_name), everyone=args.all
+    )
+    return True
+
+def sync_blood_markers_table(config, clients, incremental):
+    from genos_sync.blood_markers import sync_blood_markers
+    return sync_blood_markers(
+        clients.supabase, clients.airtable(config.airtable_blood_reports_table_name), incremental, config.batch_size
+    )
+
+def run_blood_markers(args, config, clients):
+    return sync_blood_markers_table(config, clients, incremental=not args.full)
+
+def run_dashboard_snapshots(args, config, clients):
+    from genos_sync.dashboard import refresh_dashboard_snapshots
+    from genos_sync.sync import intake_table
+    refresh_dashboard_snapshots(
+        clients.supabase, config.supabase_table_name, intake_table(config, clients),
+        incremental=not args.full, everyone=args.full,
+    )
+    return True
+
+def run_export(args, config, clients):
+    from genos_sync.export import export_filename, export_weight_logs
+    path = args.output or export_filename(args.email, args.format)
+    with open(path, 'wb') as out:
+        count = export_weight_logs(clients.db, args.email, out, args.format)
+    logger.info(f"Wrote {count} rows to {path}")
+    return True
+
+def run_history(args, config, clients):
+    from genos_sync.history import export_as_of, log_versions, versions
+    if args.record:
+        log_versions(args.record, versions(clients.supabase, args.record))
+        return True
+    path = args.output or f"weight_logs_as_of_{''.join(c if c.isalnum() else '_' for c in args.as_of)}.ndjson"
+    with open(path, 'wb') as out:
+        count = export_as_of(clients.db, args.as_of, out, args.email)
+    logger.info(f"Wrote {count} rows to {path}")
+    return True
+
+def run_export_server(args, config, clients):
+    from genos_sync.export import serve_exports
+    config.require('database_url')
+    serve_exports(config.database_url, args.host, args.port, config.export_service_token)
+    return True
+
+def run_read_cache(args, config, clients):
+    from genos_sync.read_cache import serve_read_cache
+    config.require('database_url')
+    serve_read_cache(
+        config.database_url, args.host, args.port, config.read_cache_token,
+        max_bytes=int(config.read_cache_max_mb * 1024 * 1024), pool_size=args.pool_size,
+    )
+    return True
+
+def run_quarantine(args, config, clients):
+    from genos_sync.validation import quarantine_summary, release_quarantined
+    if not args.release:
+        quarantine_summary(clients.supabase)
+        return True
+    from genos_sync.sync import refresh_rollups
+    emails = release_quarantined(clients.supabase, config.supabase_table_name, args.release, args.column)
+    refresh_rollups(clients.supabase, emails)
+    return True
+
+def run_schedule(args, config, clients):
+    from genos_sync.scheduler import run_scheduler
+    return run_scheduler(config, clients, once=args.once, plan_only=args.plan)
+
+def run_plan(args, config, clients):
+    from genos_sync.planner import log_plan, plan_sync
+    plan = plan_sync(config, clients, full=args.full)
+    log_plan(plan)
+    if plan['degraded'] and not args.allow_full_scan:
+        logger.error("Refusing a full scan in place of an incremental sync; pass --allow-full-scan or plan with --full")
+        return False
+    if not args.execute:
+        return True
+    from genos_sync.sync import FullScanRefused, sync_airtable_to_supabase
+    try:
+        return sync_airtable_to_supabase(
+            config, clients, incremental=not args.full, allow_full_scan=args.full or args.allow_full_scan
+        )
+    except FullScanRefused as e:
+        logger.error(str(e))
+        return False
+
+def run_orchestrate(args, config, clients):
+    from genos_sync.orchestrator import run_orchestrator
+    return run_orchestrator(args.tenants, config, workers=args.workers, once=args.once)
+
+COMMANDS = {
+    'sync': run_sync,
+    'backfill': run_backfill,
+    'migrate': run_migrate,
+    'verify': run_verify,
+    'write-back': run_write_back,
+    'snapshot': run_snapshot,
+    'provision': run_provision,
+    'recipe-images': run_recipe_images,
+    'recipe-eligibility': run_recipe_eligibility,
+    'blood-markers': run_blood_markers,
+    'dashboard-snapshots': run_dashboard_snapshots,
+    'export': run_export,
+    'history': run_history,
+    'export-server': run_export_server,
+    'read-cache': run_read_cache,
+    'quarantine': run_quarantine,
+    'schedule': run_schedule,
+    'plan': run_plan,
+    'orchestrate': run_orchestrate,
+}
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.StreamHandler(sys.stdout)
+        ]
+    )
+
+    from genos_sync.clients import Clients
+    from genos_sync.config import ConfigError, SyncConfig
+
+    config = SyncConfig.from_env()
+    clients = Clients(config)
+    logger.debug(f"Ready to run '{args.command}' after {(time.perf_counter() - _STARTED) * 1000:.1f} ms")
+    try:
+        ok = COMMANDS[args.command](args, config, clients)
+    except ConfigError as e:
+        logger.error(str(e))
+        return 2
+    except Exception as e:
+        logger.error(f"Script failed: {e}", exc_info=True)
+        return 1
+    finally:
+        clients.close()
+    return 0 if ok else 1
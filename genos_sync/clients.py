@@ -0,0 +1,84 @@
+# clients.py - Lazily constructed, reused API clients
+#
+# supabase, pyairtable and psycopg2 are imported on first use so that commands
+# which don't need a client (and plain imports of the package) start quickly.
+
+import time
+import logging
+import threading
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart; shared by everything that calls one API"""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class Clients:
+    """Builds each client once per process, the first time it is needed"""
+
+    def __init__(self, config, airtable_limiter=None, supabase=None):
+        self.config = config
+        self._supabase = supabase
+        self._tables = {}
+        self._db = None
+        # Airtable allows 5 requests per second per base, across all of its tables;
+        # the orchestrator passes in one limiter per base shared by its tenants
+        self.airtable_limiter = airtable_limiter or RateLimiter(config.airtable_requests_per_second)
+        # Requests made through these clients, however many share the limiter
+        self.airtable_requests = 0
+
+    @property
+    def supabase(self):
+        if self._supabase is None:
+            self.config.require('supabase_url', 'supabase_key')
+            from supabase import create_client
+            self._supabase = create_client(self.config.supabase_url, self.config.supabase_key)
+        return self._supabase
+
+    def airtable(self, table_name=None):
+        """pyairtable Table for table_name (defaults to the configured weight logs table)"""
+        table_name = table_name or self.config.airtable_table_name
+        if table_name not in self._tables:
+            self.config.require('airtable_api_key', 'airtable_base_id')
+            from pyairtable import Table
+            table = Table(self.config.airtable_api_key, self.config.airtable_base_id, table_name)
+            self._limit(table.api.session)
+            self._tables[table_name] = table
+        return self._tables[table_name]
+
+    def _limit(self, session):
+        """Route every request of an Airtable session through the shared limiter and count it"""
+        send = session.send
+
+        def limited_send(request, **kwargs):
+            self.airtable_limiter.wait()
+            self.airtable_requests += 1
+            return send(request, **kwargs)
+
+        session.send = limited_send
+
+    @property
+    def db(self):
+        """Direct Postgres connection, reopened if it was closed"""
+        if self._db is None or self._db.closed:
+            self.config.require('database_url')
+            import psycopg2
+            self._db = psycopg2.connect(self.config.database_url)
+        return self._db
+
+    def close(self):
+        if self._db is not None and not self._db.closed:
+            self._db.close()
+        self._db = None
@@ -0,0 +1,82 @@
+# config.py - Explicit configuration object for the sync
+#
+# Replaces the module-level globals the scripts used to read from the
+# environment at import time.
+
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+class ConfigError(ValueError):
+    """Raised when a command needs a setting that is not configured"""
+
+@dataclass
+class SyncConfig:
+    airtable_api_key: Optional[str] = None
+    airtable_base_id: Optional[str] = None
+    airtable_table_name: str = 'Weight Logs'
+    airtable_recipes_table_name: str = 'Recipes'
+    airtable_blood_reports_table_name: str = 'Blood Reports'
+    airtable_intake_table_name: Optional[str] = None
+    supabase_url: Optional[str] = None
+    supabase_key: Optional[str] = None
+    database_url: Optional[str] = None
+    supabase_table_name: str = 'weight_logs'
+    batch_size: int = 50
+    airtable_requests_per_second: float = 5.0
+    email_miss_ttl_hours: float = 24.0
+    profile_sample_rate: float = 0.0
+    profile_dir: str = 'profiles'
+    snapshot_dir: Optional[str] = None
+    recipe_image_bucket: str = 'recipe-images'
+    recipe_image_dir: Optional[str] = None
+    recipe_image_base_url: str = '/recipe-images'
+    export_service_token: Optional[str] = None
+    schedule_requests_per_hour: float = 600.0
+    metrics_file: Optional[str] = None
+    read_cache_max_mb: float = 64.0
+    read_cache_token: Optional[str] = None
+
+    @classmethod
+    def from_env(cls, env=None, load_dotenv=True):
+        """Build a config from environment variables (and .env unless disabled)"""
+        if env is None:
+            if load_dotenv:
+                from dotenv import load_dotenv as _load_dotenv
+                _load_dotenv()
+            env = os.environ
+        return cls(
+            airtable_api_key=env.get('AIRTABLE_API_KEY'),
+            airtable_base_id=env.get('AIRTABLE_BASE_ID'),
+            airtable_table_name=env.get('AIRTABLE_TABLE_NAME') or 'Weight Logs',
+            airtable_recipes_table_name=env.get('AIRTABLE_RECIPES_TABLE_NAME') or 'Recipes',
+            airtable_blood_reports_table_name=env.get('AIRTABLE_BLOOD_REPORTS_TABLE') or 'Blood Reports',
+            airtable_intake_table_name=env.get('AIRTABLE_INTAKE_TABLE') or None,
+            supabase_url=env.get('SUPABASE_URL'),
+            supabase_key=env.get('SUPABASE_SERVICE_KEY'),
+            database_url=env.get('DATABASE_URL'),
+            supabase_table_name=env.get('SUPABASE_TABLE_NAME') or 'weight_logs',
+            batch_size=int(env.get('BATCH_SIZE') or 50),
+            airtable_requests_per_second=float(env.get('AIRTABLE_REQUESTS_PER_SECOND') or 5),
+            email_miss_ttl_hours=float(env.get('EMAIL_MAPPING_MISS_TTL_HOURS') or 24),
+            profile_sample_rate=float(env.get('SYNC_PROFILE_SAMPLE_RATE') or 0),
+            profile_dir=env.get('SYNC_PROFILE_DIR') or 'profiles',
+            snapshot_dir=env.get('SYNC_SNAPSHOT_DIR') or None,
+            recipe_image_bucket=env.get('RECIPE_IMAGE_BUCKET') or 'recipe-images',
+            recipe_image_dir=env.get('RECIPE_IMAGE_DIR') or None,
+            recipe_image_base_url=env.get('RECIPE_IMAGE_BASE_URL') or '/recipe-images',
+            export_service_token=env.get('EXPORT_SERVICE_TOKEN') or None,
+            schedule_requests_per_hour=float(env.get('SYNC_SCHEDULE_REQUESTS_PER_HOUR') or 600),
+            metrics_file=env.get('SYNC_METRICS_FILE') or None,
+            read_cache_max_mb=float(env.get('READ_CACHE_MAX_MB') or 64),
+            read_cache_token=env.get('READ_CACHE_TOKEN') or None,
+        )
+
+    def require(self, *names):
+        """Raise ConfigError unless every named setting is present"""
+        missing = [name for name in names if not getattr(self, name)]
+        if missing:
+            raise ConfigError(
+                f"Missing required settings: {', '.join(name.upper() for name in missing)}. "
+                "Please check your .env file."
+            )
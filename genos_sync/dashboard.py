@@ -0,0 +1,165 @@
+# dashboard.py - Per-user dashboard snapshot documents
+#
+# The dashboard widgets each fetched their own slice of Airtable and Supabase
+# on load. The sync now keeps one JSONB document per user in
+# public.user_dashboard_snapshots (profile, latest measurements, tolerance
+# lists, medical conditions), so a dashboard load is one primary-key read.
+#
+# Snapshots are rebuilt only for users whose sources changed: emails touched
+# by the weight log sync and intake records modified since the last run.
+# Sections whose source didn't change are carried over from the stored
+# snapshot, and a rebuilt document is only written (with its revision bumped)
+# if its content hash differs.
+
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from genos_sync.email_mapping import fetch_all
+from genos_sync.sync import get_last_sync_time, iter_airtable_pages, update_sync_metadata
+from genos_sync.transform import chunk_list, normalize_email
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+METADATA_KEY = 'user_dashboard_snapshots'
+# Bump when the document layout changes; older documents are rebuilt
+SNAPSHOT_VERSION = 1
+
+# Snapshot key -> intake form field, as read by app/api/profile/route.ts
+PROFILE_FIELDS = {
+    'firstName': 'Your First Name',
+    'lastName': 'Your Last Name',
+    'gender': 'Your Gender',
+    'age': 'Your Age',
+    'height': 'Your Height in centimeters (cm)',
+    'weight': 'Your Weight in kilograms (kg)',
+    'weightLossTarget': 'Weight Loss Target',
+    'healthObjective': 'What is your Health Objective',
+    'dietPreference': 'What is your Diet Preference',
+    'country': 'Country',
+}
+
+# Snapshot key -> intake form field, as read by MedicalConditionsGrid
+CONDITION_FIELDS = {
+    'current': 'Conditions from Intake Form',
+    'diagnosed': 'Diagnosed Conditions',
+    'history': 'Medical History',
+}
+
+def intake_email(record):
+    fields = record.get('fields', {})
+    return normalize_email(fields.get('Email') or fields.get('email'))
+
+def parse_conditions(text):
+    """'• Condition: status' bullet lines -> [{'condition', 'status'}]"""
+    conditions = []
+    for line in (text or '').split('\n'):
+        line = line.strip()
+        if not line.startswith('•'):
+            continue
+        condition, _, status = line[1:].strip().partition(':')
+        conditions.append({'condition': condition.strip(), 'status': status.strip() or condition.strip()})
+    return conditions
+
+def profile_section(record):
+    fields = record.get('fields', {})
+    return {key: fields.get(field_name) for key, field_name in PROFILE_FIELDS.items()}
+
+def conditions_section(record):
+    fields = record.get('fields', {})
+    return {key: parse_conditions(fields.get(field_name)) for key, field_name in CONDITION_FIELDS.items()}
+
+def latest_measurements(supabase_client, table_name, emails, chunk_size=100):
+    """email -> most recent dated weight log, one indexed LIMIT 1 lookup per email
+    (latest_weight_logs(), migrations/019_latest_weight_logs.sql)"""
+    latest = {}
+    for chunk in chunk_list(sorted(emails), chunk_size):
+        response = supabase_client.rpc('latest_weight_logs', {'p_emails': chunk, 'p_table': table_name}).execute()
+        for row in response.data or []:
+            latest[row.pop('email')] = row
+    return latest
+
+def tolerance_lists(supabase_client, emails):
+    """email -> {'tolerant': [...], 'intolerant': [...], 'introduced': [...]} food labels"""
+    lists = {email: {'tolerant': set(), 'intolerant': set(), 'introduced': set()} for email in emails}
+    for chunk in chunk_list(sorted(emails), 100):
+        rows = fetch_all(lambda: supabase_client.table('weight_log_food_items')
+                         .select('email,status,food_label')
+                         .in_('email', chunk), 'id')
+        for row in rows:
+            lists[row['email']][row['status']].add(row['food_label'])
+    return {email: {status: sorted(labels) for status, labels in found.items()} for email, found in lists.items()}
+
+def stored_snapshots(supabase_client, emails):
+    stored = {}
+    for chunk in chunk_list(sorted(emails), 100):
+        rows = fetch_all(lambda: supabase_client.table('user_dashboard_snapshots')
+                         .select('email,revision,source_hash,snapshot')
+                         .in_('email', chunk), 'email')
+        stored.update((row['email'], row) for row in rows)
+    return stored
+
+def content_hash(snapshot):
+    return hashlib.md5(json.dumps(snapshot, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+def refresh_dashboard_snapshots(supabase_client, table_name, intake_table=None, touched_emails=(), incremental=True,
+                                everyone=False):
+    """Rebuild the snapshots of users whose weight logs or intake record changed"""
+    sync_time = datetime.now(timezone.utc).isoformat()
+    intake_records = {}
+    if intake_table is not None:
+        last_sync = get_last_sync_time(supabase_client, METADATA_KEY) if incremental else None
+        for page in iter_airtable_pages(intake_table, last_sync):
+            for record in page:
+                email = intake_email(record)
+                if email:
+                    intake_records[email] = record
+
+    emails = {email for email in touched_emails if email} | set(intake_records)
+    if everyone:
+        emails |= {
+            row['airtable_email'] for row in fetch_all(lambda: supabase_client.table('user_mappings').select('airtable_email'), 'id')
+            if row.get('airtable_email')
+        }
+    if not emails:
+        logger.info("No dashboard snapshots to rebuild")
+        return 0
+
+    stored = stored_snapshots(supabase_client, emails)
+    measurements = latest_measurements(supabase_client, table_name, emails)
+    tolerances = tolerance_lists(supabase_client, emails)
+
+    rows = []
+    for email in sorted(emails):
+        previous = stored.get(email) or {}
+        previous_snapshot = previous.get('snapshot') or {}
+        record = intake_records.get(email)
+        snapshot = {
+            'version': SNAPSHOT_VERSION,
+            'email': email,
+            'profile': profile_section(record) if record else previous_snapshot.get('profile'),
+            'medicalConditions': conditions_section(record) if record else previous_snapshot.get('medicalConditions'),
+            'latestMeasurements': measurements.get(email),
+            'tolerances': tolerances[email],
+        }
+        source_hash = content_hash(snapshot)
+        if source_hash == previous.get('source_hash'):
+            continue
+        rows.append({
+            'email': email,
+            'version': SNAPSHOT_VERSION,
+            'revision': (previous.get('revision') or 0) + 1,
+            'source_hash': source_hash,
+            'snapshot': snapshot,
+            'built_at': sync_time,
+        })
+
+    for chunk in chunk_list(rows, 200):
+        supabase_client.table('user_dashboard_snapshots').upsert(chunk, on_conflict='email').execute()
+    if intake_table is not None:
+        update_sync_metadata(
+            supabase_client, METADATA_KEY, sync_time, changed=len(intake_records) if last_sync else None
+        )
+    logger.info(f"Dashboard snapshots: {len(rows)} rebuilt, {len(emails) - len(rows)} unchanged")
+    return len(rows)
@@ -0,0 +1,196 @@
+# email_mapping.py - Set-based matching of Airtable emails to auth accounts
+#
+# Instead of one users query per Airtable email on every run, the auth emails
+# are loaded once into an in-memory index keyed by a canonical address. Emails
+# with no match are remembered in email_mapping_misses for a TTL so repeat runs
+# skip them, and near-matches are written to user_mapping_candidates for manual
+# review (they are never added to user_mappings automatically, because that
+# table grants access to weight logs). For the same reason a canonical address
+# shared by several auth accounts is treated as a near-match, not a match.
+
+import logging
+from difflib import get_close_matches
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+# Providers that deliver dotted and plus-tagged variants to the same mailbox;
+# elsewhere those can be different people, so they are only folded here
+GMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+PAGE_SIZE = 1000
+
+def normalized_email(email):
+    """An address with case and whitespace normalised, otherwise unchanged"""
+    if not isinstance(email, str):
+        return None
+    return ''.join(email.split()).lower() or None
+
+def canonical_email(email):
+    """Normalise an address for matching: case, whitespace, and gmail plus-tags and dots"""
+    email = normalized_email(email)
+    if not email:
+        return None
+    local, sep, domain = email.rpartition('@')
+    if not sep or not local or not domain:
+        return email
+    if domain in GMAIL_DOMAINS:
+        local = local.split('+', 1)[0].replace('.', '')
+        domain = 'gmail.com'
+    return f"{local}@{domain}"
+
+class EmailIndex:
+    """In-memory index of auth emails for O(1) lookups by exact and canonical address"""
+
+    def __init__(self, auth_emails):
+        self.by_exact = {}
+        self.by_canonical = {}
+        self.by_local = {}
+        self.by_domain = {}
+        for auth_email in auth_emails:
+            key = canonical_email(auth_email)
+            if not key:
+                continue
+            self.by_exact.setdefault(normalized_email(auth_email), set()).add(auth_email)
+            local, _, domain = key.rpartition('@')
+            if key not in self.by_canonical:
+                self.by_domain.setdefault(domain, []).append(key)
+            self.by_canonical.setdefault(key, set()).add(auth_email)
+            self.by_local.setdefault(local, set()).add(auth_email)
+
+    def __len__(self):
+        return sum(map(len, self.by_exact.values()))
+
+    def match(self, airtable_email):
+        """Return the one auth email an Airtable email belongs to, or None.
+
+        An exact match wins; a canonical match is only used when it is the
+        only account with that canonical address.
+        """
+        exact = self.by_exact.get(normalized_email(airtable_email), set())
+        if len(exact) == 1:
+            return next(iter(exact))
+        if exact:
+            return None
+        canonical = self.by_canonical.get(canonical_email(airtable_email), set())
+        return next(iter(canonical)) if len(canonical) == 1 else None
+
+    def candidates(self, airtable_email, limit=3):
+        """Near-matches worth a manual look: accounts sharing the canonical address,
+        the same mailbox on another domain, or a close spelling"""
+        key = canonical_email(airtable_email)
+        if not key:
+            return []
+        local, _, domain = key.rpartition('@')
+
+        found = {}
+        shared = self.by_canonical.get(key, ())
+        if len(shared) > 1:
+            # Several accounts canonicalise to this address: a person has to pick
+            for auth_email in sorted(shared):
+                found[auth_email] = ('ambiguous_canonical', 0.95)
+        for auth_email in sorted(self.by_local.get(local, ())):
+            found.setdefault(auth_email, ('same_local_part', 0.9))
+        # Only compare against the same domain to keep this proportional to its size
+        for close_key in get_close_matches(key, self.by_domain.get(domain, []), n=limit, cutoff=0.85):
+            for auth_email in sorted(self.by_canonical[close_key]):
+                found.setdefault(auth_email, ('similar_spelling', 0.85))
+        return [
+            {'candidate_auth_email': auth_email, 'reason': reason, 'score': score}
+            for auth_email, (reason, score) in list(found.items())[:limit]
+        ]
+
+def fetch_all(query_builder, key, page_size=PAGE_SIZE):
+    """Read every row of a PostgREST select, one range page at a time.
+
+    key is a column, or tuple of columns, that is unique per row. It is added
+    as the last sort key: without a total order Postgres may return rows in a
+    different order for each page, skipping or repeating rows between them.
+    """
+    key = (key,) if isinstance(key, str) else tuple(key)
+    rows = []
+    start = 0
+    while True:
+        query = query_builder()
+        for column in key:
+            query = query.order(column)
+        page = query.range(start, start + page_size - 1).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        start += page_size
+
+def load_email_index(supabase_client):
+    """Build the auth email index with paged reads instead of one query per address"""
+    rows = fetch_all(lambda: supabase_client.table('users').select('email'), 'id')
+    index = EmailIndex(row['email'] for row in rows if row.get('email'))
+    logger.info(f"Indexed {len(index)} auth emails")
+    return index
+
+def load_recent_misses(supabase_client, ttl_hours):
+    """Airtable emails that failed to match within the TTL window"""
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=ttl_hours)).isoformat()
+    try:
+        rows = fetch_all(lambda: supabase_client.table('email_mapping_misses')
+                         .select('airtable_email')
+                         .gte('checked_at', cutoff), 'airtable_email')
+        return {row['airtable_email'] for row in rows}
+    except Exception as e:
+        logger.warning(f"Could not read email mapping negative cache: {e}")
+        return set()
+
+def update_email_mappings(supabase_client, unique_emails, miss_ttl_hours=24):
+    """Create automatic mappings for Airtable emails that match an auth account"""
+    unique_emails = {email for email in unique_emails if email}
+
+    existing = fetch_all(lambda: supabase_client.table('user_mappings').select('airtable_email'), 'id')
+    mapped = {row['airtable_email'] for row in existing}
+    logger.info(f"Found {len(mapped)} existing email mappings")
+
+    recent_misses = load_recent_misses(supabase_client, miss_ttl_hours)
+    pending = unique_emails - mapped - recent_misses
+    logger.info(f"{len(pending)} emails to match ({len(recent_misses & unique_emails)} skipped by negative cache)")
+    if not pending:
+        return
+
+    index = load_email_index(supabase_client)
+    now = datetime.now(timezone.utc).isoformat()
+    matches, misses, candidates = [], [], []
+    for airtable_email in sorted(pending):
+        auth_email = index.match(airtable_email)
+        if auth_email:
+            matches.append({
+                'airtable_email': airtable_email,
+                'auth_email': auth_email,
+                'auto_matched': True,
+                'created_at': now
+            })
+            continue
+        misses.append({
+            'airtable_email': airtable_email,
+            'canonical_email': canonical_email(airtable_email),
+            'checked_at': now
+        })
+        for candidate in index.candidates(airtable_email):
+            candidates.append({'airtable_email': airtable_email, 'created_at': now, **candidate})
+
+    if matches:
+        supabase_client.table('user_mappings').upsert(
+            matches, on_conflict='airtable_email,auth_email'
+        ).execute()
+        # Expired misses that now match should no longer be cached
+        supabase_client.table('email_mapping_misses').delete().in_(
+            'airtable_email', [match['airtable_email'] for match in matches]
+        ).execute()
+    if misses:
+        supabase_client.table('email_mapping_misses').upsert(
+            misses, on_conflict='airtable_email'
+        ).execute()
+    if candidates:
+        supabase_client.table('user_mapping_candidates').upsert(
+            candidates, on_conflict='airtable_email,candidate_auth_email'
+        ).execute()
+
+    logger.info(
+        f"Email mapping update completed: {len(matches)} matched, {len(misses)} unmatched, "
+        f"{len(candidates)} candidates for review"
+    )
@@ -0,0 +1,212 @@
+# export.py - Streaming per-client weight log exports (CSV, NDJSON, XLSX)
+#
+# Replaces hand-running the "Filter Weight Logs by Email" snippet in the
+# Supabase dashboard. Rows come straight from Postgres in numeric program-day
+# order (the typed program_day column, served by idx_weight_logs_email_program_day
+# rather than a sort on the TEXT day_of_program), and memory stays constant
+# however long a client's history is:
+#
+#   csv     COPY ... TO STDOUT, written through as Postgres produces it
+#   ndjson  server-side cursor, one JSON object per line
+#   xlsx    server-side cursor into a write-only workbook (needs openpyxl)
+#
+# serve_exports() exposes the same exports over HTTP for local tooling:
+#   GET /export?email=...&format=csv
+
+import json
+import logging
+from datetime import date, datetime
+from decimal import Decimal
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+FORMATS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+FETCH_SIZE = 2000
+
+# Exported columns, in order; raw_fields and internal bookkeeping are left out
+EXPORT_COLUMNS = [
+    'email', 'program_day', 'day_of_program', 'recorded_on', 'phase', 'phase_of_program',
+    'weight_recorded', 'bp_systolic', 'bp_diastolic', 'blood_sugar', 'chest', 'waist', 'hips',
+    'tolerant_intolerant', 'tolerant_food_items', 'intolerant_food_items', 'food_item_introduced',
+    'supplement_introduced', 'symptoms_observed', 'body_physiology', 'deviation',
+    'reason_for_diagnosing_tolerant', 'comments', 'client_name', 'first_name', 'last_name', 'airtable_id',
+]
+
+EXPORT_QUERY = (
+    f"SELECT {', '.join(EXPORT_COLUMNS)} FROM public.weight_logs WHERE email = %(email)s "
+    "ORDER BY program_day NULLS LAST, recorded_on NULLS LAST, airtable_id"
+)
+
+def to_json_value(value):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+def export_csv(conn, email, out):
+    """Stream the client's logs as CSV with a header row into a binary file-like object"""
+    with conn.cursor() as cursor:
+        query = cursor.mogrify(EXPORT_QUERY, {'email': email}).decode('utf-8')
+        cursor.copy_expert(f"COPY ({query}) TO STDOUT WITH (FORMAT csv, HEADER)", out)
+        return cursor.rowcount
+
+def iter_rows(conn, email):
+    # A named cursor is server-side: rows arrive FETCH_SIZE at a time
+    with conn.cursor(name='export_weight_logs') as cursor:
+        cursor.itersize = FETCH_SIZE
+        cursor.execute(EXPORT_QUERY, {'email': email})
+        yield from cursor
+
+def export_ndjson(conn, email, out):
+    """Stream the client's logs as one JSON object per line"""
+    count = 0
+    for row in iter_rows(conn, email):
+        record = {column: to_json_value(value) for column, value in zip(EXPORT_COLUMNS, row)}
+        out.write(json.dumps(record).encode('utf-8') + b'\n')
+        count += 1
+    return count
+
+def export_xlsx(conn, email, out):
+    """Write the client's logs as a single-sheet workbook; needs a seekable `out`"""
+    from openpyxl import Workbook
+
+    # Write-only mode spools rows to a temporary file instead of building cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Weight Logs')
+    sheet.append(EXPORT_COLUMNS)
+    count = 0
+    for row in iter_rows(conn, email):
+        sheet.append([float(value) if isinstance(value, Decimal) else value for value in row])
+        count += 1
+    workbook.save(out)
+    return count
+
+EXPORTERS = {
+    'csv': export_csv,
+    'ndjson': export_ndjson,
+    'xlsx': export_xlsx,
+}
+
+def export_weight_logs(conn, email, out, export_format='csv'):
+    """Write one client's weight logs to `out` in program-day order; returns the row count"""
+    try:
+        count = EXPORTERS[export_format](conn, email, out)
+    finally:
+        # Release the snapshot (and any server-side cursor) held by the read
+        conn.rollback()
+    logger.info(f"Exported {count} weight logs for {email} as {export_format}")
+    return count
+
+def export_filename(email, export_format):
+    stem = ''.join(c if c.isalnum() or c in '.-_' else '_' for c in email)
+    return f"weight_logs_{stem}.{FORMATS[export_format][1]}"
+
+class ChunkedWriter:
+    """File-like object writing HTTP/1.1 chunked transfer encoding in CHUNK_SIZE chunks"""
+
+    CHUNK_SIZE = 64 * 1024
+
+    def __init__(self, wfile):
+        self.wfile = wfile
+        self.buffer = bytearray()
+
+    def write(self, data):
+        # COPY and the NDJSON writer hand over one row at a time
+        self.buffer += data
+        if len(self.buffer) >= self.CHUNK_SIZE:
+            self.flush()
+        return len(data)
+
+    def flush(self):
+        if self.buffer:
+            self.wfile.write(f"{len(self.buffer):x}\r\n".encode('ascii') + bytes(self.buffer) + b'\r\n')
+            self.buffer.clear()
+
+    def close(self):
+        self.flush()
+        self.wfile.write(b'0\r\n\r\n')
+
+def serve_exports(database_url, host='127.0.0.1', port=8765, token=None):
+    """Serve GET /export?email=...&format=csv|ndjson|xlsx until interrupted"""
+    import tempfile
+    import psycopg2
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+
+    class ExportHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_error_json(self, status, message):
+            body = json.dumps({'error': message}).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {key: values[0] for key, values in parse_qs(url.query).items()}
+            if url.path != '/export':
+                return self.send_error_json(404, 'Not found')
+            if token and self.headers.get('Authorization') != f"Bearer {token}":
+                return self.send_error_json(401, 'Unauthorized')
+            email = params.get('email')
+            export_format = params.get('format', 'csv')
+            if not email:
+                return self.send_error_json(400, 'email is required')
+            if export_format not in FORMATS:
+                return self.send_error_json(400, f"format must be one of {', '.join(FORMATS)}")
+
+            # One connection per request, so concurrent exports don't share a transaction
+            conn = psycopg2.connect(database_url)
+            try:
+                if export_format == 'xlsx':
+                    # A workbook is a zip archive, so it has to be complete before it can be sent
+                    with tempfile.TemporaryFile() as spool:
+                        export_weight_logs(conn, email, spool, export_format)
+                        self.send_headers(email, export_format, length=spool.tell())
+                        spool.seek(0)
+                        while chunk := spool.read(64 * 1024):
+                            self.wfile.write(chunk)
+                    return
+                self.send_headers(email, export_format)
+                writer = ChunkedWriter(self.wfile)
+                export_weight_logs(conn, email, writer, export_format)
+                writer.close()
+            except (BrokenPipeError, ConnectionResetError):
+                logger.warning(f"Export client for {email} disconnected")
+                self.close_connection = True
+            except Exception as e:
+                logger.error(f"Export for {email} failed: {e}")
+                # Headers may already be out; dropping the connection truncates the chunked body
+                self.close_connection = True
+            finally:
+                conn.close()
+
+        def send_headers(self, email, export_format, length=None):
+            self.send_response(200)
+            self.send_header('Content-Type', FORMATS[export_format][0])
+            self.send_header('Content-Disposition', f'attachment; filename="{export_filename(email, export_format)}"')
+            if length is None:
+                self.send_header('Transfer-Encoding', 'chunked')
+            else:
+                self.send_header('Content-Length', str(length))
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            logger.info(f"{self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((host, port), ExportHandler)
+    logger.info(f"Serving weight log exports on http://{host}:{port}/export")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
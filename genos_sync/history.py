@@ -0,0 +1,75 @@
+# history.py - Point-in-time reads of weight_logs
+#
+# The trigger in migrations/016_weight_log_history.sql keeps every version of
+# a weight log in public.weight_log_history, with the time range it was current
+# in. A version is written only when the row's content hash changes, in the same
+# transaction as the sync's upsert batch. That makes "what did the dashboard
+# show last week" a query instead of a restore:
+#
+#   export_as_of()  weight_logs as they were at a moment, through weight_logs_as_of()
+#   versions()      one record's versions and the columns each one changed
+#
+# Both are index scans, on the GiST (email, valid) and (airtable_id, valid)
+# indexes respectively.
+
+import json
+import logging
+
+from genos_sync.export import FETCH_SIZE, to_json_value
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+AS_OF_QUERY = (
+    "SELECT * FROM public.weight_logs_as_of(%(at)s, %(email)s) "
+    "ORDER BY email, recorded_on NULLS LAST, airtable_id"
+)
+# Columns that change on every write and are not part of a version's content hash
+BOOKKEEPING_COLUMNS = {'id', 'last_synced', 'created_at', 'updated_at'}
+
+def export_as_of(conn, at, out, email=None):
+    """Write weight_logs as of `at` (one user or everyone) as NDJSON to a binary file-like object"""
+    count = 0
+    try:
+        with conn.cursor(name='weight_logs_as_of') as cursor:
+            cursor.itersize = FETCH_SIZE
+            cursor.execute(AS_OF_QUERY, {'at': at, 'email': email})
+            columns = None
+            for row in cursor:
+                columns = columns or [column[0] for column in cursor.description]
+                record = {column: to_json_value(value) for column, value in zip(columns, row) if column != 'raw_fields'}
+                out.write(json.dumps(record).encode('utf-8') + b'\n')
+                count += 1
+    finally:
+        conn.rollback()
+    logger.info(f"Exported {count} weight logs as of {at}" + (f" for {email}" if email else ''))
+    return count
+
+def changed_columns(previous, current):
+    return sorted(
+        column for column in set(previous) | set(current)
+        if column not in BOOKKEEPING_COLUMNS and previous.get(column) != current.get(column)
+    )
+
+def versions(supabase_client, airtable_id):
+    """[{'valid', 'changed', 'row'}] for one weight log, oldest first"""
+    response = supabase_client.table('weight_log_history') \
+        .select('valid,row_data') \
+        .eq('airtable_id', airtable_id) \
+        .order('id') \
+        .execute()
+    found = []
+    previous = {}
+    for entry in response.data or []:
+        row = entry['row_data']
+        found.append({'valid': entry['valid'], 'changed': changed_columns(previous, row) if previous else [], 'row': row})
+        previous = row
+    return found
+
+def log_versions(airtable_id, found):
+    if not found:
+        logger.info(f"No history recorded for {airtable_id}")
+        return
+    for version in found:
+        changes = ', '.join(f"{column}={version['row'].get(column)!r}" for column in version['changed'])
+        logger.info(f"{version['valid']:<70} {changes or '(first version)'}")
+    logger.info(f"{len(found)} versions of {airtable_id}")
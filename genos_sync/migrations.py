@@ -0,0 +1,236 @@
+# migrations.py - Versioned migration runner for the sync's Supabase schema
+#
+# Applies migrations/NNN_name.sql in order over a direct Postgres connection
+# and records each one in public.schema_migrations. Every migration runs in its
+# own transaction unless its first line is "-- migrate: no-transaction", which
+# is required for CREATE INDEX CONCURRENTLY.
+#
+# Usage:
+#   python -m genos_sync migrate status
+#   python -m genos_sync migrate apply [--target 005]
+#   python -m genos_sync migrate baseline --target 001   # mark hand-applied migrations
+#   python -m genos_sync migrate check                   # EXPLAIN the hot query shapes
+
+import re
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+logger = logging.getLogger('airtable-supabase-migrations')
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent / 'migrations'
+MIGRATION_PATTERN = re.compile(r'^(\d+)_([\w-]+)\.sql$')
+NO_TRANSACTION_MARKER = '-- migrate: no-transaction'
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r'^CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+(?:IF\s+NOT\s+EXISTS\s+)?'
+    r'(?:(?P<schema>\w+)\.)?(?P<name>\w+)',
+    re.IGNORECASE,
+)
+
+# Query shapes the sync and dashboard depend on, with sample parameters.
+# `check` flags any of them that plans a sequential scan on its main table.
+QUERY_SHAPES = {
+    'latest_measurements': (
+        "SELECT recorded_on, program_day, weight_recorded FROM public.weight_logs "
+        "WHERE email = %(email)s ORDER BY recorded_on DESC LIMIT 30",
+        {'email': 'client@example.com'},
+    ),
+    'journey_by_program_day': (
+        "SELECT program_day, weight_recorded FROM public.weight_logs "
+        "WHERE email = %(email)s AND program_day BETWEEN 1 AND 90 ORDER BY program_day",
+        {'email': 'client@example.com'},
+    ),
+    'weekly_rollups': (
+        "SELECT bucket_start, last_value FROM public.weight_log_rollups "
+        "WHERE email = %(email)s AND granularity = 'week' AND metric = 'weight' ORDER BY bucket_start",
+        {'email': 'client@example.com'},
+    ),
+    'intolerant_food_search': (
+        "SELECT DISTINCT email FROM public.weight_log_food_items "
+        "WHERE status = 'intolerant' AND food_key LIKE %(pattern)s",
+        {'pattern': '%coconut%'},
+    ),
+    'mapping_lookup': (
+        "SELECT auth_email FROM public.user_mappings WHERE airtable_email = %(email)s",
+        {'email': 'client@example.com'},
+    ),
+    # The per-user query inside weight_logs_as_of()
+    'history_as_of': (
+        "SELECT row_data FROM public.weight_log_history "
+        "WHERE email = %(email)s AND valid @> %(at)s::timestamptz",
+        {'email': 'client@example.com', 'at': '2025-01-01T00:00:00Z'},
+    ),
+}
+
+def discover_migrations(directory=MIGRATIONS_DIR):
+    """Return [(version, name, path)] for every migration file, in order"""
+    migrations = []
+    for path in sorted(directory.glob('*.sql')):
+        match = MIGRATION_PATTERN.match(path.name)
+        if not match:
+            logger.warning(f"Ignoring {path.name}: expected NNN_name.sql")
+            continue
+        migrations.append((match.group(1), match.group(2), path))
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration versions in migrations/")
+    return migrations
+
+def checksum(sql):
+    return hashlib.sha256(sql.encode('utf-8')).hexdigest()
+
+def ensure_migrations_table(conn):
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS public.schema_migrations (
+                version TEXT PRIMARY KEY,
+                name TEXT NOT NULL,
+                checksum TEXT NOT NULL,
+                applied_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+            )
+        """)
+    conn.commit()
+
+def applied_migrations(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT version, checksum FROM public.schema_migrations")
+        return dict(cur.fetchall())
+
+def record_migration(cur, version, name, sql):
+    cur.execute(
+        "INSERT INTO public.schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+        (version, name, checksum(sql))
+    )
+
+def apply_migration(conn, version, name, path):
+    """Apply a single migration, transactionally unless it opts out"""
+    sql = path.read_text(encoding='utf-8')
+    if sql.lstrip().startswith(NO_TRANSACTION_MARKER):
+        # CONCURRENTLY cannot run inside a transaction block: run each statement
+        # on its own. Statements must be idempotent (IF NOT EXISTS) so a
+        # partially applied migration can be re-run, but a failed CREATE INDEX
+        # CONCURRENTLY leaves an INVALID index behind that IF NOT EXISTS would
+        # skip, so those are dropped before each statement.
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for statement in split_statements(sql):
+                    drop_invalid_index(cur, statement)
+                    cur.execute(statement)
+                record_migration(cur, version, name, sql)
+        finally:
+            conn.autocommit = False
+    else:
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql)
+                record_migration(cur, version, name, sql)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+    logger.info(f"Applied migration {version}_{name}")
+
+def drop_invalid_index(cur, statement):
+    """Drop the index a CREATE INDEX CONCURRENTLY statement builds if an earlier attempt left it INVALID"""
+    match = CONCURRENT_INDEX_PATTERN.match(statement)
+    if not match:
+        return
+    schema, name = match.group('schema') or 'public', match.group('name')
+    cur.execute(
+        "SELECT 1 FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid "
+        "JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = %s AND c.relname = %s AND NOT i.indisvalid",
+        (schema, name)
+    )
+    if cur.fetchone():
+        logger.warning(f"Dropping invalid index {schema}.{name} left by an earlier attempt")
+        cur.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{schema}"."{name}"')
+
+def split_statements(sql):
+    """Split a simple SQL script on semicolons (no dollar-quoted bodies allowed)"""
+    lines = [line for line in sql.splitlines() if not line.strip().startswith('--')]
+    return [statement.strip() for statement in '\n'.join(lines).split(';') if statement.strip()]
+
+def pending_migrations(conn, target=None):
+    applied = applied_migrations(conn)
+    pending = []
+    for version, name, path in discover_migrations():
+        if target and int(version) > int(target):
+            break
+        if version in applied:
+            if applied[version] != checksum(path.read_text(encoding='utf-8')):
+                logger.warning(f"Migration {version}_{name} changed after it was applied")
+            continue
+        pending.append((version, name, path))
+    return pending
+
+def show_status(conn):
+    applied = applied_migrations(conn)
+    for version, name, _ in discover_migrations():
+        state = 'applied' if version in applied else 'pending'
+        logger.info(f"{version}_{name}: {state}")
+
+def apply_all(conn, target=None):
+    pending = pending_migrations(conn, target)
+    if not pending:
+        logger.info("Database is up to date")
+        return
+    for version, name, path in pending:
+        apply_migration(conn, version, name, path)
+    logger.info(f"Applied {len(pending)} migrations")
+
+def baseline(conn, target):
+    """Record migrations up to target as applied without running them"""
+    with conn.cursor() as cur:
+        for version, name, path in pending_migrations(conn, target):
+            record_migration(cur, version, name, path.read_text(encoding='utf-8'))
+            logger.info(f"Marked {version}_{name} as applied")
+    conn.commit()
+
+def find_seq_scans(plan, found=None):
+    """Collect relation names scanned sequentially anywhere in an EXPLAIN plan"""
+    if found is None:
+        found = []
+    if plan.get('Node Type') == 'Seq Scan':
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        find_seq_scans(child, found)
+    return found
+
+def check_query_shapes(conn):
+    """EXPLAIN every registered query shape and flag sequential scans; returns the failures"""
+    failures = []
+    with conn.cursor() as cur:
+        for name, (query, params) in QUERY_SHAPES.items():
+            # Planner statistics on small tables favour seq scans; disable them so
+            # the check reports whether a usable index exists at all.
+            cur.execute("SET LOCAL enable_seqscan = off")
+            cur.execute("EXPLAIN (FORMAT JSON) " + query, params)
+            plan = cur.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            root = plan[0]['Plan']
+            seq_scans = find_seq_scans(root)
+            if seq_scans:
+                failures.append(name)
+                logger.warning(f"{name}: sequential scan on {', '.join(seq_scans)} (cost {root['Total Cost']})")
+            else:
+                logger.info(f"{name}: {root['Node Type']} (cost {root['Total Cost']})")
+    conn.rollback()
+    return failures
+
+def run_migrations(conn, command='apply', target=None):
+    """Run a migration command on an open connection; returns False if `check` fails"""
+    ensure_migrations_table(conn)
+    if command == 'status':
+        show_status(conn)
+    elif command == 'apply':
+        apply_all(conn, target)
+    elif command == 'baseline':
+        baseline(conn, target)
+    elif command == 'check':
+        return not check_query_shapes(conn)
+    return True
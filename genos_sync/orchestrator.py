@@ -0,0 +1,389 @@
+# orchestrator.py - Many (Airtable base, Supabase project) sync tenants in one process
+#
+# One process serves every clinic or coach instead of a copy of the script and
+# a cron entry per base. Tenants are listed in a JSON file:
+#
+#   {
+#     "workers": 8,
+#     "targets": {"https://abcd.supabase.co": {"max_connections": 4}},
+#     "tenants": [
+#       {
+#         "name": "genos",
+#         "weight": 2,
+#         "jobs": ["weight_logs", "blood_markers", "recipe_catalog"],
+#         "settings": {
+#           "airtable_base_id": "appXXXXXXXXXXXXXX",
+#           "airtable_api_key": "$GENOS_AIRTABLE_API_KEY",
+#           "supabase_url": "https://abcd.supabase.co",
+#           "supabase_key": "$GENOS_SUPABASE_SERVICE_KEY"
+#         }
+#       }
+#     ]
+#   }
+#
+# "settings" are SyncConfig fields; a value starting with $ is read from that
+# environment variable, and anything left out comes from the environment as
+# for a single-tenant run. "jobs" are scheduler.JOBS names (default: all).
+#
+# Shared resources:
+#   - one RateLimiter per Airtable base, for every tenant on that base, at the
+#     lowest airtable_requests_per_second any of them sets
+#   - one Supabase client (and its HTTP connection pool) per target project, with
+#     at most max_connections jobs writing to the project at once
+#   - a pool of `workers` threads; each tenant runs one job at a time, so its
+#     Airtable sessions are never used from two threads
+#
+# When a tenant's job is due comes from scheduler.plan_schedule, with the
+# tenant's own run history and request budget. A free worker goes to the tenant
+# that has used the fewest worker-seconds per unit of weight. Per-tenant busy
+# time, fair share, queue delay and run duration are logged and written to
+# SYNC_METRICS_FILE in the Prometheus textfile format.
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from datetime import datetime, timedelta, timezone
+
+from genos_sync.clients import Clients, RateLimiter
+from genos_sync.config import ConfigError, SyncConfig
+from genos_sync.scheduler import (
+    JOBS, MAX_SLEEP_SECONDS, RETRY_SECONDS, parse_time, plan_schedule, record_requests, scheduled_jobs,
+    write_textfile,
+)
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+DEFAULT_WORKERS = 4
+DEFAULT_MAX_CONNECTIONS = 4
+# Runs kept per tenant for the latency quantiles
+LATENCY_WINDOW = 200
+QUANTILES = (0.5, 0.95)
+SUMMARY_INTERVAL_SECONDS = 900
+SETTINGS = {f.name for f in fields(SyncConfig)}
+
+_job_context = threading.local()
+
+class TenantLogFilter(logging.Filter):
+    """Prefix messages logged while a tenant's job runs with the tenant name"""
+
+    def filter(self, record):
+        tenant = getattr(_job_context, 'tenant', None)
+        if tenant:
+            record.msg = f"[{tenant}] {record.msg}"
+        return True
+
+@dataclass
+class TenantStats:
+    runs: Counter = field(default_factory=Counter)
+    busy_seconds: float = 0.0
+    queue_delay_sum: float = 0.0
+    duration_sum: float = 0.0
+    queue_delays: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+    durations: deque = field(default_factory=lambda: deque(maxlen=LATENCY_WINDOW))
+
+@dataclass
+class Tenant:
+    name: str
+    config: SyncConfig
+    jobs: dict
+    weight: float = 1.0
+    clients: Clients = None
+    # (sync_metadata key, time it was queued) of due jobs not yet started
+    pending: deque = field(default_factory=deque)
+    running: bool = False
+    next_plan: datetime = None
+    retry_after: dict = field(default_factory=dict)
+    intervals: dict = field(default_factory=dict)
+    stats: TenantStats = field(default_factory=TenantStats)
+
+@dataclass
+class Target:
+    url: str
+    max_connections: int
+    supabase: object = None
+    active: int = 0
+
+def resolve_setting(defaults, key, value, env):
+    """Setting value with $NAME read from the environment and numbers converted to the field's type"""
+    if isinstance(value, str) and value.startswith('$'):
+        if value[1:] not in env:
+            raise ConfigError(f"Environment variable {value[1:]} is not set")
+        value = env[value[1:]]
+    current = getattr(defaults, key)
+    if isinstance(current, (int, float)) and isinstance(value, str):
+        return type(current)(value)
+    return value
+
+def load_tenants(path, defaults, env=None):
+    """(settings document, [Tenant]) from a tenants JSON file"""
+    env = os.environ if env is None else env
+    with open(path) as f:
+        document = json.load(f)
+
+    tenants = []
+    for entry in document.get('tenants') or []:
+        name = entry.get('name')
+        if not name:
+            raise ConfigError(f"Every tenant in {path} needs a name")
+        settings = entry.get('settings') or {}
+        job_names = entry.get('jobs') or list(JOBS)
+        unknown = (set(settings) - SETTINGS) | (set(job_names) - set(JOBS))
+        if unknown:
+            raise ConfigError(f"Tenant {name}: unknown settings or jobs {', '.join(sorted(unknown))}")
+        try:
+            config = replace(defaults, **{
+                key: resolve_setting(defaults, key, value, env) for key, value in settings.items()
+            })
+            config.require('airtable_api_key', 'airtable_base_id', 'supabase_url', 'supabase_key')
+        except ConfigError as e:
+            raise ConfigError(f"Tenant {name}: {e}") from e
+        tenants.append(Tenant(name, config, scheduled_jobs(config, job_names), float(entry.get('weight', 1))))
+
+    if not tenants:
+        raise ConfigError(f"No tenants configured in {path}")
+    names = Counter(tenant.name for tenant in tenants)
+    duplicates = [name for name, count in names.items() if count > 1]
+    if duplicates:
+        raise ConfigError(f"Duplicate tenant names in {path}: {', '.join(duplicates)}")
+    # Two tenants recording into one sync_metadata row would share last_sync and run history
+    owners = {}
+    for tenant in tenants:
+        for key in tenant.jobs:
+            owner = owners.setdefault((tenant.config.supabase_url, key), tenant.name)
+            if owner != tenant.name:
+                raise ConfigError(f"Tenants {owner} and {tenant.name} both sync {key} into {tenant.config.supabase_url}")
+    return document, tenants
+
+def quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+class Orchestrator:
+    """Runs the due jobs of every tenant on one shared worker pool"""
+
+    def __init__(self, tenants, workers=DEFAULT_WORKERS, targets=None, metrics_file=None):
+        self.tenants = tenants
+        self.workers = workers
+        self.metrics_file = metrics_file
+
+        rates = {}
+        for tenant in tenants:
+            base_id = tenant.config.airtable_base_id
+            rates[base_id] = min(rates.get(base_id, float('inf')), tenant.config.airtable_requests_per_second)
+        self.limiters = {base_id: RateLimiter(rate) for base_id, rate in rates.items()}
+
+        self.targets = {}
+        for tenant in tenants:
+            key = (tenant.config.supabase_url, tenant.config.supabase_key)
+            if key not in self.targets:
+                settings = (targets or {}).get(tenant.config.supabase_url) or {}
+                target = Target(tenant.config.supabase_url, int(settings.get('max_connections', DEFAULT_MAX_CONNECTIONS)))
+                target.supabase = Clients(tenant.config).supabase
+                self.targets[key] = target
+            tenant.clients = Clients(
+                tenant.config,
+                airtable_limiter=self.limiters[tenant.config.airtable_base_id],
+                supabase=self.targets[key].supabase,
+            )
+        self._completions = queue.Queue()
+
+    def target(self, tenant):
+        return self.targets[(tenant.config.supabase_url, tenant.config.supabase_key)]
+
+    def plan(self, tenant, now):
+        """Queue the tenant's due jobs and decide when to plan it again"""
+        try:
+            plan = plan_schedule(
+                tenant.clients.supabase, tenant.jobs, tenant.config.schedule_requests_per_hour, now
+            )
+        except Exception as e:
+            logger.error(f"[{tenant.name}] Planning failed: {e}")
+            tenant.next_plan = now + timedelta(seconds=RETRY_SECONDS)
+            return
+        tenant.intervals = {key: decision['interval_seconds'] for key, decision in plan.items()}
+        due = sorted(
+            (key for key, decision in plan.items() if decision['due'] and tenant.retry_after.get(key, now) <= now),
+            key=lambda key: plan[key]['next_run_at'],
+        )
+        tenant.pending.extend((key, now) for key in due)
+        # After running its due jobs the tenant is re-planned straight away, as in run_scheduler
+        upcoming = [now + timedelta(seconds=MAX_SLEEP_SECONDS)] if not due else [now]
+        upcoming += [parse_time(decision['next_run_at']) for decision in plan.values() if not decision['due']]
+        upcoming += list(tenant.retry_after.values())
+        tenant.next_plan = min(upcoming)
+
+    def dispatch(self, pool):
+        """Hand free workers to the tenants furthest below their fair share"""
+        free = self.workers - sum(tenant.running for tenant in self.tenants)
+        ready = [tenant for tenant in self.tenants if tenant.pending and not tenant.running]
+        for tenant in sorted(ready, key=lambda tenant: tenant.stats.busy_seconds / tenant.weight):
+            if free <= 0:
+                break
+            target = self.target(tenant)
+            if target.active >= target.max_connections:
+                continue
+            key, queued_at = tenant.pending.popleft()
+            delay = (datetime.now(timezone.utc) - queued_at).total_seconds()
+            tenant.stats.queue_delays.append(delay)
+            tenant.stats.queue_delay_sum += delay
+            tenant.running = True
+            target.active += 1
+            free -= 1
+            pool.submit(self.execute, tenant, key)
+
+    def execute(self, tenant, key):
+        """Worker thread: run one job and report (tenant, key, succeeded, seconds) back to the dispatcher"""
+        _job_context.tenant = tenant.name
+        started = time.monotonic()
+        before = tenant.clients.airtable_requests
+        try:
+            succeeded = bool(tenant.jobs[key](tenant.config, tenant.clients))
+            if succeeded:
+                record_requests(tenant.clients.supabase, key, tenant.clients.airtable_requests - before)
+        except Exception as e:
+            logger.error(f"{key} failed: {e}", exc_info=True)
+            succeeded = False
+        finally:
+            _job_context.tenant = None
+        self._completions.put((tenant, key, succeeded, time.monotonic() - started))
+
+    def complete(self, tenant, key, succeeded, seconds):
+        tenant.running = False
+        self.target(tenant).active -= 1
+        stats = tenant.stats
+        stats.runs['ok' if succeeded else 'failed'] += 1
+        stats.busy_seconds += seconds
+        stats.duration_sum += seconds
+        stats.durations.append(seconds)
+        if succeeded:
+            tenant.retry_after.pop(key, None)
+        else:
+            tenant.retry_after[key] = datetime.now(timezone.utc) + timedelta(seconds=RETRY_SECONDS)
+            # Re-plan once the retry is due rather than waiting out the full interval
+            tenant.next_plan = min(tenant.next_plan or tenant.retry_after[key], tenant.retry_after[key])
+        logger.info(f"[{tenant.name}] {key} {'completed' if succeeded else 'failed'} in {seconds:.1f}s")
+        return succeeded
+
+    def fair_shares(self):
+        """tenant -> (share of worker time used) / (share of weight), over tenants that have run"""
+        active = [tenant for tenant in self.tenants if tenant.stats.runs]
+        busy = sum(tenant.stats.busy_seconds for tenant in active)
+        weight = sum(tenant.weight for tenant in active)
+        return {
+            tenant.name: (tenant.stats.busy_seconds / busy) / (tenant.weight / weight) if busy > 0 else 0.0
+            for tenant in active
+        }
+
+    def log_summary(self):
+        shares = self.fair_shares()
+        for tenant in self.tenants:
+            stats = tenant.stats
+            logger.info(
+                f"{tenant.name:<16} {stats.runs['ok']:>4} ok {stats.runs['failed']:>3} failed  "
+                f"busy {stats.busy_seconds:>8.1f}s  fair share {shares.get(tenant.name, 0.0):>5.2f}  "
+                f"queue p95 {quantile(stats.queue_delays, 0.95):>6.1f}s  run p95 {quantile(stats.durations, 0.95):>6.1f}s"
+            )
+
+    def write_metrics(self, path):
+        shares = self.fair_shares()
+        lines = [
+            "# HELP genos_sync_tenant_busy_seconds_total Worker time spent on the tenant's jobs",
+            "# TYPE genos_sync_tenant_busy_seconds_total counter",
+        ]
+        lines += [f'genos_sync_tenant_busy_seconds_total{{tenant="{t.name}"}} {t.stats.busy_seconds:.3f}'
+                  for t in self.tenants]
+        lines += ["# HELP genos_sync_tenant_fair_share_ratio Share of worker time used over share of weight",
+                  "# TYPE genos_sync_tenant_fair_share_ratio gauge"]
+        lines += [f'genos_sync_tenant_fair_share_ratio{{tenant="{name}"}} {share:.4f}'
+                  for name, share in sorted(shares.items())]
+        lines += ["# HELP genos_sync_tenant_runs_total Jobs run per tenant and outcome",
+                  "# TYPE genos_sync_tenant_runs_total counter"]
+        lines += [f'genos_sync_tenant_runs_total{{tenant="{t.name}",status="{status}"}} {t.stats.runs[status]}'
+                  for t in self.tenants for status in ('ok', 'failed')]
+        for name, help_text, values, total in (
+            ('queue_delay_seconds', "Time a due job waited for a worker", 'queue_delays', 'queue_delay_sum'),
+            ('run_duration_seconds', "Time a job took to run", 'durations', 'duration_sum'),
+        ):
+            lines += [f"# HELP genos_sync_tenant_{name} {help_text}", f"# TYPE genos_sync_tenant_{name} summary"]
+            for tenant in self.tenants:
+                window = getattr(tenant.stats, values)
+                lines += [f'genos_sync_tenant_{name}{{tenant="{tenant.name}",quantile="{q}"}} {quantile(window, q):.3f}'
+                          for q in QUANTILES]
+                lines.append(f'genos_sync_tenant_{name}_sum{{tenant="{tenant.name}"}} {getattr(tenant.stats, total):.3f}')
+                lines.append(f'genos_sync_tenant_{name}_count{{tenant="{tenant.name}"}} {sum(tenant.stats.runs.values())}')
+        lines += ["# HELP genos_sync_poll_interval_seconds Scheduled interval between runs",
+                  "# TYPE genos_sync_poll_interval_seconds gauge"]
+        lines += [f'genos_sync_poll_interval_seconds{{tenant="{t.name}",table="{key}"}} {interval}'
+                  for t in self.tenants for key, interval in sorted(t.intervals.items())]
+        write_textfile(path, lines)
+
+    def run(self, once=False):
+        """Plan and run tenants' jobs until interrupted; with once, run what is due now and return"""
+        log_filter = TenantLogFilter()
+        logger.addFilter(log_filter)
+        ok = True
+        last_summary = time.monotonic()
+        logger.info(
+            f"Orchestrating {len(self.tenants)} tenants on {self.workers} workers "
+            f"({len(self.limiters)} Airtable bases, {len(self.targets)} Supabase targets)"
+        )
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='tenant') as pool:
+                now = datetime.now(timezone.utc)
+                for tenant in self.tenants:
+                    self.plan(tenant, now)
+                while True:
+                    self.dispatch(pool)
+                    if once and not any(tenant.pending or tenant.running for tenant in self.tenants):
+                        break
+
+                    # Sleep until a job finishes or an idle tenant is due to be planned again
+                    now = datetime.now(timezone.utc)
+                    idle = [tenant for tenant in self.tenants if not tenant.running and not tenant.pending]
+                    wake = min([tenant.next_plan for tenant in idle if not once]
+                               + [now + timedelta(seconds=MAX_SLEEP_SECONDS)])
+                    try:
+                        completion = self._completions.get(timeout=max((wake - now).total_seconds(), 0.1))
+                        ok = self.complete(*completion) and ok
+                        while not self._completions.empty():
+                            ok = self.complete(*self._completions.get_nowait()) and ok
+                    except queue.Empty:
+                        pass
+
+                    if not once:
+                        now = datetime.now(timezone.utc)
+                        for tenant in self.tenants:
+                            if not tenant.running and not tenant.pending and tenant.next_plan <= now:
+                                self.plan(tenant, now)
+                    if self.metrics_file:
+                        self.write_metrics(self.metrics_file)
+                    if time.monotonic() - last_summary >= SUMMARY_INTERVAL_SECONDS:
+                        self.log_summary()
+                        last_summary = time.monotonic()
+        finally:
+            logger.removeFilter(log_filter)
+        self.log_summary()
+        if self.metrics_file:
+            self.write_metrics(self.metrics_file)
+        return ok
+
+def run_orchestrator(path, defaults, workers=None, once=False):
+    """Load the tenants file and run its tenants until interrupted (or once)"""
+    document, tenants = load_tenants(path, defaults)
+    orchestrator = Orchestrator(
+        tenants,
+        workers=workers or int(document.get('workers', DEFAULT_WORKERS)),
+        targets=document.get('targets'),
+        metrics_file=defaults.metrics_file,
+    )
+    try:
+        return orchestrator.run(once=once)
+    except KeyboardInterrupt:
+        orchestrator.log_summary()
+        return True
@@ -0,0 +1,153 @@
+# planner.py - Dry-run estimate of what a weight log sync would do
+#
+# `python -m genos_sync plan` lists the record IDs the sync would fetch, with
+# only the Email field instead of every field. It compares them with the
+# airtable_ids already in Supabase and logs an estimate of the run:
+#   - Airtable requests and bytes
+#   - PostgREST calls and bytes
+#   - upserts (new and updated) and deletes
+#   - wall time at AIRTABLE_REQUESTS_PER_SECOND and the latencies seen while planning
+# Byte sizes come from one sample page of full records.
+#
+# An incremental sync falls back to fetching every record in two cases: its
+# LAST_MODIFIED_TIME() formula is rejected, or no previous sync is recorded.
+# The plan reports this as degraded and fails unless --allow-full-scan is
+# given. `plan --execute` then runs the sync with the fallback disabled, so it
+# cannot degrade between planning and running either.
+
+import json
+import math
+import time
+import logging
+
+from genos_sync.email_mapping import PAGE_SIZE as POSTGREST_PAGE_SIZE, fetch_all
+from genos_sync.records import RecordStore
+from genos_sync.sync import check_table_structure, get_last_sync_time, modified_since_formula
+from genos_sync.transform import normalize_email
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+AIRTABLE_PAGE_SIZE = 100
+# PostgREST calls a sync makes whatever its size: table checks, last sync,
+# email mapping and quarantine reads, and the sync_metadata update
+FIXED_POSTGREST_CALLS = 12
+# Per upsert batch: the upsert, and the food item delete and insert
+POSTGREST_CALLS_PER_BATCH = 3
+ROLLUP_CHUNK_SIZE = 100
+
+def list_records(airtable, formula=None):
+    """({airtable_id: email}, requests, seconds) listing only the Email field"""
+    options = {'fields': ['Email'], 'page_size': AIRTABLE_PAGE_SIZE}
+    if formula:
+        options['formula'] = formula
+    records = {}
+    requests = 0
+    started = time.perf_counter()
+    for page in airtable.iterate(**options):
+        requests += 1
+        records.update((record['id'], normalize_email(record.get('fields', {}).get('Email'))) for record in page)
+    return records, max(requests, 1), time.perf_counter() - started
+
+def sample_sizes(airtable, available_columns):
+    """(mean Airtable record bytes, mean upserted row bytes) over one page of full records"""
+    page = next(airtable.iterate(page_size=AIRTABLE_PAGE_SIZE, max_records=AIRTABLE_PAGE_SIZE), [])
+    if not page:
+        return 0, 0
+    rows = RecordStore.from_records(page).rows(0, len(page), available_columns)
+    record_bytes = sum(len(json.dumps(record, default=str)) for record in page) / len(page)
+    row_bytes = sum(len(json.dumps(row, default=str)) for row in rows) / len(rows)
+    return record_bytes, row_bytes
+
+def plan_sync(config, clients, full=False):
+    """Estimate of the requests, bytes, row changes and wall time of the next sync"""
+    table_name = config.supabase_table_name
+    supabase_client = clients.supabase
+    airtable = clients.airtable()
+
+    started = time.perf_counter()
+    available_columns = check_table_structure(supabase_client, table_name)
+    last_sync = None if full else get_last_sync_time(supabase_client, table_name)
+    stored = {row['airtable_id'] for row in fetch_all(lambda: supabase_client.table(table_name).select('airtable_id'), 'airtable_id')}
+    # Two table checks, the last sync read and the pages of stored IDs
+    postgrest_calls = 3 + (not full) + len(stored) // POSTGREST_PAGE_SIZE
+    postgrest_latency = (time.perf_counter() - started) / postgrest_calls
+
+    airtable_before = clients.airtable_requests
+    everything, requests, seconds = list_records(airtable)
+    airtable_calls, airtable_seconds = requests, seconds
+    changed, degraded = everything, None
+    if not full and not last_sync:
+        degraded = f"no previous sync of {table_name} is recorded"
+    elif not full:
+        try:
+            changed, requests, seconds = list_records(airtable, modified_since_formula(last_sync))
+            airtable_calls += requests
+            airtable_seconds += seconds
+        except Exception as e:
+            degraded = f"the LAST_MODIFIED_TIME() formula was rejected ({e})"
+    record_bytes, row_bytes = sample_sizes(airtable, available_columns)
+    # Each request already waits for the shared limiter, so this is at least 1/rate
+    airtable_latency = airtable_seconds / airtable_calls
+
+    count = len(changed)
+    emails = {email for email in changed.values() if email}
+    batches = math.ceil(count / config.batch_size)
+    incremental = not full
+    sync_postgrest_calls = (
+        FIXED_POSTGREST_CALLS
+        + POSTGREST_CALLS_PER_BATCH * batches
+        + math.ceil(len(emails) / ROLLUP_CHUNK_SIZE)
+        # Quarantine reads each user's previous weight on incremental runs
+        + (len(emails) if incremental else 0)
+    )
+    sync_airtable_requests = max(math.ceil(count / AIRTABLE_PAGE_SIZE), 1)
+    new = len(changed.keys() - stored)
+    return {
+        'table': table_name,
+        'mode': 'full' if full else 'incremental',
+        'last_sync': last_sync,
+        'degraded': degraded,
+        'airtable_records': len(everything),
+        'stored_rows': len(stored),
+        'upserts': count,
+        'inserts': new,
+        'updates': count - new,
+        'emails': len(emails),
+        'food_item_batches': batches,
+        'orphaned_rows': len(stored - everything.keys()),
+        'airtable_requests': sync_airtable_requests,
+        'airtable_bytes': round(count * record_bytes),
+        'postgrest_calls': sync_postgrest_calls,
+        'postgrest_bytes': round(count * row_bytes),
+        'airtable_seconds': sync_airtable_requests * max(airtable_latency, 1 / config.airtable_requests_per_second),
+        'postgrest_seconds': sync_postgrest_calls * postgrest_latency,
+        'planning_airtable_requests': clients.airtable_requests - airtable_before,
+    }
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def log_plan(plan):
+    since = f" since {plan['last_sync']}" if plan['last_sync'] else ''
+    logger.info(f"Plan: {plan['mode']} sync of {plan['table']}{since}")
+    if plan['degraded']:
+        logger.warning(f"The incremental sync would fetch all {plan['airtable_records']} records: {plan['degraded']}")
+    logger.info(f"  Airtable    {plan['airtable_requests']:>8} requests   ~{format_bytes(plan['airtable_bytes'])}")
+    logger.info(f"  PostgREST   {plan['postgrest_calls']:>8} calls      ~{format_bytes(plan['postgrest_bytes'])}")
+    logger.info(
+        f"  Upserts     {plan['upserts']:>8} ({plan['inserts']} new, {plan['updates']} updated, "
+        f"{plan['emails']} users)"
+    )
+    logger.info(
+        f"  Deletes     {plan['food_item_batches']:>8} food item batches replaced; {plan['orphaned_rows']} of "
+        f"{plan['stored_rows']} stored rows are no longer in Airtable (removed only by verify --delete-extra)"
+    )
+    logger.info(
+        f"  Wall time   ~{plan['airtable_seconds'] + plan['postgrest_seconds']:.0f}s "
+        f"(Airtable {plan['airtable_seconds']:.1f}s, PostgREST {plan['postgrest_seconds']:.1f}s)"
+    )
+    logger.info(f"Planning took {plan['planning_airtable_requests']} Airtable requests")
@@ -0,0 +1,200 @@
+# profiling.py - Per-stage CPU, allocation and wall-time profiling for sync runs
+#
+# Wrap each pipeline stage in `profiler.stage(name)`. With profiling off the
+# NULL_PROFILER makes that a no-op. With it on, every stage gets wall/CPU
+# timers and a background sampler records the main thread's stack, giving
+# sampled top functions and a flamegraph-ready collapsed stack file. That
+# "light" mode costs a few percent and is what sampled production runs use.
+#
+# Detailed mode (--profile) additionally runs a cProfile per stage and a
+# tracemalloc allocation diff for the first few entries of each stage. Both
+# trace every call/allocation, so expect the run to be several times slower.
+#
+# Stages may be entered repeatedly (e.g. once per batch); their stats accumulate.
+# A stage entered inside another is timed but not separately cProfiled, since
+# only one profiler hook can be active per thread.
+
+import io
+import os
+import sys
+import json
+import time
+import random
+import pstats
+import cProfile
+import logging
+import threading
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+TOP_N = 25
+
+class NullProfiler:
+    """Profiler stand-in used when profiling is off"""
+
+    enabled = False
+
+    def stage(self, name):
+        return nullcontext()
+
+    def write_report(self):
+        return None
+
+NULL_PROFILER = NullProfiler()
+
+class StackSampler(threading.Thread):
+    """Samples the profiled thread's stack at a fixed interval (cheap, no tracing hooks)"""
+
+    def __init__(self, profiler, thread_id, interval=0.005):
+        super().__init__(name='genos-sync-stack-sampler', daemon=True)
+        self.profiler = profiler
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            stage = self.profiler.current_stage
+            frame = sys._current_frames().get(self.thread_id)
+            if stage is None or frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[';'.join([stage, *reversed(names)])] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+class StageStats:
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.calls = 0
+        self.allocations = Counter()
+
+class Profiler:
+    """Collects per-stage profiles for one run and writes them to output_dir"""
+
+    enabled = True
+
+    def __init__(self, output_dir='profiles', detailed=True, sample_interval=0.005, snapshot_entries=3):
+        self.run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        self.output_dir = os.path.join(output_dir, self.run_id)
+        self.detailed = detailed
+        self.snapshot_entries = snapshot_entries if detailed else 0
+        self.stages = {}
+        self.current_stage = None
+        self.started = time.perf_counter()
+        self.sampler = StackSampler(self, threading.get_ident(), sample_interval)
+        if detailed and not tracemalloc.is_tracing():
+            tracemalloc.start(1)
+        self.sampler.start()
+
+    @contextmanager
+    def stage(self, name):
+        stats = self.stages.setdefault(name, StageStats())
+        parent = self.current_stage
+        self.current_stage = name
+        before = tracemalloc.take_snapshot() if stats.calls < self.snapshot_entries else None
+        wall_start, cpu_start = time.perf_counter(), time.process_time()
+        profiled = self.detailed and parent is None
+        if profiled:
+            stats.profile.enable()
+        try:
+            yield
+        finally:
+            if profiled:
+                stats.profile.disable()
+            stats.wall += time.perf_counter() - wall_start
+            stats.cpu += time.process_time() - cpu_start
+            stats.calls += 1
+            if before is not None:
+                after = tracemalloc.take_snapshot()
+                for diff in after.compare_to(before, 'lineno')[:TOP_N]:
+                    if diff.size_diff > 0:
+                        frame = diff.traceback[0]
+                        stats.allocations[f"{frame.filename}:{frame.lineno}"] += diff.size_diff
+            self.current_stage = parent
+
+    def sampled_functions(self, stage):
+        """Functions most often on top of the sampled stack during a stage"""
+        leaves = Counter()
+        for stack, count in self.sampler.stacks.items():
+            frames = stack.split(';')
+            if frames[0] == stage:
+                leaves[frames[-1]] += count
+        return '\n'.join(f"{count:>8}  {function}" for function, count in leaves.most_common(TOP_N)) + '\n'
+
+    def summary(self):
+        """Per-stage wall/CPU time, top functions and allocation sites"""
+        result = {
+            'run_id': self.run_id,
+            'mode': 'detailed' if self.detailed else 'sampled',
+            'total_wall_seconds': time.perf_counter() - self.started,
+            'stages': {},
+        }
+        for name, stats in self.stages.items():
+            if self.detailed:
+                buffer = io.StringIO()
+                pstats.Stats(stats.profile, stream=buffer).sort_stats('cumulative').print_stats(TOP_N)
+                top_functions = buffer.getvalue()
+            else:
+                top_functions = self.sampled_functions(name)
+            result['stages'][name] = {
+                'entries': stats.calls,
+                'wall_seconds': round(stats.wall, 4),
+                'cpu_seconds': round(stats.cpu, 4),
+                'top_functions': top_functions,
+                'top_allocations': [
+                    {'site': site, 'bytes': size} for site, size in stats.allocations.most_common(TOP_N)
+                ],
+            }
+        return result
+
+    def write_report(self):
+        """Stop sampling and write report.txt, report.json and stacks.collapsed"""
+        self.sampler.stop()
+        summary = self.summary()
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        with open(os.path.join(self.output_dir, 'report.json'), 'w') as f:
+            json.dump(summary, f, indent=2)
+
+        with open(os.path.join(self.output_dir, 'report.txt'), 'w') as f:
+            f.write(f"Sync profile {self.run_id} - total wall {summary['total_wall_seconds']:.2f}s\n\n")
+            f.write(f"{'stage':<20}{'entries':>8}{'wall s':>10}{'cpu s':>10}\n")
+            for name, stage in summary['stages'].items():
+                f.write(f"{name:<20}{stage['entries']:>8}{stage['wall_seconds']:>10.3f}{stage['cpu_seconds']:>10.3f}\n")
+            for name, stage in summary['stages'].items():
+                f.write(f"\n=== {name}: top allocation sites ===\n")
+                for allocation in stage['top_allocations']:
+                    f.write(f"{allocation['bytes']:>12}  {allocation['site']}\n")
+                f.write(f"\n=== {name}: top functions ===\n{stage['top_functions']}")
+
+        # One "frame;frame;frame count" line per stack, as consumed by flamegraph.pl / speedscope
+        with open(os.path.join(self.output_dir, 'stacks.collapsed'), 'w') as f:
+            for stack, count in self.sampler.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        if self.detailed:
+            tracemalloc.stop()
+        logger.info(f"Wrote profile report to {self.output_dir}")
+        return self.output_dir
+
+def make_profiler(enabled=False, sample_rate=0.0, output_dir='profiles'):
+    """Detailed profile if forced on, otherwise a light one with probability sample_rate"""
+    if enabled:
+        return Profiler(output_dir, detailed=True)
+    if sample_rate > 0 and random.random() < sample_rate:
+        return Profiler(output_dir, detailed=False)
+    return NULL_PROFILER
@@ -0,0 +1,209 @@
+# provision.py - Bulk creation of auth users from a users.json export
+#
+# Python replacement for scripts/migrate-users.ts, which created one auth user
+# at a time and left mapping to a separate run. Here accounts are created by a
+# bounded thread pool with exponential backoff on rate limits and server
+# errors, addresses that already have an account are skipped up front, and the
+# same pass upserts profiles and maps any Airtable emails waiting in
+# email_mapping_misses onto the new accounts in bulk.
+#
+# Every outcome is appended to a JSON-lines journal as it happens; a re-run
+# with the same journal skips the users it already handled. A profile is
+# upserted as soon as its account is created and journaled separately, so a
+# re-run also creates the profiles of accounts an interrupted run created.
+
+import json
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from genos_sync.email_mapping import EmailIndex, fetch_all
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+BCRYPT_PREFIXES = ('$2a$', '$2b$', '$2y$')
+DUPLICATE_USER_CODES = {'email_exists', 'user_already_exists'}
+
+class Journal:
+    """Append-only JSON-lines record of provisioning outcomes, safe to share between threads"""
+
+    def __init__(self, path):
+        self.path = path
+        self.done = {}
+        self.profiled = set()
+        self._lock = threading.Lock()
+        try:
+            with open(path) as f:
+                for line in f:
+                    if line.strip():
+                        self._track(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def write(self, email, status, **details):
+        entry = {'email': email, 'status': status, 'at': datetime.now(timezone.utc).isoformat(), **details}
+        with self._lock:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(entry) + '\n')
+            self._track(entry)
+        return entry
+
+    def _track(self, entry):
+        if entry['status'] in ('created', 'exists'):
+            self.done[entry['email']] = entry
+        elif entry['status'] == 'profiled':
+            self.profiled.add(entry['email'])
+
+    def unprofiled(self):
+        """Journaled 'created' entries whose profile was never upserted"""
+        return [
+            entry for email, entry in self.done.items()
+            if entry['status'] == 'created' and email not in self.profiled
+        ]
+
+def load_users(path):
+    with open(path) as f:
+        return json.load(f)
+
+def user_attributes(user):
+    """admin.create_user payload; users.json holds bcrypt hashes, which GoTrue imports as-is"""
+    attributes = {
+        'email': user['email'],
+        'email_confirm': True,
+        'user_metadata': {'created_at': user.get('createdAt')},
+    }
+    password = user.get('password')
+    if password and password.startswith(BCRYPT_PREFIXES):
+        attributes['password_hash'] = password
+    elif password:
+        attributes['password'] = password
+    return attributes
+
+def is_already_registered(error):
+    """Whether a create_user error is GoTrue's duplicate-user error, not just any 422"""
+    # Weak passwords and invalid emails are 422s too; those must be reported as failures
+    return (
+        getattr(error, 'code', None) in DUPLICATE_USER_CODES
+        or 'already been registered' in str(error).lower()
+    )
+
+def create_user(supabase_client, user, max_attempts=5, base_delay=0.5):
+    """Create one auth user, backing off on rate limits and server errors; returns it, or None if it exists"""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            response = supabase_client.auth.admin.create_user(user_attributes(user))
+            return response.user
+        except Exception as e:
+            if is_already_registered(e):
+                return None
+            status = getattr(e, 'status', None)
+            if attempt == max_attempts or (status is not None and status not in RETRYABLE_STATUSES):
+                raise
+            delay = base_delay * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+            logger.debug(f"Retrying {user['email']} in {delay:.1f}s after: {e}")
+            time.sleep(delay)
+
+def upsert_profiles(supabase_client, journal, entries):
+    """Upsert the profiles of journaled 'created' entries and journal each as profiled"""
+    # Older journal entries don't carry created_at; don't blank it on their profiles
+    dated = [{'id': entry['auth_id'], 'created_at': entry['created_at']} for entry in entries if entry.get('created_at')]
+    undated = [{'id': entry['auth_id']} for entry in entries if not entry.get('created_at')]
+    for profiles in (dated, undated):
+        if profiles:
+            supabase_client.table('profiles').upsert(profiles).execute()
+    for entry in entries:
+        journal.write(entry['email'], 'profiled', auth_id=entry['auth_id'])
+
+def provision_user(supabase_client, journal, user):
+    """Create one account and its profile, journaling each step as it completes; False if it existed"""
+    account = create_user(supabase_client, user)
+    if account is None:
+        journal.write(user['email'], 'exists')
+        return False
+    entry = journal.write(
+        user['email'], 'created', auth_id=account.id, auth_email=account.email, created_at=user.get('createdAt')
+    )
+    upsert_profiles(supabase_client, journal, [entry])
+    return True
+
+def map_waiting_airtable_emails(supabase_client, accounts):
+    """Map Airtable emails recorded as misses onto the given {auth email: id} accounts"""
+    misses = fetch_all(lambda: supabase_client.table('email_mapping_misses').select('airtable_email'), 'airtable_email')
+    index = EmailIndex(accounts)
+    now = datetime.now(timezone.utc).isoformat()
+    matches = []
+    for row in misses:
+        auth_email = index.match(row['airtable_email'])
+        if auth_email:
+            matches.append({
+                'airtable_email': row['airtable_email'],
+                'auth_email': auth_email,
+                'auto_matched': True,
+                'created_at': now
+            })
+    if matches:
+        supabase_client.table('user_mappings').upsert(matches, on_conflict='airtable_email,auth_email').execute()
+        supabase_client.table('email_mapping_misses').delete().in_(
+            'airtable_email', [match['airtable_email'] for match in matches]
+        ).execute()
+    return len(matches)
+
+def provision_users(supabase_client, users_path, journal_path=None, concurrency=8):
+    """Create auth users and profiles for users.json and map waiting Airtable emails to them"""
+    journal = Journal(journal_path or f"{users_path}.journal.jsonl")
+    users = load_users(users_path)
+
+    existing = {
+        row['email']: row
+        for row in fetch_all(lambda: supabase_client.table('users').select('id,email'), 'id')
+        if row.get('email')
+    }
+    index = EmailIndex(existing)
+    pending = []
+    for user in users:
+        email = user.get('email')
+        if not email or email in journal.done:
+            continue
+        auth_email = index.match(email)
+        if auth_email:
+            # The account's own spelling, which user_mappings has to match exactly
+            journal.write(email, 'exists', auth_id=existing[auth_email].get('id'), auth_email=auth_email)
+        else:
+            pending.append(user)
+    logger.info(
+        f"{len(users)} users in {users_path}: {len(pending)} to create, "
+        f"{len(users) - len(pending)} already provisioned"
+    )
+
+    # Accounts an interrupted run created before their profile was written
+    unprofiled = journal.unprofiled()
+    if unprofiled:
+        logger.info(f"Upserting {len(unprofiled)} profiles left over from an earlier run")
+        upsert_profiles(supabase_client, journal, unprofiled)
+
+    created = failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = {executor.submit(provision_user, supabase_client, journal, user): user for user in pending}
+        for future in as_completed(futures):
+            user = futures[future]
+            try:
+                created += future.result()
+            except Exception as e:
+                failed += 1
+                journal.write(user['email'], 'failed', error=str(e))
+                logger.error(f"Failed to provision {user['email']}: {e}")
+
+    accounts = {
+        entry.get('auth_email') or email: entry.get('auth_id')
+        for email, entry in journal.done.items()
+    }
+    mapped = map_waiting_airtable_emails(supabase_client, accounts)
+    logger.info(
+        f"Provisioning done: {created} created, {failed} failed, "
+        f"{mapped} Airtable emails mapped to provisioned accounts"
+    )
+    return failed == 0
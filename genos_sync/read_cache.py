@@ -0,0 +1,277 @@
+# read_cache.py - In-memory per-email cache behind /api/user-data-bypass
+#
+# The route used to build a fresh service-role client on every call, select
+# every weight_logs column for the email and rebuild the tolerance lists in
+# the request path. This service keeps the finished response per email: the
+# weight series in program-day order and the tolerance lists, serialised once.
+# The series leaves out the raw_fields archive, which the widgets don't read.
+# Responses sit in an LRU cache bounded by total bytes (READ_CACHE_MAX_MB).
+#
+# Invalidation follows the sync's change stream. The history trigger sends
+# NOTIFY weight_logs_changed with the email when a content change for that
+# email commits (migrations/017_weight_log_change_notify.sql), and the entry
+# is dropped at that point. While the listening connection is down nothing is
+# cached, and the cache is cleared whenever it (re)connects, so no
+# notification can be missed unnoticed.
+#
+#   GET /user-data?email=...   {"weightData": [...], "toleranceData": {...}}
+#   GET /metrics               hit rate, evictions, size and latency (Prometheus text)
+
+import json
+import time
+import select
+import logging
+import threading
+from collections import Counter, OrderedDict, deque
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+CHANNEL = 'weight_logs_changed'
+LATENCY_WINDOW = 1000
+QUANTILES = (0.5, 0.95, 0.99)
+RECONNECT_SECONDS = 5
+# How long a cache miss waits for a free database connection before a 503
+MISS_WAIT_SECONDS = 10
+
+# Same rows and order as the route's select('*').order('program_day'), without raw_fields
+WEIGHT_SERIES_QUERY = (
+    "SELECT coalesce(json_agg(to_jsonb(w) - 'raw_fields' ORDER BY w.program_day, w.recorded_on, w.airtable_id), "
+    "'[]'::json) FROM public.weight_logs w WHERE w.email = %(email)s"
+)
+
+def split_items(text):
+    return [item.strip() for item in (text or '').split(',') if item.strip()]
+
+def tolerance_data(rows):
+    """The route's toleranceData: foods and supplements per verdict, sorted and de-duplicated"""
+    found = {category: {'supplements': set(), 'foods': set()} for category in ('tolerant', 'intolerant')}
+    for row in rows:
+        category = 'tolerant' if (row.get('tolerant_intolerant') or '').lower() == 'tolerant' else 'intolerant'
+        for column in ('food_item_introduced', 'tolerant_food_items', 'intolerant_food_items'):
+            found[category]['foods'].update(split_items(row.get(column)))
+        found[category]['supplements'].update(split_items(row.get('supplement_introduced')))
+    return {category: {kind: sorted(items) for kind, items in kinds.items()} for category, kinds in found.items()}
+
+def build_response(conn, email):
+    """Serialised user-data response for one email"""
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(WEIGHT_SERIES_QUERY, {'email': email})
+            rows = cursor.fetchone()[0]
+    finally:
+        conn.rollback()
+    return json.dumps({'weightData': rows, 'toleranceData': tolerance_data(rows)}).encode('utf-8')
+
+def quantile(values, q):
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+class ReadCache:
+    """LRU of serialised responses per email, bounded by their total size in bytes"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        # A put is only accepted if no invalidation happened since its read started
+        self.generations = {}
+        self.epoch = 0
+        self.live = False
+        self.stats = Counter()
+        self.latencies = {'hit': deque(maxlen=LATENCY_WINDOW), 'miss': deque(maxlen=LATENCY_WINDOW)}
+        self.latency_sums = Counter()
+        self.latency_counts = Counter()
+        self.lock = threading.Lock()
+
+    def get(self, email):
+        """(cached body or None, token to pass to put)"""
+        with self.lock:
+            body = self.entries.get(email)
+            if body is not None:
+                self.entries.move_to_end(email)
+            self.stats['hits' if body is not None else 'misses'] += 1
+            return body, (self.epoch, self.generations.get(email, 0))
+
+    def put(self, email, body, token):
+        with self.lock:
+            if not self.live or token != (self.epoch, self.generations.get(email, 0)) or len(body) > self.max_bytes:
+                return False
+            previous = self.entries.pop(email, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self.entries[email] = body
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= len(evicted)
+                self.stats['evictions'] += 1
+            return True
+
+    def invalidate(self, email):
+        with self.lock:
+            self.generations[email] = self.generations.get(email, 0) + 1
+            body = self.entries.pop(email, None)
+            if body is not None:
+                self.size -= len(body)
+                self.stats['invalidations'] += 1
+
+    def reset(self, live):
+        """Drop everything; while not live (no change stream) nothing is cached"""
+        with self.lock:
+            self.entries.clear()
+            self.size = 0
+            self.generations.clear()
+            self.epoch += 1
+            self.live = live
+            self.stats['resets'] += 1
+
+    def count(self, stat):
+        with self.lock:
+            self.stats[stat] += 1
+
+    def observe(self, outcome, seconds):
+        with self.lock:
+            self.latencies[outcome].append(seconds)
+            self.latency_sums[outcome] += seconds
+            self.latency_counts[outcome] += 1
+
+    def metrics(self):
+        """Prometheus text exposition of the cache counters and latencies"""
+        with self.lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            lines = []
+            for name, kind, help_text, value in (
+                ('hits_total', 'counter', "Requests answered from the cache", self.stats['hits']),
+                ('misses_total', 'counter', "Requests that read weight_logs", self.stats['misses']),
+                ('hit_ratio', 'gauge', "Hits over all requests since start", self.stats['hits'] / lookups if lookups else 0.0),
+                ('invalidations_total', 'counter', "Entries dropped on a change notification", self.stats['invalidations']),
+                ('evictions_total', 'counter', "Entries dropped to stay under the size limit", self.stats['evictions']),
+                ('resets_total', 'counter', "Times the cache was cleared by a listener (re)connect", self.stats['resets']),
+                ('rejected_total', 'counter', "Misses answered 503 because no connection was free", self.stats['rejected']),
+                ('entries', 'gauge', "Cached emails", len(self.entries)),
+                ('bytes', 'gauge', "Size of the cached responses", self.size),
+                ('max_bytes', 'gauge', "Size limit", self.max_bytes),
+                ('listener_up', 'gauge', "1 while change notifications are being received", int(self.live)),
+            ):
+                rendered = f"{value:.4f}" if isinstance(value, float) else str(value)
+                lines += [f"# HELP genos_read_cache_{name} {help_text}", f"# TYPE genos_read_cache_{name} {kind}",
+                          f"genos_read_cache_{name} {rendered}"]
+            lines += ["# HELP genos_read_cache_request_seconds Request latency by cache outcome",
+                      "# TYPE genos_read_cache_request_seconds summary"]
+            for outcome, window in self.latencies.items():
+                lines += [f'genos_read_cache_request_seconds{{outcome="{outcome}",quantile="{q}"}} {quantile(window, q):.6f}'
+                          for q in QUANTILES]
+                lines.append(f'genos_read_cache_request_seconds_sum{{outcome="{outcome}"}} {self.latency_sums[outcome]:.6f}')
+                lines.append(f'genos_read_cache_request_seconds_count{{outcome="{outcome}"}} {self.latency_counts[outcome]}')
+        return '\n'.join(lines) + '\n'
+
+def listen_for_changes(database_url, cache, stop):
+    """Invalidate cache entries from weight_logs_changed notifications until stop is set"""
+    import psycopg2
+    import psycopg2.extensions
+
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(database_url)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            # Anything read before LISTEN took effect may have missed its notification
+            cache.reset(live=True)
+            logger.info(f"Listening for {CHANNEL} notifications")
+            while not stop.is_set():
+                if select.select([conn], [], [], 5) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    cache.invalidate(conn.notifies.pop(0).payload)
+        except Exception as e:
+            logger.warning(f"Change listener disconnected, caching paused: {e}")
+            cache.reset(live=False)
+            stop.wait(RECONNECT_SECONDS)
+        finally:
+            if conn is not None:
+                conn.close()
+
+def serve_read_cache(database_url, host='127.0.0.1', port=8766, token=None, max_bytes=64 * 1024 * 1024, pool_size=4):
+    """Serve GET /user-data?email=... from the cache and GET /metrics until interrupted"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs, urlparse
+    from psycopg2.pool import ThreadedConnectionPool
+
+    cache = ReadCache(max_bytes)
+    pool = ThreadedConnectionPool(1, pool_size, database_url)
+    # getconn raises instead of blocking once the pool is exhausted, so misses
+    # queue here for one of its pool_size connections
+    connection_slots = threading.BoundedSemaphore(pool_size)
+    stop = threading.Event()
+    listener = threading.Thread(target=listen_for_changes, args=(database_url, cache, stop), daemon=True)
+    listener.start()
+
+    class ReadCacheHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def send_body(self, status, body, content_type='application/json', cache_status=None):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            if cache_status:
+                self.send_header('X-Cache', cache_status)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def send_error_json(self, status, message):
+            self.send_body(status, json.dumps({'error': message}).encode('utf-8'))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == '/metrics':
+                return self.send_body(200, cache.metrics().encode('utf-8'), 'text/plain; version=0.0.4')
+            if url.path != '/user-data':
+                return self.send_error_json(404, 'Not found')
+            if token and self.headers.get('Authorization') != f"Bearer {token}":
+                return self.send_error_json(401, 'Unauthorized')
+            email = (parse_qs(url.query).get('email') or [None])[0]
+            if not email:
+                return self.send_error_json(400, 'Email parameter is required')
+
+            started = time.perf_counter()
+            body, cache_token = cache.get(email)
+            if body is not None:
+                self.send_body(200, body, cache_status='HIT')
+                cache.observe('hit', time.perf_counter() - started)
+                return
+            if not connection_slots.acquire(timeout=MISS_WAIT_SECONDS):
+                cache.count('rejected')
+                return self.send_error_json(503, 'Too many concurrent requests, try again shortly')
+            conn = None
+            try:
+                conn = pool.getconn()
+                body = build_response(conn, email)
+            except Exception as e:
+                logger.error(f"Reading weight logs for {email} failed: {e}")
+                if conn is not None:
+                    pool.putconn(conn, close=True)
+                return self.send_error_json(503 if conn is None else 500, 'Failed to fetch weight data')
+            else:
+                pool.putconn(conn)
+            finally:
+                connection_slots.release()
+            cache.put(email, body, cache_token)
+            self.send_body(200, body, cache_status='MISS')
+            cache.observe('miss', time.perf_counter() - started)
+
+        def log_message(self, format, *args):
+            logger.debug(f"{self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((host, port), ReadCacheHandler)
+    logger.info(f"Serving cached user data on http://{host}:{port}/user-data ({max_bytes // (1024 * 1024)} MB cache)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        pool.closeall()
@@ -0,0 +1,223 @@
+# recipe_eligibility.py - Per-user recipe eligibility index for the PlatePlanner
+#
+# Recipes are parsed once per run into a catalogue of canonical ingredient
+# tokens (public.recipe_catalog). For each user, every recipe containing one
+# of their intolerant foods (weight_log_food_items) is excluded, and the
+# remaining recipe IDs are stored per (email, phase, meal type) in
+# public.recipe_eligibility.
+#
+# Each eligibility row carries a fingerprint of the user's intolerances and of
+# the catalogue it was computed from, so a user is only recomputed when one of
+# the two changed: users touched by the run are checked against their
+# fingerprint, and a catalogue change recomputes everyone already indexed.
+#
+# The catalogue also holds each recipe's card as /api/recipes returns it, so
+# the route serves the recipe list without an Airtable request.
+
+import re
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from genos_sync.email_mapping import fetch_all
+from genos_sync.sync import update_sync_metadata
+from genos_sync.transform import canonical_food_key, chunk_list, parse_phase
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+METADATA_KEY = 'recipe_catalog'
+RECIPE_FIELDS = [
+    'Recipe Name', 'Dish Image', 'Ingredients', 'Instructions', 'Calories', 'Carbs', 'Proteins', 'Fats',
+    'Diet Type', 'Meal Type', 'Phase', 'Protein/Non-Protein Meal',
+]
+INGREDIENT_SPLIT_PATTERN = re.compile(r'[\n,;]+')
+INGREDIENT_BULLET_PATTERN = re.compile(r'^[-\u2013\u2014]')
+FOOD_ALIAS_PATTERN = re.compile(r'[()/]')
+ANY = 'any'
+
+def as_list(value):
+    if isinstance(value, list):
+        return [item for item in value if item]
+    return [value] if value else []
+
+def singular(token):
+    if len(token) > 3 and token.endswith('es') and token[-3] in 'sxz':
+        return token[:-2]
+    if len(token) > 3 and token.endswith('s') and not token.endswith('ss'):
+        return token[:-1]
+    return token
+
+def food_tokens(text):
+    """Canonical, singularised tokens of a food label or ingredient line"""
+    return frozenset(singular(token) for token in canonical_food_key(text).split())
+
+def food_aliases(label):
+    """Token sets a food label can appear as: 'PRAWN (Shrimp)' -> {prawn}, {shrimp}"""
+    return [tokens for tokens in map(food_tokens, FOOD_ALIAS_PATTERN.split(label)) if tokens]
+
+def label_key(label):
+    """Phase / meal type key, matching eligibilityKey() in app/api/recipes/route.ts"""
+    return canonical_food_key(str(label)).replace(' ', '_')
+
+def digest(*parts):
+    return hashlib.md5('\x1f'.join(parts).encode('utf-8')).hexdigest()
+
+def first(value):
+    """First entry of a multi-select or lookup field, or the value itself"""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+def attachment_url(value):
+    value = first(value)
+    if isinstance(value, dict):
+        return value.get('url') or ''
+    return value if isinstance(value, str) else ''
+
+def recipe_display(record):
+    """The recipe card /api/recipes returns, before mirrored images are applied"""
+    fields = record.get('fields', {})
+    ingredients = str(fields.get('Ingredients') or '')
+    diet_type = fields.get('Diet Type')
+    return {
+        'id': record['id'],
+        'name': fields.get('Recipe Name') or '',
+        'image': attachment_url(fields.get('Dish Image')),
+        'ingredients': [
+            line for line in (INGREDIENT_BULLET_PATTERN.sub('', item.strip()).strip() for item in ingredients.split('\n'))
+            if line
+        ],
+        'instructions': fields.get('Instructions') or '',
+        'calories': fields.get('Calories') or 0,
+        'carbs': fields.get('Carbs') or 0,
+        'proteins': fields.get('Proteins') or 0,
+        'fats': fields.get('Fats') or 0,
+        'dietType': diet_type if isinstance(diet_type, list) else [diet_type or ''],
+        'mealType': first(fields.get('Meal Type')) or '',
+        'phase': first(fields.get('Phase')) or '',
+        'proteinMealType': first(fields.get('Protein/Non-Protein Meal')) or '',
+    }
+
+def parse_recipe(record):
+    """recipe_catalog row for an Airtable recipe"""
+    fields = record.get('fields', {})
+    ingredients = fields.get('Ingredients') or ''
+    lines = [food_tokens(line) for line in INGREDIENT_SPLIT_PATTERN.split(str(ingredients))]
+    ingredient_keys = sorted({' '.join(sorted(tokens)) for tokens in lines if tokens})
+    phases = sorted({parse_phase(phase) or label_key(phase) for phase in as_list(fields.get('Phase'))})
+    meal_types = sorted({label_key(meal_type) for meal_type in as_list(fields.get('Meal Type'))})
+    row = {
+        'recipe_airtable_id': record['id'],
+        'name': fields.get('Recipe Name'),
+        'phases': phases,
+        'meal_types': meal_types,
+        'diet_types': as_list(fields.get('Diet Type')),
+        'ingredient_keys': ingredient_keys,
+    }
+    row['content_hash'] = digest(*ingredient_keys, '|', *phases, '|', *meal_types, '|', *row['diet_types'])
+    # Kept apart from content_hash: a new photo or instructions don't change eligibility
+    row['display'] = recipe_display(record)
+    row['display_hash'] = digest(json.dumps(row['display'], sort_keys=True, default=str))
+    return row
+
+def recipe_excluded(recipe, aliases):
+    """Whether any ingredient line of the recipe contains one of the intolerant food aliases"""
+    lines = [frozenset(key.split()) for key in recipe['ingredient_keys']]
+    return any(alias <= line for alias in aliases for line in lines)
+
+def eligibility_rows(email, catalog, intolerant_labels, tolerance_hash, catalog_hash, now):
+    """recipe_eligibility rows for one user, including 'any' phase / meal type roll-ups
+    and an ('any', 'any') row in every case"""
+    aliases = [alias for label in intolerant_labels for alias in food_aliases(label)]
+    # Always written, even when nothing is eligible: it marks the user as indexed
+    # for the recipes route and holds the fingerprints checked on the next run
+    groups = {(ANY, ANY): []}
+    for recipe in catalog:
+        if recipe_excluded(recipe, aliases):
+            continue
+        for phase in [ANY, *recipe['phases']]:
+            for meal_type in [ANY, *recipe['meal_types']]:
+                groups.setdefault((phase, meal_type), []).append(recipe['recipe_airtable_id'])
+    return [
+        {
+            'email': email,
+            'phase': phase,
+            'meal_type': meal_type,
+            'recipe_ids': sorted(recipe_ids),
+            'tolerance_hash': tolerance_hash,
+            'catalog_hash': catalog_hash,
+            'refreshed_at': now,
+        }
+        for (phase, meal_type), recipe_ids in groups.items()
+    ]
+
+def load_intolerances(supabase_client, emails):
+    """email -> sorted intolerant food labels, for the given emails"""
+    labels = {email: set() for email in emails}
+    for chunk in chunk_list(sorted(emails), 100):
+        rows = fetch_all(lambda: supabase_client.table('weight_log_food_items')
+                         .select('email,food_label')
+                         .eq('status', 'intolerant')
+                         .in_('email', chunk), 'id')
+        for row in rows:
+            labels[row['email']].add(row['food_label'])
+    return {email: sorted(found) for email, found in labels.items()}
+
+def sync_recipe_catalog(supabase_client, recipes_table):
+    """Parse every recipe into recipe_catalog; returns (catalogue rows, catalogue hash)"""
+    sync_time = datetime.now(timezone.utc).isoformat()
+    catalog = [parse_recipe(record) for record in recipes_table.all(fields=RECIPE_FIELDS)]
+    catalog_hash = digest(*sorted(f"{row['recipe_airtable_id']}:{row['content_hash']}" for row in catalog))
+    stored = {
+        row['recipe_airtable_id']: (row['content_hash'], row.get('display_hash'))
+        for row in fetch_all(lambda: supabase_client.table('recipe_catalog')
+                             .select('recipe_airtable_id,content_hash,display_hash'), 'recipe_airtable_id')
+    }
+    changed = [
+        row for row in catalog
+        if stored.get(row['recipe_airtable_id']) != (row['content_hash'], row['display_hash'])
+    ]
+    for chunk in chunk_list(changed, 500):
+        supabase_client.table('recipe_catalog').upsert(chunk, on_conflict='recipe_airtable_id').execute()
+    removed = sorted(set(stored) - {row['recipe_airtable_id'] for row in catalog})
+    for chunk in chunk_list(removed, 100):
+        supabase_client.table('recipe_catalog').delete().in_('recipe_airtable_id', chunk).execute()
+    logger.info(f"Recipe catalogue: {len(catalog)} recipes, {len(changed)} changed, {len(removed)} removed")
+    update_sync_metadata(supabase_client, METADATA_KEY, sync_time, changed=len(changed) + len(removed))
+    return catalog, catalog_hash
+
+def refresh_recipe_eligibility(supabase_client, recipes_table, emails=(), everyone=False):
+    """Recompute eligibility for users whose intolerances or the recipe catalogue changed"""
+    catalog, catalog_hash = sync_recipe_catalog(supabase_client, recipes_table)
+
+    fingerprints = {}
+    for row in fetch_all(lambda: supabase_client.table('recipe_eligibility')
+                         .select('email,tolerance_hash,catalog_hash')
+                         .eq('phase', ANY)
+                         .eq('meal_type', ANY), 'email'):
+        fingerprints[row['email']] = (row['tolerance_hash'], row['catalog_hash'])
+
+    candidates = {email for email in emails if email}
+    if everyone:
+        candidates |= {
+            row['email'] for row in fetch_all(lambda: supabase_client.table('weight_log_food_items')
+                                              .select('email').eq('status', 'intolerant'), 'id')
+            if row.get('email')
+        }
+    # A changed catalogue invalidates every indexed user
+    candidates |= {email for email, (_, indexed_catalog) in fingerprints.items() if indexed_catalog != catalog_hash}
+
+    intolerances = load_intolerances(supabase_client, candidates)
+    now = datetime.now(timezone.utc).isoformat()
+    refreshed = 0
+    for email, labels in sorted(intolerances.items()):
+        tolerance_hash = digest(*labels)
+        if fingerprints.get(email) == (tolerance_hash, catalog_hash):
+            continue
+        rows = eligibility_rows(email, catalog, labels, tolerance_hash, catalog_hash, now)
+        supabase_client.table('recipe_eligibility').delete().eq('email', email).execute()
+        supabase_client.table('recipe_eligibility').insert(rows).execute()
+        refreshed += 1
+    logger.info(f"Recipe eligibility: recomputed {refreshed} of {len(candidates)} candidate users")
+    return refreshed
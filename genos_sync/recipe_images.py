@@ -0,0 +1,142 @@
+# recipe_images.py - Mirror of recipe dish images with pre-sized thumbnails
+#
+# The PlatePlanner used to hot-link fields['Dish Image'][0].url, an expiring
+# full-size Airtable attachment URL. This copies each recipe's dish image into
+# a Supabase Storage bucket (or a local directory standing in for one, e.g.
+# public/recipe-images) under its SHA-256, writes WebP thumbnails at the widths
+# the recipe cards render, and records stable URLs in public.recipe_images.
+#
+# Re-runs only download attachments whose Airtable attachment ID changed
+# (a re-uploaded file gets a new ID), and an image whose content hash is
+# already stored, e.g. shared by several recipes, is never re-uploaded.
+
+import io
+import os
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from genos_sync.email_mapping import fetch_all
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+IMAGE_FIELD = 'Dish Image'
+# Recipe cards are 150px (mobile) and 200px wide; 400 covers 2x displays
+THUMBNAIL_WIDTHS = (150, 200, 400)
+DOWNLOAD_TIMEOUT = 30
+
+class StorageBucket:
+    """Supabase Storage bucket with public URLs"""
+
+    def __init__(self, supabase_client, bucket):
+        self.bucket = supabase_client.storage.from_(bucket)
+
+    def put(self, path, data, content_type):
+        self.bucket.upload(path, data, file_options={'content-type': content_type, 'upsert': 'true'})
+        return self.bucket.get_public_url(path)
+
+class LocalBucket:
+    """Directory standing in for a bucket, served from base_url (e.g. Next.js public/)"""
+
+    def __init__(self, directory, base_url):
+        self.directory = directory
+        self.base_url = base_url.rstrip('/')
+
+    def put(self, path, data, content_type):
+        target = os.path.join(self.directory, path)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target + '.tmp', 'wb') as f:
+            f.write(data)
+        os.replace(target + '.tmp', target)
+        return f"{self.base_url}/{path}"
+
+def dish_image(fields):
+    """The first Dish Image attachment of a recipe, or None"""
+    attachments = fields.get(IMAGE_FIELD)
+    if isinstance(attachments, list) and attachments and isinstance(attachments[0], dict):
+        return attachments[0]
+    return None
+
+def make_thumbnails(data):
+    """(width, height, {thumbnail width: WebP bytes}) for an image; never upscales"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        width, height = image.size
+        thumbnails = {}
+        for target_width in THUMBNAIL_WIDTHS:
+            thumbnail = image.copy()
+            thumbnail.thumbnail((target_width, height), Image.LANCZOS)
+            buffer = io.BytesIO()
+            thumbnail.save(buffer, 'WEBP', quality=80, method=6)
+            thumbnails[target_width] = buffer.getvalue()
+    return width, height, thumbnails
+
+def store_image(bucket, data, content_type):
+    """Upload an image and its thumbnails under its content hash; returns the recipe_images columns"""
+    content_hash = hashlib.sha256(data).hexdigest()
+    width, height, thumbnails = make_thumbnails(data)
+    extension = (content_type or 'image/jpeg').rsplit('/', 1)[-1]
+    return {
+        'content_hash': content_hash,
+        'content_type': content_type,
+        'width': width,
+        'height': height,
+        'url': bucket.put(f"originals/{content_hash}.{extension}", data, content_type),
+        'thumbnails': {
+            str(thumbnail_width): bucket.put(f"thumbnails/{content_hash}-{thumbnail_width}.webp", thumbnail, 'image/webp')
+            for thumbnail_width, thumbnail in thumbnails.items()
+        },
+    }
+
+def mirror_recipe_images(supabase_client, airtable, bucket, force=False):
+    """Mirror the dish image of every recipe whose attachment changed since the last run"""
+    import requests
+
+    existing = {
+        row['recipe_airtable_id']: row
+        for row in fetch_all(lambda: supabase_client.table('recipe_images').select('*'), 'recipe_airtable_id')
+    }
+    # With force every image is re-uploaded once, even if it is already stored
+    by_hash = {} if force else {row['content_hash']: row for row in existing.values()}
+
+    rows, unchanged, failed = [], 0, 0
+    with requests.Session() as session:
+        for record in airtable.all(fields=[IMAGE_FIELD]):
+            attachment = dish_image(record.get('fields', {}))
+            if attachment is None:
+                continue
+            current = existing.get(record['id'])
+            if current and current['attachment_id'] == attachment['id'] and not force:
+                unchanged += 1
+                continue
+            try:
+                response = session.get(attachment['url'], timeout=DOWNLOAD_TIMEOUT)
+                response.raise_for_status()
+            except Exception as e:
+                failed += 1
+                logger.warning(f"Could not download the image of recipe {record['id']}: {e}")
+                continue
+            data = response.content
+            content_hash = hashlib.sha256(data).hexdigest()
+            stored = by_hash.get(content_hash)
+            if stored is None:
+                try:
+                    stored = store_image(bucket, data, attachment.get('type') or response.headers.get('content-type'))
+                except Exception as e:
+                    failed += 1
+                    logger.warning(f"Could not store the image of recipe {record['id']}: {e}")
+                    continue
+                by_hash[content_hash] = stored
+            rows.append({
+                'recipe_airtable_id': record['id'],
+                'attachment_id': attachment['id'],
+                **{column: stored[column] for column in ('content_hash', 'content_type', 'width', 'height', 'url', 'thumbnails')},
+                'mirrored_at': datetime.now(timezone.utc).isoformat(),
+            })
+
+    if rows:
+        supabase_client.table('recipe_images').upsert(rows, on_conflict='recipe_airtable_id').execute()
+    logger.info(f"Recipe images: {len(rows)} mirrored, {unchanged} unchanged, {failed} failed")
+    return failed == 0
@@ -0,0 +1,185 @@
+# records.py - Compact in-flight representation of a run's weight log records
+#
+# pyairtable hands back one nested dict per record, and a full refresh used to
+# keep all of them alive alongside a 25-key dict per transformed row. Instead,
+# Airtable pages are converted as they stream in to a column store whose layout
+# is generated from FIELD_MAPPING: numeric columns are packed into typed
+# `array`s (NaN / a sentinel for NULL) and other columns are plain lists. Row
+# dicts only exist for the batch currently being upserted, and batches are
+# addressed by index range rather than by slicing lists.
+#
+# The raw_fields archive is kept as (field-name tuple, value tuple) pairs: the
+# name tuples are shared by every record with the same field set, and string
+# values are deduplicated per store, so emails, phases and food lists that
+# repeat across thousands of logs are held once. Each record's createdTime is
+# archived next to it, since recorded_on falls back to it.
+#
+# Numeric measurement columns are coerced a page at a time with NumPy instead
+# of one safe_float / safe_int call per value; the arrays are then checked by
+# genos_sync.validation before anything is upserted.
+
+import math
+from array import array
+from datetime import datetime, timezone
+
+import numpy as np
+
+from genos_sync.transform import (
+    FIELD_MAPPING,
+    INT_LIMIT,
+    column_values,
+    parse_program_day,
+    safe_float,
+    safe_int,
+)
+
+FLOAT_COLUMNS = tuple(column for column, (_, convert) in FIELD_MAPPING.items() if convert is safe_float)
+INT_COLUMNS = tuple(
+    column for column, (_, convert) in FIELD_MAPPING.items() if convert in (safe_int, parse_program_day)
+)
+OBJECT_COLUMNS = ('email', *(column for column in FIELD_MAPPING if column not in FLOAT_COLUMNS + INT_COLUMNS))
+# Columns converted per page by coerce_column rather than per value
+COERCED_COLUMNS = tuple(column for column, (_, convert) in FIELD_MAPPING.items() if convert in (safe_float, safe_int))
+
+INT_NULL = -2 ** 63
+
+def coerce_column(values):
+    """float64 array of raw Airtable values, NaN for blanks and anything unparsable"""
+    try:
+        # None -> NaN; numbers and numeric strings are converted in C
+        column = np.array(values, dtype=np.float64)
+    except (ValueError, TypeError):
+        column = None
+    if column is None or column.shape != (len(values),):
+        # Blank strings, text or lookup lists somewhere in the page: convert value by value
+        column = np.array([safe_float(value) for value in values], dtype=np.float64)
+    return column
+
+def to_int_column(column):
+    """int64 array of a coerced column, INT_NULL where safe_int would return None
+    (NaN, fractional values and overflow)"""
+    ints = np.full(len(column), INT_NULL, dtype=np.int64)
+    with np.errstate(invalid='ignore'):
+        valid = np.isfinite(column) & (np.abs(column) < INT_LIMIT) & (column == np.trunc(column))
+    ints[valid] = column[valid]
+    return ints
+
+def emails_in(fields):
+    """Every address in an Airtable Email field, which may be a string or a list"""
+    email = fields.get('Email')
+    if isinstance(email, list):
+        return [item for item in email if item]
+    return [email] if email else []
+
+class RecordStore:
+    """Column store of transformed records for one sync run"""
+
+    def __init__(self):
+        self.airtable_ids = []
+        self.created_times = []
+        self.raw_fields = []
+        self.floats = {column: array('d') for column in FLOAT_COLUMNS}
+        self.ints = {column: array('q') for column in INT_COLUMNS}
+        self.objects = {column: [] for column in OBJECT_COLUMNS}
+        self.unique_emails = set()
+        self._field_names = {}
+        self._strings = {}
+
+    def _shared(self, value):
+        if isinstance(value, str):
+            return self._strings.setdefault(value, value)
+        if isinstance(value, list):
+            # Tuples of strings are untracked by the cyclic GC; json encodes them as arrays
+            return tuple(map(self._shared, value))
+        return value
+
+    @classmethod
+    def from_records(cls, records):
+        store = cls()
+        store.extend(records)
+        return store
+
+    def __len__(self):
+        return len(self.airtable_ids)
+
+    def append(self, record):
+        self.extend([record])
+
+    def extend(self, records):
+        """Add a page of records, filling the store column by column"""
+        page = column_values(records, raw_columns=COERCED_COLUMNS)
+        self.airtable_ids.extend(page['airtable_id'])
+        self.created_times.extend(record.get('createdTime') for record in records)
+        for record in records:
+            fields = record.get('fields', {})
+            names = tuple(fields)
+            self.raw_fields.append(
+                (self._field_names.setdefault(names, names), tuple(map(self._shared, fields.values())))
+            )
+            self.unique_emails.update(emails_in(fields))
+
+        for column in COERCED_COLUMNS:
+            # One NumPy conversion per column instead of a safe_float / safe_int call per value
+            coerced = coerce_column(page[column])
+            if column in self.floats:
+                self.floats[column].frombytes(coerced.tobytes())
+            else:
+                self.ints[column].frombytes(to_int_column(coerced).tobytes())
+        for column, data in self.ints.items():
+            if column not in COERCED_COLUMNS:
+                data.extend(INT_NULL if value is None else value for value in page[column])
+        for column, data in self.objects.items():
+            data.extend(map(self._shared, page[column]))
+
+    def numeric(self, column):
+        """Writable float64 / int64 view of a numeric column; release it before extending the store"""
+        if column in self.floats:
+            return np.frombuffer(self.floats[column], dtype=np.float64)
+        return np.frombuffer(self.ints[column], dtype=np.int64)
+
+    def set_null(self, column, index):
+        if column in self.floats:
+            self.floats[column][index] = math.nan
+        else:
+            self.ints[column][index] = INT_NULL
+
+    def value(self, column, index):
+        if column in self.floats:
+            value = self.floats[column][index]
+            return None if math.isnan(value) else value
+        if column in self.ints:
+            value = self.ints[column][index]
+            return None if value == INT_NULL else value
+        return self.objects[column][index]
+
+    def column(self, column, start, stop):
+        """Values of one column for rows [start, stop), with NULLs restored"""
+        if column in self.floats:
+            return [None if value != value else value for value in self.floats[column][start:stop]]
+        if column in self.ints:
+            return [None if value == INT_NULL else value for value in self.ints[column][start:stop]]
+        return self.objects[column][start:stop]
+
+    def rows(self, start, stop, available_columns):
+        """Materialise rows [start, stop) as upsert payloads restricted to available_columns"""
+        stop = min(stop, len(self))
+        columns = ['airtable_id'] + [
+            column for column in (*self.floats, *self.ints, *self.objects)
+            if column in available_columns
+        ]
+        values = [self.airtable_ids[start:stop]] + [self.column(column, start, stop) for column in columns[1:]]
+        if 'raw_fields' in available_columns:
+            columns.append('raw_fields')
+            values.append([dict(zip(names, fields)) for names, fields in self.raw_fields[start:stop]])
+        if 'airtable_created_time' in available_columns:
+            columns.append('airtable_created_time')
+            values.append(self.created_times[start:stop])
+        if 'last_synced' in available_columns:
+            columns.append('last_synced')
+            values.append([datetime.now(timezone.utc).isoformat()] * (stop - start))
+        return [dict(zip(columns, row)) for row in zip(*values)]
+
+    def batches(self, batch_size):
+        """Index ranges covering the store in batch_size steps"""
+        for start in range(0, len(self), batch_size):
+            yield start, min(start + batch_size, len(self))
@@ -0,0 +1,255 @@
+# scheduler.py - Adaptive per-table sync scheduler
+#
+# Instead of syncing every table on one fixed cron interval, the scheduler
+# polls each Airtable-backed job as often as its change rate justifies. Every
+# incremental run records how many records changed in sync_metadata.run_history
+# (see update_sync_metadata), and the scheduler adds the Airtable requests the
+# run took. From that it estimates each table's changes per hour and cost per
+# poll, and splits a shared request budget (SYNC_SCHEDULE_REQUESTS_PER_HOUR)
+# between them.
+#
+# Expected staleness, sum(rate * interval / 2), is minimised under the budget
+# sum(cost / interval) <= budget by polling each table in proportion to
+# sqrt(rate / cost): hot tables are polled often, cold ones down to once a day.
+# A table is never polled more than POLLS_PER_CHANGE times per expected change,
+# so a generous budget is not spent on tables that rarely change.
+#
+# Decisions are stored in sync_metadata.schedule, logged, and optionally
+# written as Prometheus gauges to SYNC_METRICS_FILE (textfile collector format).
+
+import os
+import math
+import time
+import logging
+from datetime import datetime, timedelta, timezone
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+MIN_INTERVAL_HOURS = 5 / 60
+MAX_INTERVAL_HOURS = 24.0
+# Never poll more than this many times per expected change, however large the budget
+POLLS_PER_CHANGE = 4
+# Prior for tables with little history: about one change a day, weighted as one hour
+PRIOR_CHANGES = 1 / 24
+PRIOR_HOURS = 1.0
+PAGE_SIZE = 100
+# Longest the loop sleeps before re-planning, and the back-off after a failed run
+MAX_SLEEP_SECONDS = 300
+RETRY_SECONDS = MIN_INTERVAL_HOURS * 3600
+
+def run_weight_logs(config, clients):
+    from genos_sync.sync import sync_airtable_to_supabase
+    return sync_airtable_to_supabase(
+        config, clients, incremental=True, dashboard_snapshots=bool(config.airtable_intake_table_name)
+    )
+
+def run_blood_markers(config, clients):
+    from genos_sync.blood_markers import sync_blood_markers
+    return sync_blood_markers(
+        clients.supabase, clients.airtable(config.airtable_blood_reports_table_name), True, config.batch_size
+    )
+
+def run_recipe_catalog(config, clients):
+    from genos_sync.recipe_eligibility import refresh_recipe_eligibility
+    refresh_recipe_eligibility(clients.supabase, clients.airtable(config.airtable_recipes_table_name))
+    return True
+
+JOBS = {
+    'weight_logs': run_weight_logs,
+    'blood_markers': run_blood_markers,
+    'recipe_catalog': run_recipe_catalog,
+}
+
+def metadata_key(config, job_name):
+    """sync_metadata row a job records its runs in"""
+    return config.supabase_table_name if job_name == 'weight_logs' else job_name
+
+def scheduled_jobs(config, job_names=None):
+    """sync_metadata key -> job run by the scheduler, optionally only the named JOBS"""
+    return {
+        metadata_key(config, name): job
+        for name, job in JOBS.items()
+        if job_names is None or name in job_names
+    }
+
+def parse_time(value):
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+def change_rate(history, now):
+    """Changes per hour over the recorded runs, smoothed towards the prior while history is short"""
+    if not history:
+        return PRIOR_CHANGES / PRIOR_HOURS
+    hours = max((now - parse_time(history[0]['at'])).total_seconds() / 3600, 0.0)
+    # The oldest run's count covers time before the window
+    changed = sum(run.get('changed') or 0 for run in history[1:])
+    return (changed + PRIOR_CHANGES) / (hours + PRIOR_HOURS)
+
+def requests_per_run(history):
+    """Mean Airtable requests per run, estimated from the change counts where none were measured"""
+    measured = [run['requests'] for run in history if run.get('requests')]
+    if measured:
+        return sum(measured) / len(measured)
+    changed = [run.get('changed') or 0 for run in history]
+    return 1 + math.ceil(sum(changed) / len(changed) / PAGE_SIZE) if changed else 1
+
+def interval_floor(rate):
+    """Shortest useful interval: a quiet table gains nothing from polls between its changes"""
+    return min(max(MIN_INTERVAL_HOURS, 1 / (rate * POLLS_PER_CHANGE)), MAX_INTERVAL_HOURS)
+
+def allocate(rates, costs, budget):
+    """Poll interval in hours per table, spending at most `budget` requests per hour where possible"""
+    floors = {key: interval_floor(rate) for key, rate in rates.items()}
+    intervals = {}
+    free = set(rates)
+    remaining = budget
+    while free:
+        weight = sum(math.sqrt(rates[key] * costs[key]) for key in free)
+        scale = remaining / weight if weight > 0 and remaining > 0 else 0.0
+        candidates = {}
+        for key in free:
+            frequency = scale * math.sqrt(rates[key] / costs[key])
+            candidates[key] = 1 / frequency if frequency > 0 else MAX_INTERVAL_HOURS
+        clamped = {
+            key: min(max(interval, floors[key]), MAX_INTERVAL_HOURS)
+            for key, interval in candidates.items()
+            if not floors[key] <= interval <= MAX_INTERVAL_HOURS
+        }
+        if not clamped:
+            intervals.update(candidates)
+            break
+        # Pin the clamped tables and share what is left between the others
+        for key, interval in clamped.items():
+            intervals[key] = interval
+            remaining -= costs[key] / interval
+            free.discard(key)
+    return intervals
+
+def load_metadata(supabase_client, keys):
+    response = supabase_client.table('sync_metadata') \
+        .select('table_name,last_sync,run_history') \
+        .in_('table_name', list(keys)) \
+        .execute()
+    return {row['table_name']: row for row in response.data or []}
+
+def plan_schedule(supabase_client, keys, budget, now=None):
+    """key -> schedule decision (rate, cost, interval, next run, budget share, due)"""
+    now = now or datetime.now(timezone.utc)
+    metadata = load_metadata(supabase_client, keys)
+    histories = {key: (metadata.get(key) or {}).get('run_history') or [] for key in keys}
+    rates = {key: change_rate(history, now) for key, history in histories.items()}
+    costs = {key: requests_per_run(history) for key, history in histories.items()}
+    intervals = allocate(rates, costs, budget)
+
+    plan = {}
+    for key in keys:
+        history = histories[key]
+        last_run = parse_time(history[-1]['at']) if history else parse_time((metadata.get(key) or {}).get('last_sync'))
+        interval = timedelta(hours=intervals[key])
+        next_run = last_run + interval if last_run else now
+        plan[key] = {
+            'rate_per_hour': round(rates[key], 4),
+            'requests_per_run': round(costs[key], 2),
+            'interval_seconds': round(interval.total_seconds()),
+            'budget_share': round(costs[key] / intervals[key] / budget, 4) if budget > 0 else 0.0,
+            'last_run_at': last_run.isoformat() if last_run else None,
+            'next_run_at': next_run.isoformat(),
+            'due': next_run <= now,
+        }
+    return plan
+
+def save_decisions(supabase_client, plan):
+    for key, decision in plan.items():
+        supabase_client.table('sync_metadata').update({'schedule': decision}).eq('table_name', key).execute()
+
+def record_requests(supabase_client, key, requests):
+    """Attach the measured request count to the run the job just recorded"""
+    response = supabase_client.table('sync_metadata').select('run_history').eq('table_name', key).execute()
+    history = (response.data[0].get('run_history') if response.data else None) or []
+    if history:
+        history[-1]['requests'] = requests
+        supabase_client.table('sync_metadata').update({'run_history': history}).eq('table_name', key).execute()
+
+def write_metrics(path, plan, requests_total, now=None):
+    """Write the schedule as Prometheus gauges, replacing the file atomically"""
+    now = now or datetime.now(timezone.utc)
+    gauges = [
+        ('change_rate_per_hour', "Estimated Airtable records changed per hour", 'rate_per_hour'),
+        ('requests_per_run', "Mean Airtable requests per run", 'requests_per_run'),
+        ('poll_interval_seconds', "Scheduled interval between runs", 'interval_seconds'),
+        ('budget_share', "Fraction of the request budget allocated to the table", 'budget_share'),
+    ]
+    lines = []
+    for name, help_text, field in gauges:
+        lines += [f"# HELP genos_sync_{name} {help_text}", f"# TYPE genos_sync_{name} gauge"]
+        lines += [f'genos_sync_{name}{{table="{key}"}} {decision[field]}' for key, decision in sorted(plan.items())]
+    lines += ["# HELP genos_sync_seconds_since_last_run Age of the table's last completed run",
+              "# TYPE genos_sync_seconds_since_last_run gauge"]
+    for key, decision in sorted(plan.items()):
+        if decision['last_run_at']:
+            age = (now - parse_time(decision['last_run_at'])).total_seconds()
+            lines.append(f'genos_sync_seconds_since_last_run{{table="{key}"}} {round(age)}')
+    lines += ["# HELP genos_sync_airtable_requests_total Airtable requests made by this scheduler process",
+              "# TYPE genos_sync_airtable_requests_total counter",
+              f"genos_sync_airtable_requests_total {requests_total}"]
+    write_textfile(path, lines)
+
+def write_textfile(path, lines):
+    """Replace a Prometheus textfile atomically, so the collector never reads half a file"""
+    with open(path + '.tmp', 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    os.replace(path + '.tmp', path)
+
+def log_plan(plan):
+    for key, decision in sorted(plan.items()):
+        logger.info(
+            f"{key:<16} {decision['rate_per_hour']:>9.2f} changes/h  {decision['requests_per_run']:>6.1f} req/run  "
+            f"every {timedelta(seconds=decision['interval_seconds'])}  "
+            f"{decision['budget_share']:>6.1%} of budget  next {decision['next_run_at']}"
+            + ('  (due)' if decision['due'] else '')
+        )
+
+def run_scheduler(config, clients, once=False, plan_only=False):
+    """Run due jobs, re-planning after each round; with once, run one round and return"""
+    jobs = scheduled_jobs(config)
+    budget = config.schedule_requests_per_hour
+    retry_after = {}
+    ok = True
+    while True:
+        now = datetime.now(timezone.utc)
+        plan = plan_schedule(clients.supabase, jobs, budget, now)
+        log_plan(plan)
+        if plan_only:
+            return True
+        save_decisions(clients.supabase, plan)
+        if config.metrics_file:
+            write_metrics(config.metrics_file, plan, clients.airtable_requests, now)
+
+        due = sorted(
+            (key for key, decision in plan.items() if decision['due'] and retry_after.get(key, now) <= now),
+            key=lambda key: plan[key]['next_run_at'],
+        )
+        for key in due:
+            before = clients.airtable_requests
+            try:
+                succeeded = jobs[key](config, clients)
+            except Exception as e:
+                logger.error(f"Scheduled run of {key} failed: {e}", exc_info=True)
+                succeeded = False
+            if succeeded:
+                record_requests(clients.supabase, key, clients.airtable_requests - before)
+                retry_after.pop(key, None)
+            else:
+                ok = False
+                retry_after[key] = datetime.now(timezone.utc) + timedelta(seconds=RETRY_SECONDS)
+        if once:
+            return ok
+
+        if due:
+            continue
+        upcoming = [parse_time(decision['next_run_at']) for decision in plan.values()]
+        upcoming += list(retry_after.values())
+        wait = min((moment - datetime.now(timezone.utc)).total_seconds() for moment in upcoming)
+        time.sleep(min(max(wait, 1.0), MAX_SLEEP_SECONDS))
@@ -0,0 +1,171 @@
+# snapshot.py - Partitioned Parquet snapshots of the synced tables for analytics
+#
+# Writes one hive-style directory per table (e.g. weight_logs/month=2024-05/)
+# so analysts can read local columnar files with DuckDB, pandas or Polars
+# instead of querying production Postgres.
+#
+# Exports are incremental: manifest.json records when each table was last
+# exported, and only partitions containing rows changed since then are
+# rewritten. Rows are streamed from a server-side cursor straight into a
+# ParquetWriter, so memory stays at one fetch batch per partition.
+#
+# last_synced is stamped by the sync's Python client when a batch is built, and
+# the batch commits some time later, so each export looks back
+# WATERMARK_OVERLAP before the previous export's time; rows in the overlap are
+# simply written again. Deletions are not tracked: rows removed by verify
+# --delete-extra, rollup refreshes or food item replacement, and the old copy of
+# a row that moves partition (e.g. its date is corrected), stay in the snapshot
+# until the next --full export, which also drops partitions that no longer exist.
+
+import os
+import json
+import shutil
+import logging
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+MANIFEST_NAME = 'manifest.json'
+FETCH_SIZE = 5000
+# How far before the previous export changed rows are looked for; covers the gap
+# between a client-side last_synced stamp and its batch's commit, and clock skew
+WATERMARK_OVERLAP = timedelta(minutes=15)
+
+# table -> (partition column name, partition SQL expression, "changed since %(since)s" predicate)
+SNAPSHOT_TABLES = {
+    'weight_logs': (
+        'month',
+        "coalesce(to_char(recorded_on, 'YYYY-MM'), 'unknown')",
+        "greatest(last_synced, updated_at) > %(since)s "
+        "OR airtable_id IN (SELECT airtable_id FROM public.weight_log_edits WHERE edited_at > %(since)s)",
+    ),
+    'weight_log_rollups': (
+        'month',
+        "to_char(bucket_start, 'YYYY-MM')",
+        "refreshed_at > %(since)s",
+    ),
+    'weight_log_food_items': (
+        'status',
+        "status",
+        "created_at > %(since)s",
+    ),
+    'user_mappings': (
+        'part',
+        "'all'",
+        "greatest(created_at, updated_at) > %(since)s",
+    ),
+}
+
+def arrow_type(type_code):
+    """Arrow type for a Postgres type OID; anything unlisted is exported as text"""
+    import pyarrow as pa
+    return {
+        16: pa.bool_(),
+        20: pa.int64(), 21: pa.int64(), 23: pa.int64(),
+        700: pa.float64(), 701: pa.float64(), 1700: pa.float64(),
+        1082: pa.date32(),
+        1114: pa.timestamp('us'), 1184: pa.timestamp('us', tz='UTC'),
+    }.get(type_code, pa.string())
+
+def to_arrow_value(value):
+    if value is None or isinstance(value, (bool, int, float, date, datetime)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+def load_manifest(snapshot_dir):
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+def save_manifest(snapshot_dir, manifest):
+    path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def changed_partitions(conn, table_name, since):
+    """Partition keys holding rows changed since `since` (all partitions if None)"""
+    _, expression, changed = SNAPSHOT_TABLES[table_name]
+    query = f"SELECT DISTINCT {expression} FROM public.{table_name}"
+    with conn.cursor() as cursor:
+        if since is None:
+            cursor.execute(query)
+        else:
+            since = datetime.fromisoformat(since) - WATERMARK_OVERLAP
+            cursor.execute(f"{query} WHERE {changed}", {'since': since})
+        return sorted(row[0] for row in cursor.fetchall())
+
+def write_partition(conn, table_name, partition, path):
+    """Stream one partition into a Parquet file, replacing it atomically; returns the row count"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    _, expression, _ = SNAPSHOT_TABLES[table_name]
+    rows_written = 0
+    writer = None
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A named cursor is server-side: rows arrive FETCH_SIZE at a time
+    with conn.cursor(name=f"snapshot_{table_name}") as cursor:
+        cursor.itersize = FETCH_SIZE
+        cursor.execute(f"SELECT * FROM public.{table_name} WHERE {expression} = %s", (partition,))
+        try:
+            while True:
+                rows = cursor.fetchmany(FETCH_SIZE)
+                if writer is None:
+                    schema = pa.schema([(column.name, arrow_type(column.type_code)) for column in cursor.description])
+                    writer = pq.ParquetWriter(path + '.tmp', schema, compression='zstd')
+                if not rows:
+                    break
+                columns = list(zip(*rows))
+                writer.write_batch(pa.RecordBatch.from_arrays(
+                    [pa.array([to_arrow_value(value) for value in values], type=field.type)
+                     for values, field in zip(columns, schema)],
+                    schema=schema,
+                ))
+                rows_written += len(rows)
+        finally:
+            if writer is not None:
+                writer.close()
+    os.replace(path + '.tmp', path)
+    return rows_written
+
+def export_snapshot(conn, snapshot_dir, tables=None, full=False):
+    """Rewrite the changed partitions of each table under snapshot_dir"""
+    manifest = load_manifest(snapshot_dir)
+    with conn.cursor() as cursor:
+        # Database clock for the watermark; client-stamped last_synced is covered by WATERMARK_OVERLAP
+        cursor.execute("SELECT now()")
+        exported_at = cursor.fetchone()[0].astimezone(timezone.utc).isoformat()
+
+    for table_name in tables or SNAPSHOT_TABLES:
+        partition_column = SNAPSHOT_TABLES[table_name][0]
+        table_dir = os.path.join(snapshot_dir, table_name)
+        entry = {'partitions': {}} if full else manifest.get(table_name, {'partitions': {}})
+        since = entry.get('exported_at')
+        partitions = changed_partitions(conn, table_name, since)
+
+        if since is None and os.path.isdir(table_dir):
+            # Full export: drop partitions that no longer have any rows
+            for name in os.listdir(table_dir):
+                if name.split('=', 1)[-1] not in partitions:
+                    shutil.rmtree(os.path.join(table_dir, name))
+
+        for partition in partitions:
+            path = os.path.join(table_dir, f"{partition_column}={partition}", 'part-0.parquet')
+            entry['partitions'][partition] = write_partition(conn, table_name, partition, path)
+        conn.rollback()
+
+        entry['exported_at'] = exported_at
+        manifest[table_name] = entry
+        logger.info(f"Snapshot {table_name}: rewrote {len(partitions)} of {len(entry['partitions'])} partitions")
+
+    os.makedirs(snapshot_dir, exist_ok=True)
+    save_manifest(snapshot_dir, manifest)
+    return manifest
@@ -0,0 +1,262 @@
+# sync.py - Airtable -> Supabase sync pipeline for weight logs
+#
+# Consolidates the former sync.py, fixed_sync.py and
+# fixed_sync_with_actual_values.py scripts: incremental fetches via
+# LAST_MODIFIED_TIME() come from sync.py, string cell formatting (linked
+# records as text) from fixed_sync_with_actual_values.py, and the column
+# mapping, food item index and rollups from fixed_sync.py.
+
+import logging
+from datetime import datetime, timezone
+
+from genos_sync.clients import Clients
+from genos_sync.email_mapping import fetch_all, update_email_mappings
+from genos_sync.profiling import NULL_PROFILER
+from genos_sync.records import RecordStore
+from genos_sync.validation import quarantine_store
+from genos_sync.transform import DEFAULT_COLUMNS, chunk_list, explode_food_items
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+class FullScanRefused(RuntimeError):
+    """Raised when an incremental sync would fall back to fetching every record"""
+
+def check_table_structure(supabase_client, table_name):
+    """Return the columns of the target table, read from a sample row"""
+    try:
+        supabase_client.table(table_name).select('id').limit(1).execute()
+    except Exception as e:
+        logger.error(f"Could not access {table_name} table: {e}")
+        logger.info("Apply the schema with `python -m genos_sync migrate apply` and try again.")
+        return set()
+
+    response = supabase_client.table(table_name).select('*').limit(1).execute()
+    if not response.data:
+        logger.info(f"{table_name} is empty, assuming the full column set")
+        return set(DEFAULT_COLUMNS)
+    available_columns = set(response.data[0].keys())
+    logger.debug(f"Available columns in {table_name}: {', '.join(sorted(available_columns))}")
+    return available_columns
+
+def check_user_mappings_table(supabase_client):
+    """Check if user_mappings table exists"""
+    try:
+        supabase_client.table('user_mappings').select('id').limit(1).execute()
+        logger.info("user_mappings table exists")
+        return True
+    except Exception as e:
+        logger.error(f"Error checking user_mappings table: {e}")
+        raise e
+
+def get_last_sync_time(supabase_client, table_name):
+    """Get the last sync time for a table"""
+    try:
+        response = supabase_client.table('sync_metadata').select('last_sync').eq('table_name', table_name).execute()
+        if response.data:
+            last_sync = response.data[0]['last_sync']
+            logger.info(f"Last sync time: {last_sync}")
+            return last_sync
+        logger.info("No previous sync found, will sync all records")
+        return None
+    except Exception as e:
+        logger.error(f"Error getting last sync time: {e}")
+        return None
+
+# Runs kept in sync_metadata.run_history for the scheduler's change-rate estimate
+RUN_HISTORY_LENGTH = 20
+
+def update_sync_metadata(supabase_client, table_name, sync_time, changed=None):
+    """Record a completed run; `changed` (records modified since the previous run) feeds the scheduler.
+    Full runs pass None: they fetch every record, which says nothing about the change rate."""
+    try:
+        row = {
+            'table_name': table_name,
+            'last_sync': sync_time
+        }
+        if changed is not None:
+            response = supabase_client.table('sync_metadata').select('run_history').eq('table_name', table_name).execute()
+            history = (response.data[0].get('run_history') if response.data else None) or []
+            row['run_history'] = [*history, {'at': sync_time, 'changed': changed}][-RUN_HISTORY_LENGTH:]
+        response = supabase_client.table('sync_metadata').upsert(row, on_conflict='table_name').execute()
+        return response
+    except Exception as e:
+        logger.error(f"Failed to update sync metadata: {e}")
+        raise e
+
+def modified_since_formula(last_sync):
+    return f"IS_AFTER(LAST_MODIFIED_TIME(), '{last_sync}')"
+
+def iter_airtable_pages(airtable, last_sync=None, cell_format=None, allow_full_scan=True):
+    """Yield pages of weight logs from Airtable, only those modified since last_sync if given"""
+    options = {}
+    if cell_format == 'string':
+        # Linked records and lookups come back as display text instead of IDs
+        options.update(cell_format='string', time_zone='America/New_York', user_locale='en-us')
+
+    if last_sync:
+        pages = airtable.iterate(formula=modified_since_formula(last_sync), **options)
+        try:
+            # The formula is only validated once the first page is requested
+            first_page = next(pages, None)
+        except Exception as e:
+            if not allow_full_scan:
+                raise FullScanRefused(f"Formula query failed and a full fetch is not allowed: {e}") from e
+            logger.error(f"Error with formula query, falling back to a full fetch: {e}")
+        else:
+            if first_page is not None:
+                yield first_page
+                yield from pages
+            return
+    yield from airtable.iterate(**options)
+
+def load_record_store(airtable, last_sync=None, cell_format=None, allow_full_scan=True):
+    """Stream Airtable pages into a compact RecordStore, dropping each page once converted"""
+    store = RecordStore()
+    for page in iter_airtable_pages(airtable, last_sync, cell_format, allow_full_scan):
+        store.extend(page)
+    return store
+
+def warn_pending_edits(supabase_client, airtable_ids):
+    """Warn when the sync is about to overwrite app edits that haven't been written back"""
+    try:
+        rows = fetch_all(lambda: supabase_client.table('weight_log_edits')
+                         .select('airtable_id')
+                         .eq('status', 'pending'), 'id')
+    except Exception as e:
+        logger.debug(f"Could not check for pending app edits: {e}")
+        return 0
+    overwritten = {row['airtable_id'] for row in rows} & set(airtable_ids)
+    if overwritten:
+        logger.warning(
+            f"{len(overwritten)} records have app edits that were not written back yet; "
+            f"this sync overwrites them with Airtable's values until `write-back` pushes them "
+            f"(use `sync --write-back` to push edits first)"
+        )
+    return len(overwritten)
+
+def sync_food_items(supabase_client, transformed_records):
+    """Replace the food item rows for the weight logs in this batch"""
+    airtable_ids = [record['airtable_id'] for record in transformed_records]
+    rows = explode_food_items(transformed_records)
+    try:
+        supabase_client.table('weight_log_food_items').delete().in_('weight_log_airtable_id', airtable_ids).execute()
+        if rows:
+            supabase_client.table('weight_log_food_items').insert(rows).execute()
+    except Exception as e:
+        # The index is derived data; a failure here must not fail the sync
+        logger.warning(f"Failed to update food items for {len(airtable_ids)} weight logs: {e}")
+
+def refresh_rollups(supabase_client, emails, chunk_size=100):
+    """Recompute daily/weekly measurement rollups for the emails touched in this run"""
+    emails = sorted(email for email in emails if email)
+    refreshed = 0
+    for chunk in chunk_list(emails, chunk_size):
+        try:
+            response = supabase_client.rpc('refresh_weight_log_rollups', {'p_emails': chunk}).execute()
+            refreshed += response.data or 0
+        except Exception as e:
+            # Rollups are derived data; a failure here must not fail the sync
+            logger.warning(f"Failed to refresh rollups for {len(chunk)} emails: {e}")
+    logger.info(f"Refreshed {refreshed} rollup rows for {len(emails)} emails")
+
+def upsert_store(supabase_client, table_name, store, available_columns, batch_size, profiler=NULL_PROFILER):
+    """Upsert a RecordStore in batches; returns the emails touched"""
+    touched_emails = set()
+    for start, stop in store.batches(batch_size):
+        with profiler.stage('transform'):
+            transformed_records = store.rows(start, stop, available_columns)
+
+        with profiler.stage('upsert'):
+            try:
+                supabase_client.table(table_name).upsert(
+                    transformed_records,
+                    on_conflict='airtable_id'
+                ).execute()
+                logger.info(f"Successfully upserted {len(transformed_records)} records")
+            except Exception as e:
+                logger.error(f"Insert failed with error: {e}")
+                raise e
+        with profiler.stage('food_items'):
+            sync_food_items(supabase_client, transformed_records)
+        touched_emails.update(record.get('email') for record in transformed_records)
+    return touched_emails
+
+def upsert_records(supabase_client, table_name, records, available_columns, batch_size, profiler=NULL_PROFILER):
+    """Transform and upsert a list of Airtable records; returns the emails touched"""
+    store = RecordStore.from_records(records)
+    quarantine_store(supabase_client, table_name, store)
+    return upsert_store(supabase_client, table_name, store, available_columns, batch_size, profiler)
+
+def intake_table(config, clients):
+    """The Airtable intake form table, or None when AIRTABLE_INTAKE_TABLE is not configured"""
+    return clients.airtable(config.airtable_intake_table_name) if config.airtable_intake_table_name else None
+
+def sync_airtable_to_supabase(config, clients=None, incremental=False, cell_format=None, profiler=NULL_PROFILER,
+                              recipe_eligibility=False, dashboard_snapshots=False, allow_full_scan=True):
+    """Main function to sync data from Airtable to Supabase"""
+    clients = clients or Clients(config)
+    table_name = config.supabase_table_name
+
+    # Log start time
+    sync_time = datetime.now(timezone.utc).isoformat()
+    logger.info(f"Starting sync at {sync_time}")
+
+    supabase_client = clients.supabase
+
+    # Get available columns
+    available_columns = check_table_structure(supabase_client, table_name)
+    if not available_columns:
+        logger.error("Could not determine table structure")
+        return False
+
+    # Check if user_mappings table exists
+    check_user_mappings_table(supabase_client)
+
+    # Get last sync time
+    last_sync = get_last_sync_time(supabase_client, table_name) if incremental else None
+    # Without allow_full_scan an incremental run fails instead of quietly fetching everything
+    if incremental and not last_sync and not allow_full_scan:
+        raise FullScanRefused(f"No previous sync of {table_name} is recorded and a full fetch is not allowed")
+
+    with profiler.stage('fetch'):
+        store = load_record_store(clients.airtable(), last_sync, cell_format, allow_full_scan)
+    logger.info(f"Found {len(store)} records to sync")
+
+    unique_emails = store.unique_emails
+    logger.info(f"Found {len(unique_emails)} unique emails in Airtable data")
+
+    # Keep implausible measurements out of weight_logs and the charts
+    with profiler.stage('validate'):
+        quarantine_store(supabase_client, table_name, store, previous_readings=incremental)
+
+    # Update email mappings
+    with profiler.stage('email_mapping'):
+        update_email_mappings(supabase_client, unique_emails, config.email_miss_ttl_hours)
+
+    warn_pending_edits(supabase_client, store.airtable_ids)
+    touched_emails = upsert_store(
+        supabase_client, table_name, store, available_columns, config.batch_size, profiler
+    )
+
+    # Keep the journey widget rollups in step with the rows just written
+    with profiler.stage('rollups'):
+        refresh_rollups(supabase_client, touched_emails)
+
+    if recipe_eligibility:
+        from genos_sync.recipe_eligibility import refresh_recipe_eligibility
+        with profiler.stage('recipe_eligibility'):
+            refresh_recipe_eligibility(
+                supabase_client, clients.airtable(config.airtable_recipes_table_name), touched_emails
+            )
+
+    if dashboard_snapshots:
+        from genos_sync.dashboard import refresh_dashboard_snapshots
+        with profiler.stage('dashboard_snapshots'):
+            refresh_dashboard_snapshots(
+                supabase_client, table_name, intake_table(config, clients), touched_emails
+            )
+
+    # Update sync metadata; only a delta fetch counts changes
+    update_sync_metadata(supabase_client, table_name, sync_time, changed=len(store) if last_sync else None)
+    logger.info(f"Sync completed successfully at {datetime.now(timezone.utc).isoformat()}")
+    return True
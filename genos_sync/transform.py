@@ -0,0 +1,222 @@
+# transform.py - Mapping of Airtable weight log records to Supabase rows
+#
+# Pure functions only: no clients, no environment. Safe to import anywhere.
+
+import re
+from datetime import datetime
+from functools import lru_cache
+
+def is_blank(value):
+    """None or an empty / whitespace-only string; a numeric 0 is a value, not a blank"""
+    return value is None or (isinstance(value, str) and not value.strip())
+
+def safe_float(value):
+    """Safely convert a value to float, returning None when it is blank or can't be parsed"""
+    if is_blank(value):
+        return None
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+# Integers at or beyond this magnitude are treated as unparsable (they would
+# not survive the float64 column conversion in genos_sync.records exactly)
+INT_LIMIT = 2 ** 62
+
+def safe_int(value):
+    """Safely convert a value to int, returning None when it is blank, can't be parsed
+    or isn't a whole number ('120.7' and 120.7 alike)"""
+    number = safe_float(value)
+    if number is None or not number.is_integer() or abs(number) >= INT_LIMIT:
+        return None
+    return int(number)
+
+DAY_NUMBER_PATTERN = re.compile(r'\d+')
+
+# Airtable phase labels (as used by the PlatePlanner filter) -> program_phase enum
+PHASE_ALIASES = {
+    'preparatory': 'preparatory',
+    'detox': 'detox',
+    'low-carb reintroductions': 'low_carb_reintroductions',
+    'low carb reintroductions': 'low_carb_reintroductions',
+    'high-carb reintroductions': 'high_carb_reintroductions',
+    'high carb reintroductions': 'high_carb_reintroductions',
+}
+
+def lookup_value(value):
+    """Airtable lookup and rollup fields arrive as lists; keep the first entry"""
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+# The string parsers below are memoised: a batch contains only a handful of
+# distinct day/phase/date strings, so each one is parsed once per run instead
+# of per row. Only strings reach the caches; lists and other unhashable values
+# are unwrapped or rejected first.
+@lru_cache(maxsize=4096)
+def _parse_program_day_text(value):
+    match = DAY_NUMBER_PATTERN.search(value)
+    return int(match.group()) if match else None
+
+def parse_program_day(value):
+    """Parse 'Day 12' style text into an integer program day"""
+    value = lookup_value(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not isinstance(value, str):
+        return None
+    return _parse_program_day_text(value)
+
+@lru_cache(maxsize=256)
+def _parse_phase_text(value):
+    label = value.strip().lower()
+    if label.endswith(' phase'):
+        label = label[:-len(' phase')]
+    return PHASE_ALIASES.get(label)
+
+def parse_phase(value):
+    """Normalise a phase label to its program_phase enum value"""
+    value = lookup_value(value)
+    if not isinstance(value, str):
+        return None
+    return _parse_phase_text(value)
+
+@lru_cache(maxsize=4096)
+def _parse_date_text(value):
+    try:
+        return datetime.fromisoformat(value[:10]).date().isoformat()
+    except ValueError:
+        return None
+
+def parse_date(value):
+    """Parse an Airtable date or datetime string into an ISO date"""
+    value = lookup_value(value)
+    if not isinstance(value, str) or not value:
+        return None
+    return _parse_date_text(value)
+
+# Supabase column -> (Airtable field name, converter). This is the single source
+# of truth for the weight_logs mapping; genos_sync.backfill re-derives columns
+# from the archived raw_fields payload using the same spec.
+FIELD_MAPPING = {
+    'day_of_program': ('Day of the Program', None),
+    'weight_recorded': ('Weight Recorded', safe_float),
+    'bp_systolic': ('BP Systolic', safe_int),
+    'bp_diastolic': ('BP Diastolic', safe_int),
+    'blood_sugar': ('Blood Sugar', safe_float),
+    'deviation': ('Deviation', None),
+    'supplement_introduced': ('Supplement Introduced', None),
+    'body_physiology': ('Body Physiology', None),
+    'symptoms_observed': ('Symptoms Observed', None),
+    'tolerant_intolerant': ('Tolerant/Intolerant', None),
+    'chest': ('Chest', safe_float),
+    'waist': ('Waist', safe_float),
+    'hips': ('Hips', safe_float),
+    'tolerant_food_items': ('Tolerant Food Items', None),
+    'intolerant_food_items': ('Intolerant Food Items', None),
+    'comments': ('Comments', None),
+    'phase_of_program': ('Phase of the Program', None),
+    'program_day': ('Day of the Program', parse_program_day),
+    'phase': ('Phase of the Program', parse_phase),
+    'recorded_on': ('Date', parse_date),
+    'reason_for_diagnosing_tolerant': ('Reason For Diagnosing Tolerant', None),
+    'client_name': ('Client Name', None),
+    'food_item_introduced': ('Food Item Introduced (Genos)', None),
+    'first_name': ('First Name', None),
+    'last_name': ('Last Name', None),
+}
+
+def normalize_email(email):
+    """Airtable can return the Email field as a list; keep the first entry"""
+    if isinstance(email, list):
+        return email[0] if email else None
+    return email
+
+def map_fields(fields, columns=None, raw_columns=()):
+    """Map an Airtable fields payload to Supabase columns.
+
+    Columns listed in FIELD_MAPPING use their converter, except those in
+    raw_columns, which keep the raw field value for a caller that converts
+    whole columns at once. Any other requested column falls back to the raw
+    field whose snake_case name matches it, so a newly added column can be
+    filled without touching the mapping.
+    """
+    if columns is None:
+        columns = FIELD_MAPPING.keys()
+
+    mapped = {}
+    for column in columns:
+        if column == 'email':
+            mapped[column] = normalize_email(fields.get('Email'))
+        elif column in FIELD_MAPPING:
+            field_name, convert = FIELD_MAPPING[column]
+            value = fields.get(field_name)
+            mapped[column] = convert(value) if convert and column not in raw_columns else value
+        else:
+            for field_name, value in fields.items():
+                if field_name.lower().replace(' ', '_').replace('-', '_') == column:
+                    mapped[column] = value
+                    break
+    return mapped
+
+# Every column RecordStore.rows can produce; used when the target table is
+# still empty and its columns can't be read from a sample row
+DEFAULT_COLUMNS = frozenset(['airtable_id', 'email', 'raw_fields', 'airtable_created_time', 'last_synced', *FIELD_MAPPING])
+
+def column_values(records, raw_columns=()):
+    """Typed column values for a page of Airtable records, as column -> list of values"""
+    field_sets = [record.get('fields', {}) for record in records]
+    columns = {
+        'airtable_id': [record.get('id') for record in records],
+        'email': [normalize_email(fields.get('Email')) for fields in field_sets],
+    }
+    for column, (field_name, convert) in FIELD_MAPPING.items():
+        raw = [fields.get(field_name) for fields in field_sets]
+        columns[column] = list(map(convert, raw)) if convert and column not in raw_columns else raw
+    columns['recorded_on'] = [
+        # Fall back to when the log was created in Airtable
+        recorded_on if recorded_on is not None else parse_date(record.get('createdTime'))
+        for recorded_on, record in zip(columns['recorded_on'], records)
+    ]
+    return columns
+
+FOOD_KEY_STRIP_PATTERN = re.compile(r'[^a-z0-9]+')
+
+# weight_logs column -> weight_log_food_items.status
+FOOD_LIST_COLUMNS = {
+    'tolerant_food_items': 'tolerant',
+    'intolerant_food_items': 'intolerant',
+    'food_item_introduced': 'introduced',
+}
+
+def canonical_food_key(label):
+    """Canonical search key for a food label, e.g. 'PRAWN (Shrimp)' -> 'prawn shrimp'"""
+    return FOOD_KEY_STRIP_PATTERN.sub(' ', label.lower()).strip()
+
+def explode_food_items(transformed_records):
+    """Split the comma-separated food columns into weight_log_food_items rows"""
+    rows = {}
+    for record in transformed_records:
+        for column, status in FOOD_LIST_COLUMNS.items():
+            value = record.get(column)
+            if isinstance(value, (list, tuple)):
+                value = ','.join(str(item) for item in value)
+            if not isinstance(value, str):
+                continue
+            for label in value.split(','):
+                label = label.strip()
+                food_key = canonical_food_key(label)
+                if not food_key:
+                    continue
+                rows[(record['airtable_id'], food_key, status)] = {
+                    'weight_log_airtable_id': record['airtable_id'],
+                    'email': record.get('email'),
+                    'status': status,
+                    'food_key': food_key,
+                    'food_label': label,
+                }
+    return list(rows.values())
+
+def chunk_list(lst, chunk_size):
+    """Split a list into smaller chunks of specified size."""
+    return [lst[i:i + chunk_size] for i in range(0, len(lst), chunk_size)]
@@ -0,0 +1,282 @@
+# validation.py - Plausibility checks and quarantine for synced measurements
+#
+# Runs over a RecordStore's numeric columns as whole NumPy arrays before the
+# rows are upserted:
+#
+#   range      weight, BP, blood sugar and girth values outside plausible limits
+#              (0 is now a real value rather than a blank, so a 0 reading lands here)
+#   bp_order   diastolic at or above systolic
+#   weight_spike
+#              a weight that jumps away from the user's previous reading and back
+#              again, or a latest reading that jumps away, by more than
+#              MIN_WEIGHT_DELTA_KG or MAX_WEIGHT_DELTA_PER_DAY_KG per elapsed day,
+#              whichever is larger
+#
+# A suspect value is recorded with its reason in public.weight_log_quarantine
+# and synced as NULL, so it stays out of the charts and rollups; the rest of
+# the log (foods, symptoms, comments) is synced as usual. `python -m genos_sync
+# quarantine --release` restores a value that turns out to be genuine, and a
+# released value is not quarantined again unless it changes in Airtable.
+# Backfill runs the same checks page by page, except weight_spike, which needs
+# whole histories; its open spike entries stay in force instead.
+
+import math
+import logging
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+from genos_sync.email_mapping import fetch_all
+from genos_sync.records import INT_NULL
+from genos_sync.transform import chunk_list
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+# column -> (low, high) plausible values; girths allow for readings in inches
+METRIC_RANGES = {
+    'weight_recorded': (25.0, 300.0),
+    'bp_systolic': (60, 260),
+    'bp_diastolic': (30, 160),
+    'blood_sugar': (20.0, 600.0),
+    'chest': (20.0, 250.0),
+    'waist': (20.0, 250.0),
+    'hips': (20.0, 250.0),
+}
+MIN_WEIGHT_DELTA_KG = 3.0
+MAX_WEIGHT_DELTA_PER_DAY_KG = 1.0
+
+def metric_values(store, column):
+    """float64 copy of a numeric column with NaN for NULL"""
+    values = store.numeric(column)
+    if values.dtype == np.int64:
+        return np.where(values == INT_NULL, np.nan, values.astype(np.float64))
+    return values.copy()
+
+def range_flags(store):
+    """(row, column, rule, reason) for values outside METRIC_RANGES"""
+    flags = []
+    for column, (low, high) in METRIC_RANGES.items():
+        values = metric_values(store, column)
+        with np.errstate(invalid='ignore'):
+            suspect = np.flatnonzero((values < low) | (values > high))
+        flags.extend(
+            (int(row), column, 'range', f"{values[row]:g} is outside the plausible range {low:g}-{high:g}")
+            for row in suspect
+        )
+    return flags
+
+def bp_order_flags(store, excluded):
+    systolic = metric_values(store, 'bp_systolic')
+    diastolic = metric_values(store, 'bp_diastolic')
+    with np.errstate(invalid='ignore'):
+        suspect = diastolic >= systolic
+    suspect[list(excluded)] = False
+    flags = []
+    for row in np.flatnonzero(suspect):
+        reason = f"diastolic {diastolic[row]:g} is not below systolic {systolic[row]:g}"
+        flags.append((int(row), 'bp_systolic', 'bp_order', reason))
+        flags.append((int(row), 'bp_diastolic', 'bp_order', reason))
+    return flags
+
+def weight_spike_flags(store, previous, excluded):
+    """Weights that jump away from the user's neighbouring readings; previous maps
+    email -> (recorded_on, weight) of the last stored reading before this batch"""
+    weights = metric_values(store, 'weight_recorded')
+    weights[list(excluded)] = np.nan
+    emails = store.objects['email']
+    rows = [row for row in np.flatnonzero(~np.isnan(weights)) if emails[row]]
+    if not rows:
+        return []
+
+    # Store readings plus one context reading per user, sorted by user and date
+    context = list(previous.items())
+    email_keys = np.array([emails[row] for row in rows] + [email for email, _ in context], dtype=object)
+    dates = np.array(
+        [store.objects['recorded_on'][row] for row in rows] + [recorded_on for _, (recorded_on, _) in context],
+        dtype='datetime64[D]',
+    )
+    values = np.concatenate([weights[rows], np.array([weight for _, (_, weight) in context], dtype=np.float64)])
+    store_rows = np.array(rows + [-1] * len(context), dtype=np.int64)
+    _, email_codes = np.unique(email_keys, return_inverse=True)
+    order = np.lexsort((dates, email_codes))
+    email_codes, dates, values, store_rows = email_codes[order], dates[order], values[order], store_rows[order]
+
+    same_user = email_codes[1:] == email_codes[:-1]
+    elapsed = (dates[1:] - dates[:-1]).astype('timedelta64[D]').astype(np.float64)
+    elapsed = np.where(np.isnan(elapsed) | (elapsed < 1), 1, elapsed)
+    allowed = np.maximum(MIN_WEIGHT_DELTA_KG, MAX_WEIGHT_DELTA_PER_DAY_KG * elapsed)
+    # jump[k]: reading k + 1 differs from reading k of the same user by more than allowed
+    jump = same_user & (np.abs(values[1:] - values[:-1]) > allowed)
+
+    jump_from_previous = np.concatenate([[False], jump])
+    jump_to_next = np.concatenate([jump, [False]])
+    has_next = np.concatenate([same_user, [False]])
+    # A spike jumps away and back again; a sustained step only jumps once
+    spike = jump_from_previous & jump_to_next
+    # A user's latest reading can only be judged against the one before it,
+    # unless that one was itself a spike and this is the return to normal
+    after_spike = np.concatenate([[False], spike[:-1]])
+    spike |= jump_from_previous & ~has_next & ~after_spike
+    spike &= store_rows >= 0
+
+    flags = []
+    for k in np.flatnonzero(spike):
+        reason = (
+            f"{values[k]:g} kg differs from the previous reading of {values[k - 1]:g} kg "
+            f"by more than {allowed[k - 1]:g} kg"
+        )
+        flags.append((int(store_rows[k]), 'weight_recorded', 'weight_spike', reason))
+    return flags
+
+def find_suspect_values(store, previous=None, spikes=True):
+    """(row, column, rule, reason) for every implausible measurement in the store;
+    spikes=False skips the weight_spike rule, which needs each user's neighbouring readings"""
+    flags = range_flags(store)
+    flagged = {(row, column) for row, column, _, _ in flags}
+    bp_excluded = {row for row, column, _, _ in flags if column in ('bp_systolic', 'bp_diastolic')}
+    flags += bp_order_flags(store, bp_excluded)
+    if spikes:
+        weight_excluded = {row for row, column in flagged if column == 'weight_recorded'}
+        flags += weight_spike_flags(store, previous or {}, weight_excluded)
+    return flags
+
+# Readings further apart than this can't differ by more than the spike allowance
+# while both are in the plausible weight range, so older ones are never read
+PREVIOUS_READING_DAYS = math.ceil(
+    (METRIC_RANGES['weight_recorded'][1] - METRIC_RANGES['weight_recorded'][0]) / MAX_WEIGHT_DELTA_PER_DAY_KG
+)
+
+def previous_weights(supabase_client, table_name, store, chunk_size=50):
+    """email -> (recorded_on, weight) of each user's last stored reading before their earliest one in the store"""
+    earliest = {}
+    for email, recorded_on in zip(store.objects['email'], store.objects['recorded_on']):
+        if email and recorded_on and (email not in earliest or recorded_on < earliest[email]):
+            earliest[email] = recorded_on
+    window = timedelta(days=PREVIOUS_READING_DAYS)
+    previous = {}
+    for chunk in chunk_list(sorted(earliest), chunk_size):
+        since = min(date.fromisoformat(earliest[email]) for email in chunk) - window
+        # Newest first per email, so the first row before an email's earliest reading is the one
+        rows = fetch_all(lambda: supabase_client.table(table_name)
+                         .select('email,recorded_on,weight_recorded')
+                         .in_('email', chunk)
+                         .gte('recorded_on', since.isoformat())
+                         .lt('recorded_on', max(earliest[email] for email in chunk))
+                         .gt('weight_recorded', 0)
+                         .order('email')
+                         .order('recorded_on', desc=True), 'airtable_id')
+        for row in rows:
+            email = row['email']
+            if email not in previous and row['recorded_on'] < earliest[email]:
+                previous[email] = (row['recorded_on'], float(row['weight_recorded']))
+    return previous
+
+def quarantine_entries(supabase_client, airtable_ids, chunk_size=100):
+    """weight_log_quarantine entries of the given weight logs"""
+    entries = []
+    for chunk in chunk_list(sorted(set(airtable_ids)), chunk_size):
+        entries += fetch_all(lambda: supabase_client.table('weight_log_quarantine')
+                             .select('airtable_id,column_name,value,rule,status')
+                             .in_('airtable_id', chunk), ('airtable_id', 'column_name'))
+    return entries
+
+def quarantine_store(supabase_client, table_name, store, previous_readings=True, spikes=True):
+    """Record implausible measurements in weight_log_quarantine and NULL them in the store.
+
+    With spikes=False (for stores that don't hold whole histories, such as a
+    backfill page) weight_spike is not re-judged: its open entries are kept
+    and their values stay NULL.
+    """
+    if not len(store):
+        return 0
+    previous = previous_weights(supabase_client, table_name, store) if previous_readings and spikes else {}
+    flags = find_suspect_values(store, previous, spikes)
+
+    existing = quarantine_entries(supabase_client, store.airtable_ids)
+    released = {
+        (row['airtable_id'], row['column_name']): float(row['value'])
+        for row in existing if row['status'] == 'released' and row['value'] is not None
+    }
+    open_entries = [row for row in existing if row['status'] == 'open']
+    kept = {
+        (row['airtable_id'], row['column_name'])
+        for row in open_entries if not spikes and row['rule'] == 'weight_spike'
+    }
+    stale_ids = sorted({row['airtable_id'] for row in open_entries})
+
+    detected_at = datetime.now(timezone.utc).isoformat()
+    suspects = {}
+    for row, column, rule, reason in flags:
+        airtable_id = store.airtable_ids[row]
+        value = store.value(column, row)
+        if released.get((airtable_id, column)) == float(value):
+            continue
+        suspects.setdefault((row, column), {
+            'airtable_id': airtable_id,
+            'email': store.objects['email'][row],
+            'recorded_on': store.objects['recorded_on'][row],
+            'column_name': column,
+            'value': value,
+            'rule': rule,
+            'reason': reason,
+            'status': 'open',
+            'detected_at': detected_at,
+            'released_at': None,
+        })
+
+    try:
+        # Re-synced logs are judged afresh: drop their open entries first
+        for chunk in chunk_list(stale_ids, 100):
+            query = supabase_client.table('weight_log_quarantine').delete().eq('status', 'open').in_('airtable_id', chunk)
+            if not spikes:
+                query = query.neq('rule', 'weight_spike')
+            query.execute()
+        for chunk in chunk_list(list(suspects.values()), 500):
+            supabase_client.table('weight_log_quarantine').upsert(chunk, on_conflict='airtable_id,column_name').execute()
+    except Exception as e:
+        # Without a quarantine record the values are synced unchanged rather than silently dropped
+        logger.warning(f"Failed to record {len(suspects)} suspect readings, syncing them as-is: {e}")
+        return 0
+
+    rows_by_id = {airtable_id: row for row, airtable_id in enumerate(store.airtable_ids)}
+    for airtable_id, column in kept:
+        store.set_null(column, rows_by_id[airtable_id])
+    for row, column in suspects:
+        store.set_null(column, row)
+    if suspects:
+        counts = Counter(entry['rule'] for entry in suspects.values())
+        logger.info(f"Quarantined {len(suspects)} suspect readings: "
+                    + ', '.join(f"{rule} {count}" for rule, count in sorted(counts.items())))
+    return len(suspects)
+
+def release_quarantined(supabase_client, table_name, airtable_id, column=None):
+    """Restore quarantined values of a weight log and keep them from being quarantined again"""
+    query = supabase_client.table('weight_log_quarantine').select('*') \
+        .eq('airtable_id', airtable_id).eq('status', 'open')
+    if column:
+        query = query.eq('column_name', column)
+    entries = query.execute().data or []
+    for entry in entries:
+        # Stamped like a sync write, so the edit trigger doesn't log it as an app edit
+        supabase_client.table(table_name).update({
+            entry['column_name']: entry['value'],
+            'last_synced': datetime.now(timezone.utc).isoformat(),
+        }).eq('airtable_id', airtable_id).execute()
+        supabase_client.table('weight_log_quarantine').update({
+            'status': 'released',
+            'released_at': datetime.now(timezone.utc).isoformat(),
+        }).eq('airtable_id', airtable_id).eq('column_name', entry['column_name']).execute()
+        logger.info(f"Released {entry['column_name']}={entry['value']} of {airtable_id} ({entry['reason']})")
+    return {entry['email'] for entry in entries}
+
+def quarantine_summary(supabase_client):
+    """Log the open quarantine entries by rule and column"""
+    rows = fetch_all(lambda: supabase_client.table('weight_log_quarantine')
+                     .select('airtable_id,email,column_name,value,rule,reason')
+                     .eq('status', 'open'), ('airtable_id', 'column_name'))
+    counts = Counter((row['rule'], row['column_name']) for row in rows)
+    for (rule, column), count in sorted(counts.items()):
+        logger.info(f"{rule:<14} {column:<16} {count}")
+    logger.info(f"{len(rows)} open quarantine entries")
+    return rows
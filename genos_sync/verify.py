@@ -0,0 +1,174 @@
+# verify.py - Range-checksum drift detection between Airtable and Supabase
+#
+# Airtable record IDs ("rec" + 14 base62 characters) are treated as a prefix
+# tree. For a prefix, both sides are bucketed by the next ID character and each
+# bucket gets (row count, sum of 60-bit row hashes). Postgres computes its
+# buckets server-side with weight_log_range_checksums(); the Airtable side is
+# computed locally from one full read, since Airtable has no server-side
+# aggregation. Only mismatching buckets are descended into, Merkle-style, and
+# rows are fetched from Supabase only for small mismatching leaves, so repair
+# touches just the diverged records.
+
+import json
+import hashlib
+import logging
+from collections import defaultdict
+
+from genos_sync.email_mapping import fetch_all
+from genos_sync.transform import chunk_list, map_fields
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+ROOT_PREFIX = 'rec'
+
+# Must match the column order in migrations/008_weight_log_range_checksums.sql
+VERIFY_COLUMNS = [
+    'email', 'day_of_program', 'weight_recorded', 'bp_systolic', 'bp_diastolic',
+    'blood_sugar', 'chest', 'waist', 'hips', 'tolerant_intolerant',
+    'tolerant_food_items', 'intolerant_food_items', 'food_item_introduced',
+    'phase_of_program',
+]
+
+def format_value(value):
+    """Render a value the way Postgres renders the stored column as text"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float):
+        # Matches trim_scale(numeric)::text for the values the sync writes
+        return str(int(value)) if value.is_integer() else repr(value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value, separators=(', ', ': '))
+    return str(value)
+
+def row_text(airtable_id, row):
+    return '\x1f'.join([airtable_id, *(format_value(row.get(column)) for column in VERIFY_COLUMNS)])
+
+def row_hash(airtable_id, row):
+    """60-bit row hash, identical to ('x' || substr(md5(text), 1, 15))::bit(60)::bigint"""
+    return int(hashlib.md5(row_text(airtable_id, row).encode('utf-8')).hexdigest()[:15], 16)
+
+def expected_row(airtable_id, record, quarantined):
+    """The verified columns as the sync stores them: quarantined values are NULL"""
+    row = map_fields(record.get('fields', {}), VERIFY_COLUMNS)
+    for column in quarantined.get(airtable_id, ()):
+        row[column] = None
+    return row
+
+class AirtableSide:
+    """Row hashes of the Airtable records, indexed for prefix bucketing"""
+
+    def __init__(self, records, quarantined=None):
+        quarantined = quarantined or {}
+        self.records = {record['id']: record for record in records}
+        self.hashes = {
+            airtable_id: row_hash(airtable_id, expected_row(airtable_id, record, quarantined))
+            for airtable_id, record in self.records.items()
+        }
+
+    def buckets(self, prefix):
+        result = defaultdict(lambda: [0, 0])
+        for airtable_id, value in self.hashes.items():
+            if airtable_id.startswith(prefix) and len(airtable_id) > len(prefix):
+                bucket = result[airtable_id[:len(prefix) + 1]]
+                bucket[0] += 1
+                bucket[1] += value
+        return {key: tuple(value) for key, value in result.items()}
+
+    def leaf(self, prefix):
+        return {airtable_id: value for airtable_id, value in self.hashes.items() if airtable_id.startswith(prefix)}
+
+def supabase_buckets(supabase_client, prefix):
+    response = supabase_client.rpc('weight_log_range_checksums', {'p_prefix': prefix}).execute()
+    return {
+        row['bucket']: (row['row_count'], int(row['checksum'] or 0))
+        for row in response.data or []
+    }
+
+def supabase_leaf(supabase_client, table_name, prefix):
+    response = supabase_client.table(table_name) \
+        .select(','.join(['airtable_id', *VERIFY_COLUMNS])) \
+        .like('airtable_id', f"{prefix}*") \
+        .execute()
+    return {row['airtable_id']: row_hash(row['airtable_id'], row) for row in response.data or []}
+
+def find_drift(supabase_client, table_name, airtable_side, leaf_size=64):
+    """Walk mismatching prefixes; returns (missing, extra, changed) airtable_id sets"""
+    missing, extra, changed = set(), set(), set()
+    stats = {'rpc_calls': 0, 'leaves': 0, 'rows_fetched': 0}
+    pending = [ROOT_PREFIX]
+    while pending:
+        prefix = pending.pop()
+        local = airtable_side.buckets(prefix)
+        remote = supabase_buckets(supabase_client, prefix)
+        stats['rpc_calls'] += 1
+        for bucket in set(local) | set(remote):
+            local_value = local.get(bucket, (0, 0))
+            remote_value = remote.get(bucket, (0, 0))
+            if local_value == remote_value:
+                continue
+            if max(local_value[0], remote_value[0]) > leaf_size:
+                pending.append(bucket)
+                continue
+            local_rows = airtable_side.leaf(bucket)
+            remote_rows = supabase_leaf(supabase_client, table_name, bucket)
+            stats['leaves'] += 1
+            stats['rows_fetched'] += len(remote_rows)
+            missing.update(set(local_rows) - set(remote_rows))
+            extra.update(set(remote_rows) - set(local_rows))
+            changed.update(
+                airtable_id for airtable_id in set(local_rows) & set(remote_rows)
+                if local_rows[airtable_id] != remote_rows[airtable_id]
+            )
+    logger.info(
+        f"Checked {stats['rpc_calls']} prefixes, fetched {stats['rows_fetched']} rows "
+        f"from {stats['leaves']} mismatching leaves"
+    )
+    return missing, extra, changed
+
+def delete_extra_rows(supabase_client, table_name, airtable_ids, chunk_size=100):
+    """Delete rows that no longer exist in Airtable, and their food items; returns the emails they belonged to"""
+    emails = set()
+    for chunk in chunk_list(sorted(airtable_ids), chunk_size):
+        supabase_client.table('weight_log_food_items').delete().in_('weight_log_airtable_id', chunk).execute()
+        response = supabase_client.table(table_name).delete().in_('airtable_id', chunk).execute()
+        emails.update(row.get('email') for row in response.data or [])
+    return emails
+
+def verify(config, clients, leaf_size=64, repair=False, delete_extra=False):
+    """Report (and optionally repair) rows that differ between Airtable and Supabase"""
+    from genos_sync.sync import check_table_structure, refresh_rollups, upsert_records
+
+    supabase_client = clients.supabase
+    table_name = config.supabase_table_name
+    quarantined = defaultdict(set)
+    for row in fetch_all(lambda: supabase_client.table('weight_log_quarantine')
+                         .select('airtable_id,column_name').eq('status', 'open'),
+                         ('airtable_id', 'column_name')):
+        quarantined[row['airtable_id']].add(row['column_name'])
+    airtable_side = AirtableSide(clients.airtable().all(), quarantined)
+    logger.info(f"Hashed {len(airtable_side.hashes)} Airtable records")
+
+    missing, extra, changed = find_drift(supabase_client, table_name, airtable_side, leaf_size)
+    logger.info(f"Drift: {len(missing)} missing in Supabase, {len(changed)} changed, {len(extra)} only in Supabase")
+    for label, ids in (('missing', missing), ('changed', changed), ('extra', extra)):
+        for airtable_id in sorted(ids):
+            logger.debug(f"{label}: {airtable_id}")
+
+    if repair and (missing or changed):
+        records = [airtable_side.records[airtable_id] for airtable_id in sorted(missing | changed)]
+        available_columns = check_table_structure(supabase_client, table_name)
+        touched_emails = upsert_records(supabase_client, table_name, records, available_columns, config.batch_size)
+        refresh_rollups(supabase_client, touched_emails)
+        logger.info(f"Repaired {len(records)} rows")
+    if delete_extra and extra:
+        deleted_emails = delete_extra_rows(supabase_client, table_name, extra)
+        # Rollups of the affected users are recomputed without the deleted rows
+        refresh_rollups(supabase_client, deleted_emails)
+        logger.info(f"Deleted {len(extra)} rows that no longer exist in Airtable")
+
+    unresolved = set() if repair else missing | changed
+    if not delete_extra:
+        unresolved |= extra
+    return not unresolved
@@ -0,0 +1,154 @@
+# write_back.py - Push app-side weight log edits back to Airtable
+#
+# The record_weight_log_edit trigger (migrations/009_weight_log_edits.sql) logs
+# every app edit to weight_log_edits. Pending edits are read in id order,
+# coalesced so each record gets one PATCH carrying the latest value per column,
+# and sent in Airtable's maximum of 10 records per request through the shared
+# Airtable rate limiter: 2 requests per 10 records (read + PATCH) instead of
+# one per edit.
+#
+# Conflicts are detected per field by content hash: the values Airtable holds
+# now are compared with the ones archived in raw_fields at the last sync. If a
+# field being written changed on both sides, the record's edits are marked
+# 'conflict' and left for review; the next sync brings Airtable's version in.
+
+import json
+import hashlib
+import logging
+from datetime import datetime, timezone
+
+from genos_sync.transform import FIELD_MAPPING, chunk_list, safe_float, safe_int
+
+logger = logging.getLogger('airtable-supabase-sync')
+
+# Airtable's limit on records per create/update request
+PATCH_BATCH_SIZE = 10
+
+# Columns that map 1:1 onto an Airtable field; derived columns such as
+# program_day and phase are never written back
+WRITE_BACK_FIELDS = {
+    column: field_name
+    for column, (field_name, convert) in FIELD_MAPPING.items()
+    if convert in (None, safe_float, safe_int)
+}
+
+def load_pending_edits(supabase_client, page_size=1000):
+    """Pending edits in id order, paged with an id cursor"""
+    edits, cursor = [], 0
+    while True:
+        response = supabase_client.table('weight_log_edits') \
+            .select('id,airtable_id,changes') \
+            .eq('status', 'pending') \
+            .gt('id', cursor) \
+            .order('id') \
+            .limit(page_size) \
+            .execute()
+        page = response.data or []
+        edits.extend(page)
+        if len(page) < page_size:
+            return edits
+        cursor = page[-1]['id']
+
+def coalesce_edits(edits):
+    """Merge edits per record in id order, so the latest value of each column wins"""
+    merged = {}
+    for edit in edits:
+        entry = merged.setdefault(edit['airtable_id'], {'fields': {}, 'edit_ids': []})
+        for column, value in (edit['changes'] or {}).items():
+            if column in WRITE_BACK_FIELDS:
+                entry['fields'][WRITE_BACK_FIELDS[column]] = value
+        entry['edit_ids'].append(edit['id'])
+    return merged
+
+def fields_digest(fields, field_names):
+    """Content hash of the named fields of an Airtable fields payload"""
+    payload = json.dumps({name: fields.get(name) for name in sorted(field_names)}, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode('utf-8')).hexdigest()
+
+def record_id_formula(airtable_ids):
+    return 'OR(' + ','.join(f"RECORD_ID()='{airtable_id}'" for airtable_id in airtable_ids) + ')'
+
+def mark_edits(supabase_client, edit_ids, status):
+    payload = {'status': status}
+    if status == 'pushed':
+        payload['pushed_at'] = datetime.now(timezone.utc).isoformat()
+    for chunk in chunk_list(edit_ids, 500):
+        supabase_client.table('weight_log_edits').update(payload).in_('id', chunk).execute()
+
+def plan_batch(merged, airtable_ids, current, synced):
+    """Split a batch into PATCH payloads, conflicting records and no-op records"""
+    updates, conflicts, unchanged = [], [], []
+    for airtable_id in airtable_ids:
+        fields = merged[airtable_id]['fields']
+        record = current.get(airtable_id)
+        if record is None or airtable_id not in synced:
+            logger.warning(f"{airtable_id}: not found in Airtable or Supabase, not writing back")
+            conflicts.append(airtable_id)
+            continue
+        current_fields = record.get('fields', {})
+        if fields_digest(current_fields, fields) != fields_digest(synced[airtable_id], fields):
+            logger.warning(f"{airtable_id}: {', '.join(sorted(fields))} changed in Airtable since the last sync")
+            conflicts.append(airtable_id)
+            continue
+        changed = {name: value for name, value in fields.items() if current_fields.get(name) != value}
+        if changed:
+            updates.append({'id': airtable_id, 'fields': changed})
+        else:
+            unchanged.append(airtable_id)
+    return updates, conflicts, unchanged
+
+def write_back(config, clients, dry_run=False):
+    """Send pending app edits to Airtable in coalesced 10-record PATCHes"""
+    supabase_client = clients.supabase
+    table_name = config.supabase_table_name
+    # Requests are spaced by clients.airtable_limiter
+    airtable = clients.airtable()
+
+    edits = load_pending_edits(supabase_client)
+    if not edits:
+        logger.info("No pending edits to write back")
+        return True
+    merged = coalesce_edits(edits)
+    logger.info(f"Coalesced {len(edits)} edits into {len(merged)} records")
+
+    counts = {'pushed': 0, 'conflict': 0, 'skipped': 0, 'failed': 0}
+    for airtable_ids in chunk_list(sorted(merged), PATCH_BATCH_SIZE):
+        response = supabase_client.table(table_name) \
+            .select('airtable_id,raw_fields') \
+            .in_('airtable_id', airtable_ids) \
+            .execute()
+        synced = {row['airtable_id']: row.get('raw_fields') or {} for row in response.data or []}
+        current = {record['id']: record for record in airtable.all(formula=record_id_formula(airtable_ids))}
+
+        updates, conflicts, unchanged = plan_batch(merged, airtable_ids, current, synced)
+        if dry_run:
+            for update in updates:
+                logger.info(f"Would update {update['id']}: {update['fields']}")
+            continue
+
+        if updates:
+            try:
+                updated = airtable.batch_update(updates, typecast=True)
+            except Exception as e:
+                # Left pending, so the next run retries them
+                logger.error(f"Failed to update {len(updates)} Airtable records: {e}")
+                counts['failed'] += len(updates)
+                updates, updated = [], []
+            if updated:
+                # Archive what Airtable now holds, so a later edit to the same
+                # field isn't mistaken for a conflict before the next sync
+                supabase_client.table(table_name).upsert(
+                    [{'airtable_id': record['id'], 'raw_fields': record['fields']} for record in updated],
+                    on_conflict='airtable_id'
+                ).execute()
+
+        for status, ids in (('pushed', [update['id'] for update in updates]), ('conflict', conflicts), ('skipped', unchanged)):
+            if ids:
+                mark_edits(supabase_client, [edit_id for airtable_id in ids for edit_id in merged[airtable_id]['edit_ids']], status)
+                counts[status] += len(ids)
+
+    logger.info(
+        f"Write-back: {counts['pushed']} records updated, {counts['conflict']} conflicts, "
+        f"{counts['skipped']} already up to date, {counts['failed']} failed"
+    )
+    return counts['failed'] == 0
@@ -32,6 +32,65 @@ export type Database = {
           updated_at?: string;
         };
       };
+      recipe_images: {
+        Row: {
+          recipe_airtable_id: string;
+          attachment_id: string;
+          content_hash: string;
+          content_type: string | null;
+          width: number | null;
+          height: number | null;
+          url: string;
+          thumbnails: Record<string, string>;
+          mirrored_at: string;
+        };
+        Insert: {
+          recipe_airtable_id: string;
+          attachment_id: string;
+          content_hash: string;
+          content_type?: string | null;
+          width?: number | null;
+          height?: number | null;
+          url: string;
+          thumbnails?: Record<string, string>;
+          mirrored_at?: string;
+        };
+        Update: {
+          attachment_id?: string;
+          content_hash?: string;
+          content_type?: string | null;
+          width?: number | null;
+          height?: number | null;
+          url?: string;
+          thumbnails?: Record<string, string>;
+          mirrored_at?: string;
+        };
+      };
+      user_dashboard_snapshots: {
+        Row: {
+          email: string;
+          version: number;
+          revision: number;
+          source_hash: string;
+          snapshot: Record<string, unknown>;
+          built_at: string;
+        };
+        Insert: {
+          email: string;
+          version: number;
+          revision?: number;
+          source_hash: string;
+          snapshot: Record<string, unknown>;
+          built_at?: string;
+        };
+        Update: {
+          version?: number;
+          revision?: number;
+          source_hash?: string;
+          snapshot?: Record<string, unknown>;
+          built_at?: string;
+        };
+      };
       // Add other tables as needed
     };
     Views: {
@@ -0,0 +1,8 @@
+-- Archive the original Airtable fields payload on every weight log so that new
+-- or changed columns can be backfilled without re-fetching from Airtable.
+-- JSONB values above ~2KB are TOAST-compressed by Postgres automatically.
+ALTER TABLE public.weight_logs
+ADD COLUMN IF NOT EXISTS raw_fields JSONB;
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,58 @@
+-- Typed program-day, date and phase columns for weight_logs, parsed by the sync
+-- from day_of_program / phase_of_program, plus a timestamptz sync cursor.
+-- airtable_created_time archives the record's createdTime next to raw_fields,
+-- the fallback for recorded_on when a log has no Date.
+
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'program_phase') THEN
+        CREATE TYPE public.program_phase AS ENUM (
+            'preparatory',
+            'detox',
+            'low_carb_reintroductions',
+            'high_carb_reintroductions'
+        );
+    END IF;
+END
+$$;
+
+ALTER TABLE public.weight_logs
+ADD COLUMN IF NOT EXISTS program_day INTEGER,
+ADD COLUMN IF NOT EXISTS recorded_on DATE,
+ADD COLUMN IF NOT EXISTS phase public.program_phase,
+ADD COLUMN IF NOT EXISTS airtable_created_time TIMESTAMP WITH TIME ZONE;
+
+-- Existing rows are filled by the sync's own parsers rather than a second copy
+-- of them in SQL: run `python -m genos_sync sync` (which also archives
+-- createdTime), then `python -m genos_sync backfill --column program_day
+-- --column recorded_on --column phase` for rows no longer in Airtable.
+
+-- The delta cursor is compared as a timestamp, not as text. Only text columns
+-- are converted: a schema that already declares timestamptz is left untouched
+-- rather than having its values cast a second time.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = 'public'
+          AND table_name = 'sync_metadata'
+          AND column_name = 'last_sync'
+          AND data_type IN ('text', 'character varying')
+    ) THEN
+        ALTER TABLE public.sync_metadata
+        ALTER COLUMN last_sync TYPE TIMESTAMP WITH TIME ZONE
+        USING NULLIF(last_sync, '')::timestamptz;
+    END IF;
+END
+$$;
+
+-- Covering indexes so "latest N measurements" and date/day-window queries are index-only
+CREATE INDEX IF NOT EXISTS idx_weight_logs_email_recorded_on
+ON public.weight_logs(email, recorded_on DESC)
+INCLUDE (program_day, weight_recorded, bp_systolic, bp_diastolic, blood_sugar, chest, waist, hips);
+
+CREATE INDEX IF NOT EXISTS idx_weight_logs_email_program_day
+ON public.weight_logs(email, program_day);
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,108 @@
+-- Daily and weekly per-user rollups of weight_logs measurements for the journey
+-- widgets. The sync calls refresh_weight_log_rollups() with the emails it
+-- touched, so chart reads stay constant-size however long a client's history is.
+
+CREATE TABLE IF NOT EXISTS public.weight_log_rollups (
+    email TEXT NOT NULL,
+    granularity TEXT NOT NULL CHECK (granularity IN ('day', 'week')),
+    bucket_start DATE NOT NULL,
+    metric TEXT NOT NULL,
+    min_value DECIMAL,
+    max_value DECIMAL,
+    avg_value DECIMAL,
+    last_value DECIMAL,
+    delta DECIMAL,
+    sample_count INTEGER NOT NULL,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (email, granularity, metric, bucket_start)
+);
+
+ALTER TABLE public.weight_log_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own rollups" ON public.weight_log_rollups;
+CREATE POLICY "Users can view their own rollups"
+ON public.weight_log_rollups FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = weight_log_rollups.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = weight_log_rollups.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage rollups" ON public.weight_log_rollups;
+CREATE POLICY "Service role can manage rollups"
+ON public.weight_log_rollups
+USING (auth.role() = 'service_role');
+
+-- Recompute every rollup for the given emails from their weight_logs rows
+CREATE OR REPLACE FUNCTION public.refresh_weight_log_rollups(p_emails TEXT[])
+RETURNS INTEGER AS $$
+DECLARE
+    affected INTEGER;
+BEGIN
+    DELETE FROM public.weight_log_rollups WHERE email = ANY(p_emails);
+
+    WITH readings AS (
+        SELECT w.email, w.recorded_on, w.program_day, m.metric, m.value
+        FROM public.weight_logs w
+        CROSS JOIN LATERAL (VALUES
+            ('weight', w.weight_recorded),
+            ('bp_systolic', w.bp_systolic::DECIMAL),
+            ('bp_diastolic', w.bp_diastolic::DECIMAL),
+            ('blood_sugar', w.blood_sugar),
+            ('chest', w.chest),
+            ('waist', w.waist),
+            ('hips', w.hips)
+        ) AS m(metric, value)
+        WHERE w.email = ANY(p_emails)
+          AND w.recorded_on IS NOT NULL
+          AND m.value IS NOT NULL
+    ),
+    bucketed AS (
+        SELECT r.*, g.granularity, g.bucket_start
+        FROM readings r
+        CROSS JOIN LATERAL (VALUES
+            ('day', r.recorded_on),
+            ('week', date_trunc('week', r.recorded_on)::DATE)
+        ) AS g(granularity, bucket_start)
+    ),
+    aggregated AS (
+        SELECT
+            email, granularity, bucket_start, metric,
+            min(value) AS min_value,
+            max(value) AS max_value,
+            avg(value) AS avg_value,
+            (array_agg(value ORDER BY recorded_on DESC, program_day DESC NULLS LAST))[1] AS last_value,
+            count(*) AS sample_count
+        FROM bucketed
+        GROUP BY email, granularity, bucket_start, metric
+    )
+    INSERT INTO public.weight_log_rollups (
+        email, granularity, bucket_start, metric,
+        min_value, max_value, avg_value, last_value, delta, sample_count
+    )
+    SELECT
+        email, granularity, bucket_start, metric,
+        min_value, max_value, avg_value, last_value,
+        last_value - lag(last_value) OVER (
+            PARTITION BY email, granularity, metric ORDER BY bucket_start
+        ),
+        sample_count
+    FROM aggregated;
+
+    GET DIAGNOSTICS affected = ROW_COUNT;
+    RETURN affected;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Only the sync may call it; PostgREST would otherwise expose it as an RPC
+REVOKE EXECUTE ON FUNCTION public.refresh_weight_log_rollups(TEXT[]) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.refresh_weight_log_rollups(TEXT[]) TO service_role;
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
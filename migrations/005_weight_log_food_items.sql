@@ -0,0 +1,51 @@
+-- One row per (weight log, food, status) exploded from the comma-separated
+-- tolerant_food_items / intolerant_food_items / food_item_introduced columns,
+-- so "which clients are intolerant to coconut" is an index lookup.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS public.weight_log_food_items (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    weight_log_airtable_id TEXT NOT NULL REFERENCES public.weight_logs(airtable_id) ON DELETE CASCADE,
+    email TEXT,
+    status TEXT NOT NULL CHECK (status IN ('tolerant', 'intolerant', 'introduced')),
+    food_key TEXT NOT NULL,
+    food_label TEXT NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    UNIQUE (weight_log_airtable_id, food_key, status)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weight_log_food_items_food_key_trgm
+ON public.weight_log_food_items USING GIN (food_key gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS idx_weight_log_food_items_email_status
+ON public.weight_log_food_items(email, status);
+
+ALTER TABLE public.weight_log_food_items ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own food items" ON public.weight_log_food_items;
+CREATE POLICY "Users can view their own food items"
+ON public.weight_log_food_items FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = weight_log_food_items.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = weight_log_food_items.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage food items" ON public.weight_log_food_items;
+CREATE POLICY "Service role can manage food items"
+ON public.weight_log_food_items
+USING (auth.role() = 'service_role');
+
+-- Example: which clients are intolerant to coconut?
+-- SELECT DISTINCT email FROM weight_log_food_items
+-- WHERE status = 'intolerant' AND food_key LIKE '%coconut%';
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,37 @@
+-- Negative cache and review queue for automatic email mapping (email_mapping.py).
+
+-- Airtable emails with no auth account; skipped until checked_at + TTL
+CREATE TABLE IF NOT EXISTS public.email_mapping_misses (
+    airtable_email TEXT PRIMARY KEY,
+    canonical_email TEXT,
+    checked_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+-- Near-matches for manual review; confirmed ones are copied into user_mappings
+CREATE TABLE IF NOT EXISTS public.user_mapping_candidates (
+    airtable_email TEXT NOT NULL,
+    candidate_auth_email TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    score REAL,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (airtable_email, candidate_auth_email)
+);
+
+CREATE INDEX IF NOT EXISTS idx_email_mapping_misses_checked_at
+ON public.email_mapping_misses(checked_at);
+
+ALTER TABLE public.email_mapping_misses ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.user_mapping_candidates ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Service role can manage mapping misses" ON public.email_mapping_misses;
+CREATE POLICY "Service role can manage mapping misses"
+ON public.email_mapping_misses
+USING (auth.role() = 'service_role');
+
+DROP POLICY IF EXISTS "Service role can manage mapping candidates" ON public.user_mapping_candidates;
+CREATE POLICY "Service role can manage mapping candidates"
+ON public.user_mapping_candidates
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
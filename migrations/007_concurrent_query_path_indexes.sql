@@ -0,0 +1,9 @@
+-- migrate: no-transaction
+-- Indexes for the sync's change-tracking reads. Built CONCURRENTLY so they can
+-- be added to a live weight_logs table without blocking the sync's writes.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_weight_logs_updated_at
+ON public.weight_logs(updated_at);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_weight_logs_last_synced
+ON public.weight_logs(last_synced);
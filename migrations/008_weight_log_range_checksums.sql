@@ -0,0 +1,40 @@
+-- Server-side range checksums for `python -m genos_sync verify`.
+-- Rows are bucketed by the next character of airtable_id after p_prefix, and
+-- each bucket returns its row count and the sum of 60-bit row hashes. The row
+-- text must match genos_sync/verify.py's row_text() exactly.
+
+CREATE OR REPLACE FUNCTION public.weight_log_range_checksums(p_prefix TEXT)
+RETURNS TABLE (bucket TEXT, row_count BIGINT, checksum NUMERIC) AS $$
+    SELECT
+        substr(airtable_id, 1, length(p_prefix) + 1) AS bucket,
+        count(*) AS row_count,
+        sum(('x' || substr(md5(
+            concat_ws(chr(31),
+                airtable_id,
+                coalesce(email, ''),
+                coalesce(day_of_program, ''),
+                coalesce(trim_scale(weight_recorded)::text, ''),
+                coalesce(bp_systolic::text, ''),
+                coalesce(bp_diastolic::text, ''),
+                coalesce(trim_scale(blood_sugar)::text, ''),
+                coalesce(trim_scale(chest)::text, ''),
+                coalesce(trim_scale(waist)::text, ''),
+                coalesce(trim_scale(hips)::text, ''),
+                coalesce(tolerant_intolerant, ''),
+                coalesce(tolerant_food_items, ''),
+                coalesce(intolerant_food_items, ''),
+                coalesce(food_item_introduced, ''),
+                coalesce(phase_of_program, '')
+            )
+        ), 1, 15))::bit(60)::bigint)::NUMERIC AS checksum
+    FROM public.weight_logs
+    WHERE starts_with(airtable_id, p_prefix)
+    GROUP BY 1;
+$$ LANGUAGE sql STABLE SECURITY DEFINER SET search_path = public;
+
+-- Counts and hashes bypass RLS, so only the service role may call it
+REVOKE EXECUTE ON FUNCTION public.weight_log_range_checksums(TEXT) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.weight_log_range_checksums(TEXT) TO service_role;
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
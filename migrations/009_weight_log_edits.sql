@@ -0,0 +1,58 @@
+-- Edit log for writing app-side weight log changes back to Airtable
+-- (`python -m genos_sync write-back`).
+-- Every sync-side writer (the sync, backfill, quarantine release) stamps
+-- last_synced on the rows it writes, so an UPDATE that leaves last_synced
+-- untouched came from the app. Its changed columns are logged here and later
+-- coalesced per record into batched Airtable PATCHes.
+
+CREATE TABLE IF NOT EXISTS public.weight_log_edits (
+    id BIGSERIAL PRIMARY KEY,
+    airtable_id TEXT NOT NULL,
+    changes JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'pushed', 'conflict', 'skipped')),
+    edited_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    pushed_at TIMESTAMP WITH TIME ZONE
+);
+
+-- Write-back pages through pending edits in id order
+CREATE INDEX IF NOT EXISTS idx_weight_log_edits_pending
+ON public.weight_log_edits(id)
+WHERE status = 'pending';
+
+CREATE OR REPLACE FUNCTION public.record_weight_log_edit()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed JSONB;
+BEGIN
+    IF NEW.airtable_id IS NULL OR NEW.last_synced IS DISTINCT FROM OLD.last_synced THEN
+        RETURN NEW;
+    END IF;
+
+    SELECT jsonb_object_agg(new_row.key, new_row.value)
+    INTO changed
+    FROM jsonb_each(to_jsonb(NEW) - ARRAY['id', 'airtable_id', 'raw_fields', 'last_synced', 'created_at', 'updated_at']) AS new_row
+    WHERE new_row.value IS DISTINCT FROM to_jsonb(OLD) -> new_row.key;
+
+    IF changed IS NOT NULL THEN
+        INSERT INTO public.weight_log_edits (airtable_id, changes)
+        VALUES (NEW.airtable_id, changed);
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS record_weight_log_edit_trigger ON public.weight_logs;
+CREATE TRIGGER record_weight_log_edit_trigger
+AFTER UPDATE ON public.weight_logs
+FOR EACH ROW
+EXECUTE FUNCTION public.record_weight_log_edit();
+
+ALTER TABLE public.weight_log_edits ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Service role can manage weight log edits" ON public.weight_log_edits;
+CREATE POLICY "Service role can manage weight log edits"
+ON public.weight_log_edits
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
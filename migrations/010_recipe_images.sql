@@ -0,0 +1,39 @@
+-- Mirrored recipe dish images (`python -m genos_sync recipe-images`).
+-- Files live in the public recipe-images bucket under their SHA-256, so the
+-- URLs here are stable, unlike Airtable's expiring attachment URLs.
+
+CREATE TABLE IF NOT EXISTS public.recipe_images (
+    recipe_airtable_id TEXT PRIMARY KEY,
+    attachment_id TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    content_type TEXT,
+    width INTEGER,
+    height INTEGER,
+    url TEXT NOT NULL,
+    -- Thumbnail width -> URL, e.g. {"150": "...", "200": "...", "400": "..."}
+    thumbnails JSONB NOT NULL DEFAULT '{}'::jsonb,
+    mirrored_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_recipe_images_content_hash
+ON public.recipe_images(content_hash);
+
+INSERT INTO storage.buckets (id, name, public)
+VALUES ('recipe-images', 'recipe-images', true)
+ON CONFLICT (id) DO NOTHING;
+
+ALTER TABLE public.recipe_images ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Recipe images are viewable by authenticated users" ON public.recipe_images;
+CREATE POLICY "Recipe images are viewable by authenticated users"
+ON public.recipe_images FOR SELECT
+TO authenticated
+USING (true);
+
+DROP POLICY IF EXISTS "Service role can manage recipe images" ON public.recipe_images;
+CREATE POLICY "Service role can manage recipe images"
+ON public.recipe_images
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,65 @@
+-- Recipe catalogue and per-user eligibility index for the PlatePlanner
+-- (genos_sync/recipe_eligibility.py). recipe_eligibility lists the recipes
+-- without any of a user's intolerant foods per (phase, meal type); 'any' rows
+-- roll up across phases and/or meal types.
+
+CREATE TABLE IF NOT EXISTS public.recipe_catalog (
+    recipe_airtable_id TEXT PRIMARY KEY,
+    name TEXT,
+    phases TEXT[] NOT NULL DEFAULT '{}',
+    meal_types TEXT[] NOT NULL DEFAULT '{}',
+    diet_types TEXT[] NOT NULL DEFAULT '{}',
+    -- One canonical, singularised token string per ingredient line
+    ingredient_keys TEXT[] NOT NULL DEFAULT '{}',
+    content_hash TEXT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS public.recipe_eligibility (
+    email TEXT NOT NULL,
+    phase TEXT NOT NULL,
+    meal_type TEXT NOT NULL,
+    recipe_ids TEXT[] NOT NULL,
+    -- Fingerprints of the inputs, so unchanged users are not recomputed
+    tolerance_hash TEXT NOT NULL,
+    catalog_hash TEXT NOT NULL,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (email, phase, meal_type)
+);
+
+ALTER TABLE public.recipe_catalog ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.recipe_eligibility ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Recipe catalog is viewable by authenticated users" ON public.recipe_catalog;
+CREATE POLICY "Recipe catalog is viewable by authenticated users"
+ON public.recipe_catalog FOR SELECT
+TO authenticated
+USING (true);
+
+DROP POLICY IF EXISTS "Service role can manage recipe catalog" ON public.recipe_catalog;
+CREATE POLICY "Service role can manage recipe catalog"
+ON public.recipe_catalog
+USING (auth.role() = 'service_role');
+
+DROP POLICY IF EXISTS "Users can view their own recipe eligibility" ON public.recipe_eligibility;
+CREATE POLICY "Users can view their own recipe eligibility"
+ON public.recipe_eligibility FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = recipe_eligibility.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = recipe_eligibility.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage recipe eligibility" ON public.recipe_eligibility;
+CREATE POLICY "Service role can manage recipe eligibility"
+ON public.recipe_eligibility
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,54 @@
+-- Long-format blood markers parsed from the Blood Reports table
+-- (`python -m genos_sync blood-markers`): one row per (email, marker, report
+-- date) with the reference range and out-of-range flag precomputed.
+
+CREATE TABLE IF NOT EXISTS public.blood_markers (
+    email TEXT NOT NULL,
+    marker TEXT NOT NULL,
+    report_date DATE NOT NULL,
+    marker_label TEXT,
+    category TEXT,
+    value DECIMAL,
+    value_text TEXT,
+    unit TEXT,
+    ref_low DECIMAL,
+    ref_high DECIMAL,
+    flag TEXT CHECK (flag IN ('low', 'normal', 'high')),
+    source_airtable_id TEXT NOT NULL,
+    synced_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    -- Marker history for a user is a prefix scan of the primary key
+    PRIMARY KEY (email, marker, report_date)
+);
+
+-- Latest report for a user
+CREATE INDEX IF NOT EXISTS idx_blood_markers_email_report_date
+ON public.blood_markers(email, report_date DESC);
+
+-- Rows are replaced per Airtable record
+CREATE INDEX IF NOT EXISTS idx_blood_markers_source_airtable_id
+ON public.blood_markers(source_airtable_id);
+
+ALTER TABLE public.blood_markers ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own blood markers" ON public.blood_markers;
+CREATE POLICY "Users can view their own blood markers"
+ON public.blood_markers FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = blood_markers.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = blood_markers.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage blood markers" ON public.blood_markers;
+CREATE POLICY "Service role can manage blood markers"
+ON public.blood_markers
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
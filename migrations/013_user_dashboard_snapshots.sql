@@ -0,0 +1,40 @@
+-- One JSONB dashboard document per user (profile, latest measurements,
+-- tolerance lists, medical conditions), rebuilt by the sync for users whose
+-- sources changed (genos_sync/dashboard.py). A dashboard load is a single
+-- primary-key read.
+
+CREATE TABLE IF NOT EXISTS public.user_dashboard_snapshots (
+    email TEXT PRIMARY KEY,
+    -- Document layout version (dashboard.SNAPSHOT_VERSION)
+    version INTEGER NOT NULL,
+    -- Bumped on every rebuild that changed the document
+    revision BIGINT NOT NULL DEFAULT 1,
+    source_hash TEXT NOT NULL,
+    snapshot JSONB NOT NULL,
+    built_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+ALTER TABLE public.user_dashboard_snapshots ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own dashboard snapshot" ON public.user_dashboard_snapshots;
+CREATE POLICY "Users can view their own dashboard snapshot"
+ON public.user_dashboard_snapshots FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = user_dashboard_snapshots.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = user_dashboard_snapshots.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage dashboard snapshots" ON public.user_dashboard_snapshots;
+CREATE POLICY "Service role can manage dashboard snapshots"
+ON public.user_dashboard_snapshots
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
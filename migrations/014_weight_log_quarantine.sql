@@ -0,0 +1,47 @@
+-- Implausible measurements held back by the sync (genos_sync/validation.py).
+-- The value is synced to weight_logs as NULL while its entry is open;
+-- `python -m genos_sync quarantine --release` writes it back and marks the
+-- entry released so the same value is not quarantined again.
+
+CREATE TABLE IF NOT EXISTS public.weight_log_quarantine (
+    airtable_id TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    email TEXT,
+    recorded_on DATE,
+    value DECIMAL,
+    rule TEXT NOT NULL,
+    reason TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'released')),
+    detected_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    released_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (airtable_id, column_name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weight_log_quarantine_open
+ON public.weight_log_quarantine(email, recorded_on)
+WHERE status = 'open';
+
+ALTER TABLE public.weight_log_quarantine ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own quarantined readings" ON public.weight_log_quarantine;
+CREATE POLICY "Users can view their own quarantined readings"
+ON public.weight_log_quarantine FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = weight_log_quarantine.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = weight_log_quarantine.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage quarantined readings" ON public.weight_log_quarantine;
+CREATE POLICY "Service role can manage quarantined readings"
+ON public.weight_log_quarantine
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
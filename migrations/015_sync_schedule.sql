@@ -0,0 +1,11 @@
+-- Change-rate history and schedule decisions for the adaptive scheduler
+-- (genos_sync/scheduler.py). run_history holds the most recent runs as
+-- [{"at": ..., "changed": n, "requests": n}]; schedule holds the latest
+-- decision (estimated rate, poll interval, budget share, next run).
+
+ALTER TABLE public.sync_metadata
+ADD COLUMN IF NOT EXISTS run_history JSONB NOT NULL DEFAULT '[]'::jsonb,
+ADD COLUMN IF NOT EXISTS schedule JSONB;
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
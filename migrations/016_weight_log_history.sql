@@ -0,0 +1,142 @@
+-- Point-in-time history of weight_logs.
+-- Every version of a row is kept with the time range it was current in.
+-- Versions are written by a trigger, in the same statement and transaction
+-- as the sync's upsert batch, and only when the row's content hash changes.
+-- Re-upserting an unchanged row adds nothing; last_synced and raw_fields are
+-- not part of the hash. weight_logs_as_of() returns the rows as they were at
+-- a given moment, through the GiST indexes on (email, valid) and
+-- (airtable_id, valid).
+
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+
+CREATE TABLE IF NOT EXISTS public.weight_log_history (
+    id BIGSERIAL PRIMARY KEY,
+    airtable_id TEXT NOT NULL,
+    email TEXT,
+    content_hash TEXT NOT NULL,
+    -- The weight_logs row without raw_fields, as jsonb_populate_record reads it
+    row_data JSONB NOT NULL,
+    valid TSTZRANGE NOT NULL,
+    -- Also the GiST index for one record's versions
+    CONSTRAINT weight_log_history_no_overlap EXCLUDE USING gist (airtable_id WITH =, valid WITH &&)
+);
+
+CREATE INDEX IF NOT EXISTS idx_weight_log_history_email_valid
+ON public.weight_log_history USING gist (email, valid);
+
+-- The open version of each record, looked up by the trigger on every write
+CREATE UNIQUE INDEX IF NOT EXISTS idx_weight_log_history_current
+ON public.weight_log_history(airtable_id)
+WHERE upper_inf(valid);
+
+CREATE OR REPLACE FUNCTION public.weight_log_history_hash(p_row_data JSONB)
+RETURNS TEXT AS $$
+    SELECT md5((p_row_data - ARRAY['id', 'last_synced', 'created_at', 'updated_at'])::text);
+$$ LANGUAGE sql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION public.record_weight_log_history()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_now TIMESTAMP WITH TIME ZONE := now();
+    v_data JSONB;
+    v_hash TEXT;
+    v_current public.weight_log_history%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE public.weight_log_history
+        SET valid = tstzrange(lower(valid), greatest(lower(valid), v_now))
+        WHERE airtable_id = OLD.airtable_id AND upper_inf(valid);
+        RETURN OLD;
+    END IF;
+    IF NEW.airtable_id IS NULL THEN
+        RETURN NEW;
+    END IF;
+
+    v_data := to_jsonb(NEW) - 'raw_fields';
+    v_hash := public.weight_log_history_hash(v_data);
+    SELECT * INTO v_current
+    FROM public.weight_log_history
+    WHERE airtable_id = NEW.airtable_id AND upper_inf(valid);
+
+    IF FOUND AND v_current.content_hash = v_hash THEN
+        RETURN NEW;
+    END IF;
+    IF FOUND AND lower(v_current.valid) >= v_now THEN
+        -- Changed again in the transaction that wrote the open version
+        UPDATE public.weight_log_history
+        SET email = NEW.email, content_hash = v_hash, row_data = v_data
+        WHERE id = v_current.id;
+        RETURN NEW;
+    END IF;
+    IF FOUND THEN
+        UPDATE public.weight_log_history
+        SET valid = tstzrange(lower(valid), v_now)
+        WHERE id = v_current.id;
+    END IF;
+    INSERT INTO public.weight_log_history (airtable_id, email, content_hash, row_data, valid)
+    VALUES (NEW.airtable_id, NEW.email, v_hash, v_data, tstzrange(v_now, NULL));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+DROP TRIGGER IF EXISTS record_weight_log_history_trigger ON public.weight_logs;
+CREATE TRIGGER record_weight_log_history_trigger
+AFTER INSERT OR UPDATE OR DELETE ON public.weight_logs
+FOR EACH ROW
+EXECUTE FUNCTION public.record_weight_log_history();
+
+-- Existing rows become the first versions, current since they were last synced
+INSERT INTO public.weight_log_history (airtable_id, email, content_hash, row_data, valid)
+SELECT
+    airtable_id,
+    email,
+    public.weight_log_history_hash(to_jsonb(weight_logs) - 'raw_fields'),
+    to_jsonb(weight_logs) - 'raw_fields',
+    tstzrange(coalesce(last_synced, created_at, now()), NULL)
+FROM public.weight_logs
+WHERE airtable_id IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+-- weight_logs rows as they were at p_at, for one user or everyone
+CREATE OR REPLACE FUNCTION public.weight_logs_as_of(p_at TIMESTAMP WITH TIME ZONE, p_email TEXT DEFAULT NULL)
+RETURNS SETOF public.weight_logs AS $$
+BEGIN
+    -- Separate queries so each is planned against its own index
+    IF p_email IS NULL THEN
+        RETURN QUERY
+        SELECT (jsonb_populate_record(NULL::public.weight_logs, h.row_data)).*
+        FROM public.weight_log_history h
+        WHERE h.valid @> p_at;
+    ELSE
+        RETURN QUERY
+        SELECT (jsonb_populate_record(NULL::public.weight_logs, h.row_data)).*
+        FROM public.weight_log_history h
+        WHERE h.email = p_email AND h.valid @> p_at;
+    END IF;
+END;
+$$ LANGUAGE plpgsql STABLE;
+
+ALTER TABLE public.weight_log_history ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view their own weight log history" ON public.weight_log_history;
+CREATE POLICY "Users can view their own weight log history"
+ON public.weight_log_history FOR SELECT
+USING (
+    auth.uid() IN (
+        SELECT id FROM auth.users WHERE
+        email = weight_log_history.email
+        OR
+        email IN (
+            SELECT auth_email FROM user_mappings
+            WHERE airtable_email = weight_log_history.email
+        )
+    )
+);
+
+DROP POLICY IF EXISTS "Service role can manage weight log history" ON public.weight_log_history;
+CREATE POLICY "Service role can manage weight log history"
+ON public.weight_log_history
+USING (auth.role() = 'service_role');
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
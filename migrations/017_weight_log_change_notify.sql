@@ -0,0 +1,61 @@
+-- Change notifications for the read cache service (`python -m genos_sync read-cache`).
+-- The history trigger already knows when a weight log's content changed, so
+-- it now also sends NOTIFY weight_logs_changed with the email (and the old
+-- email when a log moves between users). Notifications are delivered when
+-- the sync's upsert batch commits; unchanged re-upserts send nothing.
+
+CREATE OR REPLACE FUNCTION public.record_weight_log_history()
+RETURNS TRIGGER AS $$
+DECLARE
+    v_now TIMESTAMP WITH TIME ZONE := now();
+    v_data JSONB;
+    v_hash TEXT;
+    v_current public.weight_log_history%ROWTYPE;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE public.weight_log_history
+        SET valid = tstzrange(lower(valid), greatest(lower(valid), v_now))
+        WHERE airtable_id = OLD.airtable_id AND upper_inf(valid);
+        PERFORM pg_notify('weight_logs_changed', coalesce(OLD.email, ''));
+        RETURN OLD;
+    END IF;
+    IF NEW.airtable_id IS NULL THEN
+        -- Not a synced row, so no history, but cached reads still include it
+        PERFORM pg_notify('weight_logs_changed', coalesce(NEW.email, ''));
+        RETURN NEW;
+    END IF;
+
+    v_data := to_jsonb(NEW) - 'raw_fields';
+    v_hash := public.weight_log_history_hash(v_data);
+    SELECT * INTO v_current
+    FROM public.weight_log_history
+    WHERE airtable_id = NEW.airtable_id AND upper_inf(valid);
+
+    IF FOUND AND v_current.content_hash = v_hash THEN
+        RETURN NEW;
+    END IF;
+    -- Delivered on commit, once per email and transaction however many rows changed
+    PERFORM pg_notify('weight_logs_changed', coalesce(NEW.email, ''));
+    IF FOUND AND v_current.email IS DISTINCT FROM NEW.email THEN
+        PERFORM pg_notify('weight_logs_changed', coalesce(v_current.email, ''));
+    END IF;
+    IF FOUND AND lower(v_current.valid) >= v_now THEN
+        -- Changed again in the transaction that wrote the open version
+        UPDATE public.weight_log_history
+        SET email = NEW.email, content_hash = v_hash, row_data = v_data
+        WHERE id = v_current.id;
+        RETURN NEW;
+    END IF;
+    IF FOUND THEN
+        UPDATE public.weight_log_history
+        SET valid = tstzrange(lower(valid), v_now)
+        WHERE id = v_current.id;
+    END IF;
+    INSERT INTO public.weight_log_history (airtable_id, email, content_hash, row_data, valid)
+    VALUES (NEW.airtable_id, NEW.email, v_hash, v_data, tstzrange(v_now, NULL));
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,15 @@
+-- Recipe cards for /api/recipes, so the route reads recipe_catalog instead of
+-- scanning the Recipes table in Airtable on every request. display holds a
+-- recipe as the PlatePlanner renders it (genos_sync/recipe_eligibility.py,
+-- recipe_display); display_hash lets the sync rewrite only changed cards
+-- without touching the catalogue fingerprint the eligibility index uses.
+
+ALTER TABLE public.recipe_catalog
+ADD COLUMN IF NOT EXISTS display JSONB NOT NULL DEFAULT '{}',
+ADD COLUMN IF NOT EXISTS display_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_recipe_catalog_name
+ON public.recipe_catalog(name);
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,39 @@
+-- Latest dated weight log per email for the dashboard snapshots
+-- (genos_sync/dashboard.py). Each email is one LIMIT 1 probe of the
+-- (email, recorded_on DESC) index from 003, so a snapshot refresh reads one
+-- row per user instead of paging through their whole history. p_table is the
+-- sync's SUPABASE_TABLE_NAME. Runs with the caller's rights, so RLS applies.
+
+CREATE OR REPLACE FUNCTION public.latest_weight_logs(p_emails TEXT[], p_table TEXT DEFAULT 'weight_logs')
+RETURNS TABLE (
+    email TEXT,
+    recorded_on DATE,
+    program_day INTEGER,
+    phase TEXT,
+    weight_recorded NUMERIC,
+    bp_systolic INTEGER,
+    bp_diastolic INTEGER,
+    blood_sugar NUMERIC,
+    chest NUMERIC,
+    waist NUMERIC,
+    hips NUMERIC
+) AS $$
+BEGIN
+    RETURN QUERY EXECUTE format(
+        'SELECT e.email, l.recorded_on, l.program_day, l.phase::text, l.weight_recorded,
+                l.bp_systolic, l.bp_diastolic, l.blood_sugar, l.chest, l.waist, l.hips
+         FROM unnest($1) AS e(email)
+         CROSS JOIN LATERAL (
+             SELECT w.*
+             FROM public.%I w
+             WHERE w.email = e.email AND w.recorded_on IS NOT NULL
+             ORDER BY w.recorded_on DESC, w.program_day DESC NULLS LAST
+             LIMIT 1
+         ) l',
+        p_table
+    ) USING p_emails;
+END;
+$$ LANGUAGE plpgsql STABLE SET search_path = public;
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
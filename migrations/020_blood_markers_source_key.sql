@@ -0,0 +1,10 @@
+-- Two Blood Reports records for the same user and report date overwrote each
+-- other's markers under the (email, marker, report_date) key. The source
+-- record is now part of the key, so each report keeps its own rows.
+
+ALTER TABLE public.blood_markers DROP CONSTRAINT IF EXISTS blood_markers_pkey;
+ALTER TABLE public.blood_markers
+ADD CONSTRAINT blood_markers_pkey PRIMARY KEY (email, marker, report_date, source_airtable_id);
+
+-- Notify PostgREST to reload its schema cache
+NOTIFY pgrst, 'reload schema';
@@ -34,6 +34,11 @@ const nextConfig = {
         protocol: 'https',
         hostname: 'dl.airtable.com',
         pathname: '/**'
+      },
+      {
+        protocol: 'https',
+        hostname: '*.supabase.co',
+        pathname: '/storage/v1/object/public/**'
       }
     ],
     unoptimized: true,
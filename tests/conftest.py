@@ -0,0 +1,96 @@
+# Shared fixtures for the genos_sync tests. Nothing here talks to Airtable or
+# Supabase: FakeSupabase answers the PostgREST query builder calls the sync
+# makes from in-memory tables.
+
+from types import SimpleNamespace
+
+import pytest
+
+class FakeQuery:
+    def __init__(self, client, table):
+        self.client = client
+        self.table = table
+        self.filters = []
+        self.action = 'select'
+        self.payload = None
+        self.window = None
+        self.orders = []
+
+    def _filter(self, predicate):
+        self.filters.append(predicate)
+        return self
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def order(self, column, **kwargs):
+        self.orders.append(column)
+        return self
+
+    def limit(self, *args, **kwargs):
+        return self
+
+    def range(self, start, end):
+        self.window = (start, end + 1)
+        return self
+
+    def eq(self, column, value):
+        return self._filter(lambda row: row.get(column) == value)
+
+    def neq(self, column, value):
+        return self._filter(lambda row: row.get(column) != value)
+
+    def in_(self, column, values):
+        return self._filter(lambda row: row.get(column) in values)
+
+    def lt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) < value)
+
+    def gt(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) > value)
+
+    def gte(self, column, value):
+        return self._filter(lambda row: row.get(column) is not None and row.get(column) >= value)
+
+    def delete(self):
+        self.action = 'delete'
+        return self
+
+    def upsert(self, rows, **kwargs):
+        self.action, self.payload = 'upsert', rows
+        return self
+
+    def execute(self):
+        self.client.calls.append((self.table, self.action))
+        self.client.orders.append(self.orders)
+        rows = self.client.tables.setdefault(self.table, [])
+        matched = [row for row in rows if all(predicate(row) for predicate in self.filters)]
+        if self.action == 'delete':
+            self.client.tables[self.table] = [row for row in rows if row not in matched]
+        elif self.action == 'upsert':
+            rows.extend(self.payload if isinstance(self.payload, list) else [self.payload])
+        if self.window:
+            matched = matched[slice(*self.window)]
+        return SimpleNamespace(data=matched)
+
+class FakeSupabase:
+    """In-memory stand-in for the supabase client: table name -> list of row dicts"""
+
+    def __init__(self, rpcs=None, **tables):
+        self.tables = tables
+        self.rpcs = rpcs or {}
+        self.calls = []
+        self.orders = []
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def rpc(self, name, params):
+        """Calls the function registered for name in rpcs with the params as keyword arguments"""
+        self.calls.append((name, 'rpc'))
+        data = self.rpcs[name](**params)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data))
+
+@pytest.fixture
+def fake_supabase():
+    return FakeSupabase
@@ -0,0 +1,35 @@
+from genos_sync.backfill import backfill_updates
+
+def archived(airtable_id, created_time, **fields):
+    return {'airtable_id': airtable_id, 'airtable_created_time': created_time, 'raw_fields': fields}
+
+def test_backfill_uses_the_created_time_fallback(fake_supabase):
+    rows = [archived('rec1', '2025-03-04T10:00:00+00:00', **{'Email': 'a@example.com', 'Day of the Program': 'Day 3'})]
+    updates = backfill_updates(fake_supabase(), 'weight_logs', rows, ['recorded_on', 'program_day'])
+    assert updates[0]['recorded_on'] == '2025-03-04'
+    assert updates[0]['program_day'] == 3
+    assert 'last_synced' in updates[0]
+
+def test_backfill_keeps_stored_dates_it_cannot_derive(fake_supabase):
+    rows = [archived('rec1', None, **{'Email': 'a@example.com', 'Weight Recorded': 80})]
+    assert backfill_updates(fake_supabase(), 'weight_logs', rows, ['recorded_on']) == []
+    updates = backfill_updates(fake_supabase(), 'weight_logs', rows, ['recorded_on', 'weight_recorded'])
+    assert 'recorded_on' not in updates[0]
+
+def test_backfill_holds_quarantined_values_back(fake_supabase):
+    client = fake_supabase(weight_log_quarantine=[
+        {'airtable_id': 'rec1', 'column_name': 'weight_recorded', 'value': 95, 'rule': 'weight_spike', 'status': 'open'},
+    ])
+    rows = [
+        archived('rec1', '2025-01-02T00:00:00Z', **{'Email': 'a@example.com', 'Weight Recorded': 95}),
+        archived('rec2', '2025-01-03T00:00:00Z', **{'Email': 'a@example.com', 'Weight Recorded': 0}),
+    ]
+    updates = backfill_updates(client, 'weight_logs', rows, ['weight_recorded'])
+    assert [update['weight_recorded'] for update in updates] == [None, None]
+    assert {(row['airtable_id'], row['rule']) for row in client.tables['weight_log_quarantine']} == {
+        ('rec1', 'weight_spike'), ('rec2', 'range'),
+    }
+
+def test_backfill_fills_unmapped_columns_from_snake_case_fields(fake_supabase):
+    rows = [archived('rec1', None, **{'Email': 'a@example.com', 'Sleep Hours': '7'})]
+    assert backfill_updates(fake_supabase(), 'weight_logs', rows, ['sleep_hours'])[0]['sleep_hours'] == '7'
@@ -0,0 +1,57 @@
+from genos_sync.blood_markers import marker_key, marker_rows, parse_value, reference_flag, sync_blood_markers
+
+def report(**fields):
+    return {'id': 'recReport', 'createdTime': '2025-02-01T10:00:00.000Z', 'fields': {'email': 'a@example.com', **fields}}
+
+def parsed(record):
+    return {(row['category'], row['marker']): (row['value_text'], row['flag']) for row in marker_rows(record, 'now')}
+
+def test_marker_keys_and_values():
+    assert marker_key('HbA1c') == 'hba1c'
+    assert marker_key('Vitamin D3') == 'vitamin_d'
+    assert parse_value('6.2 %') == (6.2, '%')
+    assert parse_value('<5 mg/L') == (5.0, 'mg/L')
+    assert parse_value('Negative') == (None, None)
+    assert reference_flag('hba1c', 6.2, '%') == (4.0, 5.6, 'high')
+    assert reference_flag('hba1c', 6.2, 'mmol/mol') == (4.0, 5.6, None)
+
+def test_only_bulleted_lines_are_markers():
+    record = report(**{'Thyroid Findings': '• TSH (3.1 µIU/mL)\nReviewed by Dr. Rao (consultant)\n  •FT4 (1.2 ng/dL) stable'})
+    assert parsed(record) == {
+        ('Thyroid', 'tsh'): ('3.1 µIU/mL', 'normal'),
+        ('Thyroid', 'free_t4'): ('1.2 ng/dL', 'normal'),
+    }
+
+def test_bare_diabetic_markers_field_is_read_and_preferred():
+    record = report(**{
+        'Diabetic Markers': '• HbA1c (6.2 %)',
+        'Diabetic Markers Findings': '• HbA1c (5.0 %)',
+    })
+    assert parsed(record) == {('Diabetic Markers', 'hba1c'): ('6.2 %', 'high')}
+    only_findings = report(**{'Diabetic Markers Findings': '• FBS (92 mg/dL)'})
+    assert parsed(only_findings) == {('Diabetic Markers', 'fasting_blood_sugar'): ('92 mg/dL', 'normal')}
+
+def test_report_date_falls_back_to_created_time():
+    rows = marker_rows(report(**{'Diabetic Markers': '• HbA1c (6.2 %)'}), 'now')
+    assert rows[0]['report_date'] == '2025-02-01'
+    assert marker_rows({'id': 'rec', 'fields': {'Diabetic Markers': '• HbA1c (6.2 %)'}}, 'now') == []
+
+class FakeBloodReports:
+    def __init__(self, records):
+        self.records = records
+
+    def iterate(self, **options):
+        yield self.records
+
+def test_same_day_reports_keep_their_own_rows_and_deleted_reports_are_pruned(fake_supabase):
+    stale = {'email': 'a@example.com', 'marker': 'tsh', 'report_date': '2024-01-01', 'source_airtable_id': 'recGone'}
+    client = fake_supabase(blood_markers=[stale])
+    records = [
+        {'id': record_id, 'createdTime': '2025-02-01T10:00:00.000Z',
+         'fields': {'email': 'a@example.com', 'Report Date': '2025-02-01', 'Thyroid Findings': f'• TSH ({value} µIU/mL)'}}
+        for record_id, value in (('recMorning', '3.1'), ('recEvening', '2.4'))
+    ]
+    sync_blood_markers(client, FakeBloodReports(records), incremental=False)
+    rows = client.tables['blood_markers']
+    assert sorted((row['source_airtable_id'], row['value']) for row in rows) == [('recEvening', 2.4), ('recMorning', 3.1)]
+    assert client.tables['sync_metadata'][-1].get('run_history') is None
@@ -0,0 +1,22 @@
+from genos_sync.dashboard import latest_measurements, parse_conditions
+
+def test_latest_measurements_reads_one_row_per_email_through_the_rpc(fake_supabase):
+    requests = []
+
+    def latest_weight_logs(p_emails, p_table):
+        requests.append((p_emails, p_table))
+        return [{'email': email, 'recorded_on': '2025-01-02', 'weight_recorded': 80} for email in p_emails[:1]]
+
+    client = fake_supabase(rpcs={'latest_weight_logs': latest_weight_logs})
+    emails = {f'user{i}@example.com' for i in range(150)}
+    latest = latest_measurements(client, 'weight_logs', emails)
+    assert [len(chunk) for chunk, _ in requests] == [100, 50]
+    assert {table for _, table in requests} == {'weight_logs'}
+    assert latest['user0@example.com'] == {'recorded_on': '2025-01-02', 'weight_recorded': 80}
+    assert len(latest) == 2
+
+def test_parse_conditions_reads_bullet_lines():
+    assert parse_conditions('• Diabetes: managed\nnote\n• Asthma') == [
+        {'condition': 'Diabetes', 'status': 'managed'},
+        {'condition': 'Asthma', 'status': 'Asthma'},
+    ]
@@ -0,0 +1,52 @@
+import pytest
+
+from genos_sync.email_mapping import EmailIndex, canonical_email, fetch_all
+
+@pytest.mark.parametrize('email, expected', [
+    (' John.Doe+Diet@GMail.com ', 'johndoe@gmail.com'),
+    ('j.o.h.n.doe@googlemail.com', 'johndoe@gmail.com'),
+    ('first.last+tag@outlook.com', 'first.last+tag@outlook.com'),
+    ('Client@Example.COM', 'client@example.com'),
+    ('no-at-sign', 'no-at-sign'),
+    ('', None),
+    (None, None),
+])
+def test_canonical_email(email, expected):
+    assert canonical_email(email) == expected
+
+def test_exact_match_wins_over_canonical_collision():
+    index = EmailIndex(['John.Doe@gmail.com', 'johndoe@gmail.com'])
+    assert index.match('JOHN.DOE@gmail.com') == 'John.Doe@gmail.com'
+    assert index.match('johndoe@gmail.com') == 'johndoe@gmail.com'
+
+def test_ambiguous_canonical_match_goes_to_candidates():
+    index = EmailIndex(['John.Doe@gmail.com', 'johndoe@gmail.com'])
+    assert index.match('j.ohndoe+x@gmail.com') is None
+    candidates = index.candidates('j.ohndoe+x@gmail.com')
+    assert [(c['candidate_auth_email'], c['reason']) for c in candidates] == [
+        ('John.Doe@gmail.com', 'ambiguous_canonical'),
+        ('johndoe@gmail.com', 'ambiguous_canonical'),
+    ]
+
+def test_unique_canonical_match_is_used():
+    index = EmailIndex(['john.doe@gmail.com'])
+    assert index.match('JohnDoe+program@googlemail.com') == 'john.doe@gmail.com'
+
+def test_plus_tags_are_not_folded_outside_gmail():
+    index = EmailIndex(['client+2@example.com'])
+    assert index.match('client@example.com') is None
+    assert index.candidates('client@example.com') == [
+        {'candidate_auth_email': 'client+2@example.com', 'reason': 'similar_spelling', 'score': 0.85}
+    ]
+
+def test_same_mailbox_on_another_domain_is_a_candidate():
+    index = EmailIndex(['client@example.com'])
+    assert index.match('client@example.org') is None
+    assert index.candidates('client@example.org')[0]['reason'] == 'same_local_part'
+
+def test_fetch_all_pages_in_a_total_order(fake_supabase):
+    client = fake_supabase(user_mappings=[{'id': i, 'airtable_email': f'user{i}@example.com'} for i in range(5)])
+    rows = fetch_all(lambda: client.table('user_mappings').select('airtable_email').order('airtable_email'), 'id',
+                     page_size=2)
+    assert len(rows) == 5
+    assert client.orders == [['airtable_email', 'id']] * 3
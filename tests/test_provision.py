@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+import pytest
+
+from genos_sync.provision import create_user, is_already_registered
+
+class AuthApiError(Exception):
+    def __init__(self, message, status, code=None):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+def auth_client(error):
+    def create_user(attributes):
+        raise error
+    return SimpleNamespace(auth=SimpleNamespace(admin=SimpleNamespace(create_user=create_user)))
+
+@pytest.mark.parametrize('error', [
+    AuthApiError('A user with this email address has already been registered', 422, 'email_exists'),
+    AuthApiError('A user with this email address has already been registered', 422),
+    AuthApiError('User already registered', 422, 'user_already_exists'),
+])
+def test_duplicate_user_errors_mean_the_account_exists(error):
+    assert is_already_registered(error)
+    assert create_user(auth_client(error), {'email': 'a@example.com'}) is None
+
+@pytest.mark.parametrize('error', [
+    AuthApiError('Password should be at least 6 characters', 422, 'weak_password'),
+    AuthApiError('Unable to validate email address: invalid format', 422, 'email_address_invalid'),
+    AuthApiError('Unprocessable Entity', 422),
+])
+def test_other_422s_are_failures(error):
+    assert not is_already_registered(error)
+    with pytest.raises(AuthApiError):
+        create_user(auth_client(error), {'email': 'a@example.com'})
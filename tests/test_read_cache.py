@@ -0,0 +1,60 @@
+from genos_sync.read_cache import ReadCache, tolerance_data
+
+def live_cache(max_bytes=100):
+    cache = ReadCache(max_bytes)
+    cache.reset(live=True)
+    return cache
+
+def test_put_then_get_hits():
+    cache = live_cache()
+    body, token = cache.get('a@example.com')
+    assert body is None
+    assert cache.put('a@example.com', b'{"a": 1}', token)
+    assert cache.get('a@example.com')[0] == b'{"a": 1}'
+    assert (cache.stats['hits'], cache.stats['misses']) == (1, 1)
+
+def test_put_is_rejected_after_an_invalidation_during_the_read():
+    cache = live_cache()
+    _, token = cache.get('a@example.com')
+    cache.invalidate('a@example.com')
+    assert not cache.put('a@example.com', b'stale', token)
+    _, token = cache.get('a@example.com')
+    assert cache.put('a@example.com', b'fresh', token)
+
+def test_invalidate_drops_the_entry_and_its_bytes():
+    cache = live_cache()
+    _, token = cache.get('a@example.com')
+    cache.put('a@example.com', b'12345', token)
+    cache.invalidate('a@example.com')
+    assert cache.get('a@example.com')[0] is None
+    assert cache.size == 0
+    assert cache.stats['invalidations'] == 1
+
+def test_nothing_is_cached_while_the_listener_is_down():
+    cache = ReadCache(100)
+    _, token = cache.get('a@example.com')
+    assert not cache.put('a@example.com', b'body', token)
+    cache.reset(live=True)
+    # Tokens from before a reset belong to an old epoch
+    assert not cache.put('a@example.com', b'body', token)
+
+def test_least_recently_used_entries_are_evicted_by_size():
+    cache = live_cache(max_bytes=10)
+    for email in ('a', 'b', 'c'):
+        _, token = cache.get(email)
+        cache.put(email, b'1234', token)
+    assert list(cache.entries) == ['b', 'c']
+    assert cache.size == 8
+    assert cache.stats['evictions'] == 1
+    _, token = cache.get('big')
+    assert not cache.put('big', b'x' * 11, token)
+
+def test_tolerance_data_splits_and_sorts_items():
+    rows = [
+        {'tolerant_intolerant': 'Tolerant', 'tolerant_food_items': 'Rice, Apple', 'supplement_introduced': 'Zinc'},
+        {'tolerant_intolerant': 'Intolerant', 'intolerant_food_items': 'Milk,', 'food_item_introduced': 'Milk'},
+    ]
+    assert tolerance_data(rows) == {
+        'tolerant': {'supplements': ['Zinc'], 'foods': ['Apple', 'Rice']},
+        'intolerant': {'supplements': [], 'foods': ['Milk']},
+    }
@@ -0,0 +1,53 @@
+from genos_sync.recipe_eligibility import eligibility_rows, food_aliases, parse_recipe
+
+def recipe(airtable_id, ingredients, phase='Detox', meal_type='Lunch'):
+    return parse_recipe({'id': airtable_id, 'fields': {'Ingredients': ingredients, 'Phase': phase, 'Meal Type': meal_type}})
+
+CATALOG = [
+    recipe('recPrawn', 'Prawns\nRice'),
+    recipe('recDal', 'Moong dal\nRice', meal_type='Dinner'),
+]
+
+def groups(rows):
+    return {(row['phase'], row['meal_type']): row['recipe_ids'] for row in rows}
+
+def test_food_aliases_split_bracketed_names():
+    assert food_aliases('PRAWN (Shrimp)') == [frozenset({'prawn'}), frozenset({'shrimp'})]
+
+def test_intolerant_foods_exclude_recipes_in_every_group():
+    rows = eligibility_rows('a@example.com', CATALOG, ['PRAWN (Shrimp)'], 'tol', 'cat', 'now')
+    assert groups(rows) == {
+        ('any', 'any'): ['recDal'],
+        ('any', 'dinner'): ['recDal'],
+        ('detox', 'any'): ['recDal'],
+        ('detox', 'dinner'): ['recDal'],
+    }
+
+def test_marker_row_is_written_when_nothing_is_eligible():
+    rows = eligibility_rows('a@example.com', CATALOG, ['Rice'], 'tol', 'cat', 'now')
+    assert groups(rows) == {('any', 'any'): []}
+    assert rows[0]['tolerance_hash'] == 'tol'
+    assert rows[0]['catalog_hash'] == 'cat'
+
+def test_recipe_display_matches_the_route_cards():
+    display = parse_recipe({'id': 'recDal', 'fields': {
+        'Recipe Name': 'Dal',
+        'Dish Image': [{'url': 'https://dl.airtable.com/dal.jpg'}],
+        'Ingredients': '- Moong dal\n\n– Rice ',
+        'Meal Type': ['Dinner'],
+        'Diet Type': 'Vegan',
+        'Calories': 320,
+    }})['display']
+    assert display['image'] == 'https://dl.airtable.com/dal.jpg'
+    assert display['ingredients'] == ['Moong dal', 'Rice']
+    assert display['mealType'] == 'Dinner'
+    assert display['dietType'] == ['Vegan']
+    assert (display['calories'], display['fats'], display['phase']) == (320, 0, '')
+
+def test_display_changes_leave_the_eligibility_hash_alone():
+    before = recipe('recDal', 'Moong dal\nRice')
+    after = parse_recipe({'id': 'recDal', 'fields': {
+        'Ingredients': 'Moong dal\nRice', 'Phase': 'Detox', 'Meal Type': 'Lunch', 'Instructions': 'Simmer',
+    }})
+    assert after['content_hash'] == before['content_hash']
+    assert after['display_hash'] != before['display_hash']
@@ -0,0 +1,56 @@
+import math
+
+import numpy as np
+
+from genos_sync.records import INT_NULL, RecordStore, coerce_column, to_int_column
+from genos_sync.transform import safe_float, safe_int
+
+RAW_VALUES = [None, '', '  ', 'n/a', '120', 120, '120.7', 120.7, '120.0', 0, '0', '1e30', True, ['120']]
+
+def test_coerce_column_matches_safe_float():
+    coerced = coerce_column(RAW_VALUES)
+    for value, result in zip(RAW_VALUES, coerced):
+        expected = safe_float(value)
+        if expected is None:
+            assert math.isnan(result)
+        else:
+            assert result == expected
+
+def test_coerce_column_fast_path_for_clean_pages():
+    assert coerce_column([1, '2.5', None]).tolist()[:2] == [1.0, 2.5]
+    assert np.isnan(coerce_column([1, '2.5', None])[2])
+
+def test_int_column_uses_safe_int_rule():
+    ints = to_int_column(coerce_column(RAW_VALUES))
+    assert [None if value == INT_NULL else int(value) for value in ints] == [safe_int(value) for value in RAW_VALUES]
+
+def test_fractional_int_is_null_whatever_its_type():
+    assert safe_int('120.7') is None
+    assert safe_int(120.7) is None
+    assert safe_int('120.0') == 120
+
+def test_store_rows_restore_nulls_and_fall_back_to_created_time():
+    store = RecordStore.from_records([
+        {'id': 'rec1', 'createdTime': '2025-03-04T23:00:00.000Z',
+         'fields': {'Email': ['a@example.com'], 'Weight Recorded': '80.5', 'BP Systolic': '',
+                    'Day of the Program': 'Day 12', 'Phase of the Program': 'Detox Phase'}},
+        {'id': 'rec2', 'createdTime': '2025-03-05T08:00:00.000Z',
+         'fields': {'Email': 'b@example.com', 'Date': '2025-03-01'}},
+    ])
+    columns = {'email', 'weight_recorded', 'bp_systolic', 'program_day', 'phase', 'recorded_on',
+               'raw_fields', 'airtable_created_time'}
+    first, second = store.rows(0, 2, columns)
+    assert first['email'] == 'a@example.com'
+    assert first['weight_recorded'] == 80.5
+    assert first['bp_systolic'] is None
+    assert first['program_day'] == 12
+    assert first['phase'] == 'detox'
+    assert first['recorded_on'] == '2025-03-04'
+    assert first['airtable_created_time'] == '2025-03-04T23:00:00.000Z'
+    assert second['recorded_on'] == '2025-03-01'
+    assert second['raw_fields'] == {'Email': 'b@example.com', 'Date': '2025-03-01'}
+    assert 'last_synced' not in first
+
+def test_store_batches_cover_every_row():
+    store = RecordStore.from_records([{'id': f'rec{i}', 'fields': {}} for i in range(5)])
+    assert list(store.batches(2)) == [(0, 2), (2, 4), (4, 5)]
@@ -0,0 +1,42 @@
+import math
+from datetime import datetime, timedelta, timezone
+
+from genos_sync.scheduler import MAX_INTERVAL_HOURS, MIN_INTERVAL_HOURS, allocate, change_rate, interval_floor
+
+def spend(intervals, costs):
+    return sum(costs[key] / interval for key, interval in intervals.items())
+
+def test_allocate_spends_the_budget_in_proportion_to_sqrt_rate_per_cost():
+    rates = {'hot': 40.0, 'warm': 10.0}
+    costs = {'hot': 2.0, 'warm': 2.0}
+    intervals = allocate(rates, costs, budget=20)
+    assert math.isclose(spend(intervals, costs), 20)
+    # Four times the rate: twice as often
+    assert math.isclose(intervals['warm'] / intervals['hot'], 2)
+
+def test_allocate_clamps_and_redistributes():
+    rates = {'hot': 100.0, 'cold': 0.001}
+    costs = {'hot': 1.0, 'cold': 1.0}
+    intervals = allocate(rates, costs, budget=10)
+    assert intervals['cold'] == MAX_INTERVAL_HOURS
+    # What the cold table doesn't use goes to the hot one
+    assert math.isclose(spend(intervals, costs), 10)
+
+def test_allocate_never_polls_faster_than_the_floor():
+    rates = {'hot': 1000.0, 'quiet': 0.5}
+    costs = {'hot': 1.0, 'quiet': 1.0}
+    intervals = allocate(rates, costs, budget=10_000)
+    assert intervals['hot'] == MIN_INTERVAL_HOURS
+    assert intervals['quiet'] == interval_floor(0.5) == 1 / (0.5 * 4)
+
+def test_allocate_with_no_budget_polls_daily():
+    assert allocate({'a': 1.0}, {'a': 1.0}, budget=0) == {'a': MAX_INTERVAL_HOURS}
+
+def test_change_rate_ignores_the_first_runs_count():
+    now = datetime(2025, 1, 2, tzinfo=timezone.utc)
+    history = [
+        {'at': (now - timedelta(hours=10)).isoformat(), 'changed': 1000},
+        {'at': (now - timedelta(hours=5)).isoformat(), 'changed': 10},
+        {'at': now.isoformat(), 'changed': 10},
+    ]
+    assert math.isclose(change_rate(history, now), (20 + 1 / 24) / 11)
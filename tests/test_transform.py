@@ -0,0 +1,21 @@
+from genos_sync.transform import map_fields, parse_date, parse_phase, parse_program_day
+
+def test_parsers_read_text_and_numbers():
+    assert parse_program_day('Day 12') == 12
+    assert parse_program_day(7) == 7
+    assert parse_phase('Low-Carb Reintroductions Phase') == 'low_carb_reintroductions'
+    assert parse_date('2025-03-04T10:00:00.000Z') == '2025-03-04'
+    assert parse_date('not a date') is None
+
+def test_parsers_unwrap_lookup_and_rollup_lists():
+    assert parse_program_day(['Day 3']) == 3
+    assert parse_phase(['Detox']) == 'detox'
+    assert parse_date(['2025-03-04']) == '2025-03-04'
+    assert parse_program_day([]) is None
+    assert parse_date([{'id': 'att1'}]) is None
+
+def test_map_fields_with_lookup_values():
+    fields = {'Day of the Program': ['Day 5'], 'Phase of the Program': ['Detox'], 'Date': ['2025-01-02']}
+    assert map_fields(fields, ['program_day', 'phase', 'recorded_on']) == {
+        'program_day': 5, 'phase': 'detox', 'recorded_on': '2025-01-02',
+    }
@@ -0,0 +1,105 @@
+from genos_sync.records import RecordStore
+from genos_sync.validation import find_suspect_values, previous_weights, quarantine_store
+
+def weight_log(airtable_id, date, weight=None, email='a@example.com', **fields):
+    fields = {'Email': email, 'Date': date, **fields}
+    if weight is not None:
+        fields['Weight Recorded'] = weight
+    return {'id': airtable_id, 'fields': fields}
+
+def flagged(store, previous=None, spikes=True):
+    return sorted((store.airtable_ids[row], column, rule) for row, column, rule, _ in find_suspect_values(store, previous, spikes))
+
+def test_range_rule_flags_zero_and_implausible_values():
+    store = RecordStore.from_records([
+        weight_log('rec1', '2025-01-01', 0),
+        weight_log('rec2', '2025-01-02', 80, **{'Blood Sugar': 900}),
+        weight_log('rec3', '2025-01-03', 80),
+    ])
+    assert flagged(store) == [('rec1', 'weight_recorded', 'range'), ('rec2', 'blood_sugar', 'range')]
+
+def test_bp_order_flags_both_readings_unless_one_is_out_of_range():
+    store = RecordStore.from_records([
+        weight_log('rec1', '2025-01-01', **{'BP Systolic': 80, 'BP Diastolic': 90}),
+        weight_log('rec2', '2025-01-02', **{'BP Systolic': 300, 'BP Diastolic': 90}),
+    ])
+    assert flagged(store) == [
+        ('rec1', 'bp_diastolic', 'bp_order'),
+        ('rec1', 'bp_systolic', 'bp_order'),
+        ('rec2', 'bp_systolic', 'range'),
+    ]
+
+def test_spike_away_and_back_is_flagged_but_a_sustained_step_is_not():
+    spike = RecordStore.from_records([
+        weight_log('rec1', '2025-01-01', 80),
+        weight_log('rec2', '2025-01-02', 95),
+        weight_log('rec3', '2025-01-03', 80.5),
+    ])
+    assert flagged(spike) == [('rec2', 'weight_recorded', 'weight_spike')]
+
+    step = RecordStore.from_records([
+        weight_log('rec1', '2025-01-01', 80),
+        weight_log('rec2', '2025-01-02', 95),
+        weight_log('rec3', '2025-01-03', 95.5),
+    ])
+    assert flagged(step) == []
+
+def test_latest_reading_is_judged_against_the_previous_stored_one():
+    store = RecordStore.from_records([weight_log('rec9', '2025-01-10', 95)])
+    assert flagged(store) == []
+    assert flagged(store, {'a@example.com': ('2025-01-09', 80.0)}) == [('rec9', 'weight_recorded', 'weight_spike')]
+    # Over 20 days a 15 kg change is within the per-day allowance
+    assert flagged(store, {'a@example.com': ('2024-12-21', 80.0)}) == []
+
+def test_spikes_false_skips_the_history_rule():
+    store = RecordStore.from_records([
+        weight_log('rec1', '2025-01-01', 80),
+        weight_log('rec2', '2025-01-02', 95),
+        weight_log('rec3', '2025-01-03', 80),
+    ])
+    assert flagged(store, spikes=False) == []
+
+def test_previous_weights_reads_each_chunk_once(fake_supabase):
+    stored = [
+        {'email': 'a@example.com', 'recorded_on': '2025-01-05', 'weight_recorded': 81},
+        {'email': 'a@example.com', 'recorded_on': '2025-01-01', 'weight_recorded': 80},
+        {'email': 'b@example.com', 'recorded_on': '2023-01-01', 'weight_recorded': 70},
+    ]
+    client = fake_supabase(weight_logs=stored)
+    store = RecordStore.from_records([
+        weight_log('rec1', '2025-01-10', 82),
+        weight_log('rec2', '2025-01-08', 82),
+        weight_log('rec3', '2025-01-10', 71, email='b@example.com'),
+    ])
+    assert previous_weights(client, 'weight_logs', store) == {'a@example.com': ('2025-01-05', 81.0)}
+    assert client.calls == [('weight_logs', 'select')]
+
+def test_quarantine_nulls_suspects_and_honours_releases(fake_supabase):
+    client = fake_supabase(weight_log_quarantine=[
+        {'airtable_id': 'rec2', 'column_name': 'blood_sugar', 'value': 900, 'rule': 'range', 'status': 'released'},
+        {'airtable_id': 'other', 'column_name': 'hips', 'value': 1, 'rule': 'range', 'status': 'open'},
+    ])
+    store = RecordStore.from_records([
+        weight_log('rec1', '2025-01-01', 0),
+        weight_log('rec2', '2025-01-02', 80, **{'Blood Sugar': 900}),
+    ])
+    assert quarantine_store(client, 'weight_logs', store, previous_readings=False) == 1
+    assert store.value('weight_recorded', 0) is None
+    assert store.value('blood_sugar', 1) == 900
+    entries = {(row['airtable_id'], row['column_name']): row['status'] for row in client.tables['weight_log_quarantine']}
+    assert entries == {
+        ('rec2', 'blood_sugar'): 'released',
+        ('other', 'hips'): 'open',
+        ('rec1', 'weight_recorded'): 'open',
+    }
+
+def test_quarantine_without_spikes_keeps_open_spike_entries(fake_supabase):
+    client = fake_supabase(weight_log_quarantine=[
+        {'airtable_id': 'rec1', 'column_name': 'weight_recorded', 'value': 95, 'rule': 'weight_spike', 'status': 'open'},
+        {'airtable_id': 'rec1', 'column_name': 'hips', 'value': 500, 'rule': 'range', 'status': 'open'},
+    ])
+    store = RecordStore.from_records([weight_log('rec1', '2025-01-02', 95, Hips=40)])
+    quarantine_store(client, 'weight_logs', store, spikes=False)
+    assert store.value('weight_recorded', 0) is None
+    assert store.value('hips', 0) == 40
+    assert [row['rule'] for row in client.tables['weight_log_quarantine']] == ['weight_spike']
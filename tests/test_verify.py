@@ -0,0 +1,48 @@
+import hashlib
+
+from genos_sync.verify import AirtableSide, VERIFY_COLUMNS, delete_extra_rows, expected_row, format_value, row_hash, row_text
+
+def test_format_value_matches_postgres_text():
+    assert format_value(None) == ''
+    assert format_value(80.0) == '80'
+    assert format_value(80.5) == '80.5'
+    assert format_value(True) == 'true'
+    assert format_value(['Rice', 'Milk']) == '["Rice", "Milk"]'
+
+def test_row_hash_is_the_first_60_bits_of_md5():
+    row = {'email': 'a@example.com', 'weight_recorded': 80.0}
+    text = row_text('recABC', row)
+    assert text.split('\x1f')[:4] == ['recABC', 'a@example.com', '', '80']
+    assert len(text.split('\x1f')) == len(VERIFY_COLUMNS) + 1
+    assert row_hash('recABC', row) == int(hashlib.md5(text.encode('utf-8')).hexdigest()[:15], 16)
+    assert row_hash('recABC', row) < 2 ** 60
+
+def test_expected_row_uses_the_sync_coercion_and_quarantine():
+    record = {'fields': {'Email': 'a@example.com', 'BP Systolic': '120.7', 'Weight Recorded': '95'}}
+    row = expected_row('recABC', record, {'recABC': ['weight_recorded']})
+    assert row['bp_systolic'] is None
+    assert row['weight_recorded'] is None
+
+def test_buckets_group_by_the_next_id_character():
+    side = AirtableSide([
+        {'id': 'recA1', 'fields': {'Email': 'a@example.com'}},
+        {'id': 'recA2', 'fields': {'Email': 'b@example.com'}},
+        {'id': 'recB1', 'fields': {'Email': 'c@example.com'}},
+    ])
+    buckets = side.buckets('rec')
+    assert {key: count for key, (count, _) in buckets.items()} == {'recA': 2, 'recB': 1}
+    assert buckets['recA'][1] == side.hashes['recA1'] + side.hashes['recA2']
+    assert set(side.leaf('recA')) == {'recA1', 'recA2'}
+
+def test_delete_extra_rows_chunks_ids_and_removes_food_items(fake_supabase):
+    ids = [f'rec{i:014d}' for i in range(250)]
+    client = fake_supabase(
+        weight_logs=[{'airtable_id': airtable_id, 'email': f'user{i % 2}@example.com'} for i, airtable_id in enumerate(ids)]
+        + [{'airtable_id': 'recKept', 'email': 'kept@example.com'}],
+        weight_log_food_items=[{'weight_log_airtable_id': ids[0]}, {'weight_log_airtable_id': 'recKept'}],
+    )
+    emails = delete_extra_rows(client, 'weight_logs', set(ids), chunk_size=100)
+    assert emails == {'user0@example.com', 'user1@example.com'}
+    assert client.tables['weight_logs'] == [{'airtable_id': 'recKept', 'email': 'kept@example.com'}]
+    assert client.tables['weight_log_food_items'] == [{'weight_log_airtable_id': 'recKept'}]
+    assert client.calls.count(('weight_logs', 'delete')) == 3